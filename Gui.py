@@ -1,17 +1,21 @@
+import os
 import tkinter as tk
 from tkinter import filedialog, ttk, scrolledtext
 from tkinter import messagebox
 import threading
-import os
-import cProfile
 
-from markdown_formatter import configure_markdown_tags, markdown_to_tkinter_text
+from markdown_formatter import configure_markdown_tags, MarkdownRenderer
+from pdf_export import export_notes_pdf
+
 
+from analysis import text_extraction_youtube_website
+from config import check_api_key_exists, save_api_key, get_api_key, get_analysis_timeout
+from jobs import JobQueue, JOB_QUEUED, JOB_RUNNING
+from metrics import format_metrics
+from prompts import PROMPT_TYPES
 
-from analysis import (extract_transkript, extract_text_from_website,
-                      text_extraction_youtube_website, real_ai_analyse_fortext,
-                      real_ai_analyse_forpdf)
-from config import check_api_key_exists, save_api_key, get_api_key
+# Intervall, in dem gestreamte Textfragmente gesammelt gerendert werden
+STREAM_RENDER_INTERVAL_MS = 100
 
 
 class Gui():
@@ -27,6 +31,18 @@ class Gui():
         self.notes = []
         self.analyseResult = ""
         self.analysePath = ""
+        # Markdown-Quelltext des angezeigten Ergebnisses (für Notizen und PDF-Export)
+        self._displayed_markdown = ""
+
+        # Zustand für gestreamte Antworten (Hintergrund-Threads -> Tk-Mainloop)
+        self._stream_lock = threading.Lock()
+        self._stream_flush_scheduled = False
+
+        # Mehrere Analysen laufen parallel; angezeigt wird der ausgewählte Auftrag
+        self.job_queue = JobQueue(on_update=self.queue_job_update, on_delta=self.queue_stream_delta,
+                                  timeout=get_analysis_timeout())
+        self._selected_job_id = None
+        self._job_tick_scheduled = False
 
         self.setupGui()
 
@@ -175,10 +191,11 @@ class Gui():
         self.analysis_frame = ttk.LabelFrame(
             self.main_frame, text="Analyse & Ergebnisse", padding=10)
         self.analysis_frame.pack(fill=tk.BOTH, expand=True)
-        self.analysis_frame.rowconfigure(5, weight=1)
+        self.analysis_frame.rowconfigure(8, weight=1)
         self.analysis_frame.columnconfigure(0, weight=1)
 
         self.promptFrame()
+        self.jobListArea()
         self.outPutArea()
 
     def promptFrame(self):
@@ -191,14 +208,25 @@ class Gui():
         self.question_text.grid(
             row=1, column=0, sticky=tk.W + tk.E, pady=(0, 15))
 
-        self.combobox = ttk.Combobox(self.analysis_frame,
-                                     values=["Prompt senden", "Zusammenfassung", "Keyword-Extraktion", "Sentiment Analyse",
-                                             "Themen-Erkennung"])
+        options_frame = ttk.Frame(self.analysis_frame)
+        options_frame.grid(row=2, column=0, sticky=tk.W + tk.E, pady=(0, 15))
+        options_frame.columnconfigure(0, weight=1)
+
+        self.combobox = ttk.Combobox(options_frame, values=PROMPT_TYPES)
         self.combobox.current(0)
-        self.combobox.grid(row=2, column=0, sticky=tk.W + tk.E, pady=(0, 15))
+        self.combobox.grid(row=0, column=0, sticky=tk.W + tk.E)
+
+        # Gespeicherte KI-Antworten ignorieren und neu anfragen
+        self.bypass_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Cache umgehen",
+                        variable=self.bypass_cache_var).grid(row=0, column=1, padx=(10, 0))
+
+        self.cancel_button = ttk.Button(options_frame, text="Auftrag abbrechen",
+                                        command=self.cancel_analysis, state=tk.DISABLED)
+        self.cancel_button.grid(row=0, column=2, padx=(10, 0))
 
         self.question_button = ttk.Button(
-            self.analysis_frame, text="Frage senden", command=self.send_question)
+            self.analysis_frame, text="Zur Warteschlange hinzufügen", command=self.send_question)
         self.question_button.grid(
             row=3, column=0, sticky=tk.W + tk.E, pady=(0, 15))
 
@@ -206,23 +234,47 @@ class Gui():
         separator = ttk.Separator(self.analysis_frame, orient=tk.HORIZONTAL)
         separator.grid(row=4, column=0, sticky=tk.W + tk.E, pady=10)
 
+    def jobListArea(self):
+        # Job list: one row per queued analysis
+        ttk.Label(self.analysis_frame, text="Aufträge:").grid(
+            row=5, column=0, sticky=tk.W)
+
+        jobs_frame = ttk.Frame(self.analysis_frame)
+        jobs_frame.grid(row=6, column=0, sticky=tk.W + tk.E, pady=(0, 10))
+        jobs_frame.columnconfigure(0, weight=1)
+
+        self.job_list = ttk.Treeview(jobs_frame, columns=("source", "prompt", "state", "elapsed"),
+                                     show="headings", height=5, selectmode="browse")
+        for column, heading, width in (("source", "Quelle", 320), ("prompt", "Prompt-Typ", 140),
+                                       ("state", "Status", 90), ("elapsed", "Dauer", 70)):
+            self.job_list.heading(column, text=heading)
+            self.job_list.column(column, width=width, stretch=column == "source")
+        self.job_list.grid(row=0, column=0, sticky=tk.W + tk.E)
+        self.job_list.bind("<<TreeviewSelect>>", self.on_job_select)
+
+        scrollbar = ttk.Scrollbar(jobs_frame, orient=tk.VERTICAL, command=self.job_list.yview)
+        scrollbar.grid(row=0, column=1, sticky=tk.N + tk.S)
+        self.job_list.configure(yscrollcommand=scrollbar.set)
+
     def outPutArea(self):
         # Output area
         ttk.Label(self.analysis_frame, text="Ergebnisse:").grid(
-            row=5, column=0, sticky=tk.W)
+            row=7, column=0, sticky=tk.W)
 
         self.output_text = scrolledtext.ScrolledText(
             self.analysis_frame, height=10)
-        self.output_text.grid(row=6, column=0, sticky=tk.W +
+        self.output_text.grid(row=8, column=0, sticky=tk.W +
                               tk.E + tk.N + tk.S, pady=(0, 10))
         self.output_text.insert(tk.END, "Das Ergebnis wird hier angezeigt...")
         self.output_text.config(state=tk.DISABLED)
 
         configure_markdown_tags(self.output_text)
+        # Gestreamte Antworten werden inkrementell gerendert (nur neue Zeilen)
+        self.output_renderer = MarkdownRenderer(self.output_text)
 
         # Note management buttons
         buttons_frame = ttk.Frame(self.analysis_frame)
-        buttons_frame.grid(row=7, column=0, sticky=tk.W + tk.E, pady=(0, 10))
+        buttons_frame.grid(row=9, column=0, sticky=tk.W + tk.E, pady=(0, 10))
 
         export_button = ttk.Button(
             buttons_frame, text="Notiz exportieren", command=self.export_notes_as_pdf)
@@ -234,21 +286,6 @@ class Gui():
 
     # Funktionen
 
-    def profile_function(self):
-        """Profiling-Funktion für Performance-Analyse (nur für Entwicklung)."""
-        import pstats
-        import io
-        profiler = cProfile.Profile()
-        profiler.enable()
-        self.send_question()
-        profiler.disable()
-        # Ergebnisse in Datei speichern
-        profile_path = os.path.join(os.getcwd(), 'profile.txt')
-        with open(profile_path, 'w') as f:
-            stats = pstats.Stats(profiler, stream=f)
-            stats.sort_stats('time')
-            stats.print_stats()
-
     def pdf_file_choose(self):
         file_path = filedialog.askopenfilename(
             filetypes=[("PDF-Dateien", "*.pdf")])
@@ -265,19 +302,6 @@ class Gui():
             return path
         return ""
 
-    @staticmethod
-    def _generate_prompt_text(prompt_type, custom_prompt, content):
-        if prompt_type == "Zusammenfassung":
-            return f"Fasse den Text zusammen:{content}"
-        elif prompt_type == "Keyword-Extraktion":
-            return f"Extrahiere Schlüsselwörter aus diesem Text: {content}"
-        elif prompt_type == "Sentiment Analyse":
-            return f"Analysiere die Stimmung und den Tonfall dieses Textes: {content}"
-        elif prompt_type == "Themen-Erkennung":
-            return f"Erkenne die Hauptthemen des nachfolgendes Textes: {content}"
-        else:
-            return f"{custom_prompt} {content}"
-
     def send_question(self):
         # UI Input Gathering and Validation
         tab_id = self.input_tabs.select()
@@ -304,92 +328,145 @@ class Gui():
             messagebox.showwarning(
                 "Fehlende Eingabe", "Bitte gib eine URL ein oder wähle eine Datei aus.")
             return
+        if is_pdf_upload and not os.path.isfile(input_path):
+            messagebox.showwarning("Datei nicht gefunden", f"Die Datei {input_path} existiert nicht.")
+            return
 
-        # Prepare for background work
-        self.window.config(cursor="watch")
-        self.question_button.config(state=tk.DISABLED, text="Verarbeite...")
-        self.status_var.set("Analyse läuft...")
-        self.output_text.config(state=tk.NORMAL)
-        self.output_text.delete(1.0, tk.END)
-        self.output_text.insert(tk.END, "Analyse läuft, bitte warten...\n")
-        self.output_text.config(state=tk.DISABLED)
-
-        # Get prompt params before threading
+        # Get prompt params
         prompt_value = self.combobox.get()
         custom_prompt_text = self.question_text.get(1.0, tk.END).strip()
+        use_cache = not self.bypass_cache_var.get()
+
+        # Die Analyse läuft als Auftrag in der Warteschlange; der Button bleibt für weitere Quellen frei
+        self.analysePath = input_path  # Maintain compatibility
+        job = self.job_queue.submit(input_path, prompt_value, custom_prompt_text, use_cache)
+        self._update_job_row(job)
+        self.job_list.selection_set(str(job.id))
+        self.job_list.see(str(job.id))
+
+    def cancel_analysis(self):
+        if self._selected_job_id is not None and self.job_queue.cancel(self._selected_job_id):
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_var.set("Analyse wird abgebrochen...")
+
+    def queue_job_update(self, job):
+        """Wird aus Hintergrund-Threads aufgerufen; die Anzeige wird im Tk-Mainloop aktualisiert."""
+        self.window.after(0, self.on_job_update, job.id)
+
+    def on_job_update(self, job_id):
+        self._remove_evicted_job_rows()
+        job = self.job_queue.get(job_id)
+        if job is None:
+            return
+        self._update_job_row(job)
+        if job.id == self._selected_job_id:
+            self.show_job(job)
+        if job.finished_state:
+            timings = format_metrics(job.details.get("metrics"))
+            self.status_var.set(f"{job.state} nach {job.elapsed:.1f} s"
+                                + (f" ({timings})" if timings else "")
+                                + self._format_usage(job.details.get("usage")))
+        else:
+            self.status_var.set(self._queue_summary())
+        self._schedule_job_tick()
 
-        # Run analysis in a separate thread
-        thread = threading.Thread(
-            target=self.run_analysis_thread,
-            args=(input_path, tab_index, is_pdf_upload,
-                  prompt_value, custom_prompt_text)
-        )
-        thread.daemon = True
-        thread.start()
-
-    def run_analysis_thread(self, input_path, tab_index, is_pdf_upload, prompt_value, custom_prompt_text):
-        try:
-            content = ""
-            self.analysePath = input_path  # Maintain compatibility
-
-            # Step 1: Extraction
-            if tab_index in [0, 1]:  # Website or YouTube
-                content = text_extraction_youtube_website(input_path)
-                self.analyseResult = content
-            elif tab_index == 2:  # PDF
-                if is_pdf_upload:
-                    content = input_path  # It's the file path
-                else:
-                    content = input_path
-                self.analyseResult = content
-
-            # Step 2: Prompt Generation
-            prompt = ""
-            if prompt_value == "Zusammenfassung":
-                prompt = "Fasse den Text zusammen:{text}"
-            elif prompt_value == "Keyword-Extraktion":
-                prompt = "Extrahiere Schlüsselwörter aus diesem Text: {text}".format(
-                    text=content)
-            elif prompt_value == "Sentiment Analyse":
-                prompt = "Analysiere die Stimmung und den Tonfall dieses Textes: {text}".format(
-                    text=content)
-            elif prompt_value == "Themen-Erkennung":
-                prompt = "Erkenne die Hauptthemen des nachfolgendes Textes: {text}".format(
-                    text=content)
-            else:
-                prompt = f"{custom_prompt_text} {{text}}".format(text=content)
-
-            # Step 3: AI Analysis
-            result_analysis = ""
-            if "http" in input_path.lower() or "youtu" in input_path.lower():
-                try:
-                    combined_text = prompt.format(text=content)
-                except Exception:
-                    combined_text = prompt
-                result_analysis = real_ai_analyse_fortext(combined_text)
-            else:
-                result_analysis = real_ai_analyse_forpdf(content, prompt)
+    def _update_job_row(self, job):
+        values = (job.source, job.prompt_type, job.state, f"{job.elapsed:.1f} s")
+        if self.job_list.exists(str(job.id)):
+            self.job_list.item(str(job.id), values=values)
+        else:
+            self.job_list.insert("", tk.END, iid=str(job.id), values=values)
+
+    def _remove_evicted_job_rows(self):
+        # Die Warteschlange behält nur die neuesten abgeschlossenen Aufträge (jobs.MAX_FINISHED_JOBS)
+        for iid in self.job_list.get_children():
+            if self.job_queue.get(int(iid)) is None:
+                self.job_list.delete(iid)
+                if int(iid) == self._selected_job_id:
+                    self._selected_job_id = None
+
+    def _queue_summary(self):
+        states = [job.state for job in list(self.job_queue.jobs.values())]
+        return (f"{states.count(JOB_RUNNING)} Analysen laufen, "
+                f"{states.count(JOB_QUEUED)} warten")
+
+    def _schedule_job_tick(self):
+        # Laufzeiten der aktiven Aufträge einmal pro Sekunde aktualisieren
+        if not self._job_tick_scheduled:
+            self._job_tick_scheduled = True
+            self.window.after(1000, self._tick_jobs)
+
+    def _tick_jobs(self):
+        self._job_tick_scheduled = False
+        running = [job for job in list(self.job_queue.jobs.values()) if job.state == JOB_RUNNING]
+        for job in running:
+            self._update_job_row(job)
+        if running:
+            self._schedule_job_tick()
+
+    def on_job_select(self, event):
+        selection = self.job_list.selection()
+        if not selection:
+            return
+        job = self.job_queue.get(int(selection[0]))
+        if job is None:
+            return
+        self._selected_job_id = job.id
+        self.show_job(job)
+
+    def show_job(self, job):
+        """Shows the result, the streamed text so far or the state of a job in the output area."""
+        if job.finished_state:
+            text = job.result
+            self.analyseResult = job.details.get("content", "")
+        elif job.partial_result:
+            text = job.partial_result
+        elif job.state == JOB_QUEUED:
+            text = "Wartet auf einen freien Platz in der Warteschlange..."
+        else:
+            text = "Analyse läuft, bitte warten..."
 
-            # Schedule UI Update
-            self.window.after(0, self.analysis_complete, result_analysis)
+        self._displayed_markdown = text if job.finished_state or job.partial_result else ""
+        self.output_text.config(state=tk.NORMAL)
+        self.output_renderer.render(text)
+        self.output_text.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.DISABLED if job.finished_state else tk.NORMAL)
 
-        except Exception as e:
-            error_msg = f"Ein Fehler ist aufgetreten:\n{str(e)}"
-            self.window.after(0, self.analysis_complete, error_msg)
+    def queue_stream_delta(self, job, delta):
+        """Wird aus Hintergrund-Threads aufgerufen; plant ein gebündeltes Rendern des ausgewählten Auftrags."""
+        if job.id != self._selected_job_id:
+            return
+        with self._stream_lock:
+            if self._stream_flush_scheduled:
+                return
+            self._stream_flush_scheduled = True
+        self.window.after(STREAM_RENDER_INTERVAL_MS, self.flush_stream)
+
+    def flush_stream(self):
+        """Rendert den bisher empfangenen Text des ausgewählten Auftrags (läuft im Tk-Mainloop)."""
+        with self._stream_lock:
+            self._stream_flush_scheduled = False
+        job = self.job_queue.get(self._selected_job_id)
+        if job is None or job.state != JOB_RUNNING or not job.partial_result:
+            return
 
-    def analysis_complete(self, result_text):
+        self._displayed_markdown = job.partial_result
         self.output_text.config(state=tk.NORMAL)
-        self.output_text.delete(1.0, tk.END)
-        markdown_to_tkinter_text(result_text, self.output_text)
+        self.output_renderer.update(job.partial_result)
+        self.output_text.see(tk.END)
         self.output_text.config(state=tk.DISABLED)
+        self.status_var.set("Antwort wird empfangen...")
 
-        self.window.config(cursor="")
-        self.question_button.config(state=tk.NORMAL, text="Frage senden")
-        self.status_var.set("Analyse abgeschlossen")
+    @staticmethod
+    def _format_usage(usage):
+        if not usage or not usage["requests"]:
+            return ""
+        return (f" – {usage['prompt_tokens']} Prompt-Tokens "
+                f"(davon {usage['cached_tokens']} aus dem Prompt-Cache), "
+                f"{usage['completion_tokens']} Antwort-Tokens")
 
     def save_note(self):
-        self.notes
-        note = self.output_text.get(1.0, tk.END).strip()
+        note = self._displayed_markdown.strip() or self.output_text.get(1.0, tk.END).strip()
 
         if note:
             self.notes = [note]
@@ -405,27 +482,8 @@ class Gui():
         if not file_path:
             return
 
-        # Lazy import of reportlab to speed up application startup
-        from reportlab.lib.pagesizes import letter
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Spacer, Paragraph
-
-        pdf = SimpleDocTemplate(file_path, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
-
-        title = Paragraph("Notizen", styles["Heading1"])
-        story.append(title)
-        story.append(Spacer(1, 0.25 * inch))
-
-        for i, note in enumerate(self.notes, 1):
-            note_text = f"{i}. {note}"
-            wrapped_text = Paragraph(note_text, styles["Normal"])
-            story.append(wrapped_text)
-            story.append(Spacer(1, 0.1 * inch))
-
-        pdf.build(story)
+        # Die Notizen werden aus demselben Markdown-AST formatiert wie die Anzeige
+        export_notes_pdf(file_path, self.notes)
         # Inform user
         tk.messagebox.showinfo("Export erfolgreich",
                                "Notizen wurden als PDF exportiert!")
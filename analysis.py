@@ -1,203 +1,755 @@
+import codecs
+import contextvars
 import os
-from functools import lru_cache
+import re
+import sqlite3
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 
 import requests
-from bs4 import BeautifulSoup
 
-from config import get_api_key
+from cache import (content_cache_key, get_content_cache, get_llm_cache, llm_cache_key,
+                   normalize_url, WEBSITE_TTL, YOUTUBE_TTL, PDF_TTL)
+from budget import check_request
+from chunking import count_tokens, split_into_chunks
+from errors import ErrorMessage, is_error
+from extractors import get_extractor, PlainTextCollector
+from http_client import get_fetch_client
+from llm_client import get_openai_client, record_usage, OPENAI_READ_TIMEOUT
+from metrics import add_time, add_value, record_first, record_prompt, timed
+from pdf_extraction import extract_pdf_text
+from pdf_sessions import get_pdf_session_store, file_sha256
+from polling import backoff_delays, sleep_until_next_poll
+from combined_analysis import CombinedAnalysis, build_combined_messages, COMBINED_RESPONSE_FORMAT
+from prompts import MAP_PROMPT, REDUCE_PROMPT, PROMPT_INSTRUCTIONS, ALL_ANALYSES, build_messages
 from security import validate_url, SecurityException
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse, parse_qs
+
+# Füllmarken aus (automatischen) Untertiteln, z. B. "[Musik]" oder "(Applaus)"
+CAPTION_ARTEFACT_WORDS = ("musik", "music", "applaus", "applause", "beifall", "lachen", "gelächter",
+                          "laughter", "geräusche", "noise", "unverständlich", "inaudible", "stille",
+                          "silence")
+_CAPTION_ARTEFACT_RE = re.compile(
+    r"[\[(]\s*(?:" + "|".join(CAPTION_ARTEFACT_WORDS) + r")\s*[\])]|[♪♫]+", re.IGNORECASE)
+# Unsichtbare Zeichen (Zero-Width, BOM, weiches Trennzeichen)
+_INVISIBLE_RE = re.compile("[\u00ad\u200b-\u200d\u2060\ufeff]")
+_INLINE_WHITESPACE_RE = re.compile(r"[^\S\n]+")
+# Wiederholte Zeilen ab dieser Länge gelten als Boilerplate (Cookie-Hinweise, Fußzeilen)
+BOILERPLATE_MIN_CHARS = 80
+
+# Obergrenze für heruntergeladene Webseiten; längere Seiten werden abgeschnitten
+MAX_DOWNLOAD_BYTES = 5 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Map-Reduce-Analyse langer Inhalte
+MAX_CHUNK_TOKENS = 6000
+CHUNK_OVERLAP_TOKENS = 200
+MAP_WORKERS = 4
+MAX_MAP_LEVELS = 3
+LLM_MODEL = "gpt-4o"
+
+# PDF-Analyse über die Assistants API
+PDF_MODEL = "gpt-4o"
+PDF_INSTRUCTIONS = "Analyze the provided PDF document"
+# Gesamtlaufzeit eines Assistant-Runs und Abfrageintervalle für das Polling
+PDF_RUN_TIMEOUT = 300
+RUN_POLL_INITIAL = 0.25
+RUN_POLL_MAX = 4
+RUN_TERMINAL_STATES = ("completed", "failed", "cancelled", "expired", "incomplete", "requires_action")
 
 def is_pdf_file(filepath):
     _, fileextension = os.path.splitext(filepath)
     return fileextension.lower() == ".pdf"
 
+def extract_video_id(youtubelink):
+    """Returns the video ID of a youtube.com/watch or youtu.be link."""
+    parsed = urlparse(youtubelink.strip())
+    if parsed.hostname and parsed.hostname.lower().endswith("youtu.be"):
+        return parsed.path.lstrip("/").split("/")[0]
+    return parse_qs(parsed.query).get("v", [""])[0]
+
+
 @lru_cache(maxsize=32)
 
 def extract_transkript(youtubelink):
     from youtube_transcript_api import YouTubeTranscriptApi
-    if youtubelink.startswith("https://www.youtube.com/watch?v="):
-        video_id = youtubelink.split("v=")[1]
-    elif youtubelink.startswith("https://youtu.be/"):
-        video_id = youtubelink.split("be/")[1]
+    video_id = extract_video_id(youtubelink)
     transkript = YouTubeTranscriptApi.get_transcript(video_id, languages=['de', 'en'])
     # Optimization: Use join for O(n) performance instead of O(n^2) loop concatenation
     if not transkript:
         return ""
-    return " ".join(satz["text"] for satz in transkript) + " "
+    # Direkt wiederholte Untertitelzeilen nur einmal übernehmen; nach dem Zusammenfügen
+    # sind die Zeilengrenzen für normalize_text nicht mehr erkennbar
+    texts = [satz["text"] for satz in transkript]
+    return " ".join(text for i, text in enumerate(texts) if i == 0 or text != texts[i - 1]) + " "
+
+
+class UnsupportedContentType(Exception):
+    """Raised for responses that are neither HTML nor plain text."""
+    pass
+
+
+def _create_body_parser(content_type, encoding, backend=None, main_content=None):
+    """
+    Returns (parser, decoder) for a response body with the given Content-Type header.
+    encoding is only used if the header names a charset.
+    Raises UnsupportedContentType for content types that are not HTML or plain text.
+    """
+    mime_type = content_type.split(";")[0].strip().lower()
+    if mime_type == "text/plain":
+        parser = PlainTextCollector()
+    elif not mime_type or mime_type in HTML_CONTENT_TYPES:
+        parser = get_extractor(backend, main_content)
+    else:
+        raise UnsupportedContentType(mime_type)
+
+    encoding = encoding if encoding and "charset" in content_type.lower() else "utf-8"
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    return parser, decoder
 
 
-def extract_text_from_website(url):
+def _read_response_text(response, max_bytes=MAX_DOWNLOAD_BYTES, backend=None, main_content=None,
+                        cancel_token=None):
+    """
+    Streams the response body in chunks into an incremental parser.
+    At most max_bytes are read, so memory stays bounded regardless of page size.
+    backend and main_content select the HTML extractor (see extractors.get_extractor).
+    Returns an error message for content types that are not HTML or plain text.
+    Raises AnalysisCancelled if cancel_token is cancelled while reading.
+    """
+    try:
+        parser, decoder = _create_body_parser(response.headers.get("Content-Type", ""),
+                                              response.encoding, backend, main_content)
+    except UnsupportedContentType as e:
+        return ErrorMessage(f"Error: Unsupported content type: {e}")
+    # Download und Parsen sind verzahnt; die Parse-Zeit wird separat gemessen
+    started = time.perf_counter()
+    parse_time = 0.0
+    received = 0
+    try:
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            if cancel_token is not None:
+                cancel_token.check()
+            chunk = chunk[:max_bytes - received]
+            received += len(chunk)
+            parse_started = time.perf_counter()
+            parser.feed(decoder.decode(chunk))
+            parse_time += time.perf_counter() - parse_started
+            if received >= max_bytes:
+                break
+        parse_started = time.perf_counter()
+        parser.feed(decoder.decode(b"", final=True))
+        text = parser.close()
+        parse_time += time.perf_counter() - parse_started
+        return text
+    finally:
+        add_time("parse", parse_time)
+        add_time("fetch", time.perf_counter() - started - parse_time)
+
+
+def _fetch_options(client, cancel_token):
+    # Zeitlimits der Anfrage auf die verbleibende Zeit bis zur Deadline begrenzen
+    if cancel_token is None:
+        return {}
+    cancel_token.check()
+    return {"timeout": tuple(cancel_token.limit(timeout) for timeout in client.timeout)}
+
+
+def extract_text_from_website(url, max_bytes=MAX_DOWNLOAD_BYTES, backend=None, main_content=None,
+                              cancel_token=None):
     """
     Extracts text from a website, following redirects securely.
+    The body is streamed and parsed incrementally (see _read_response_text);
+    by default boilerplate such as navigation, footers and cookie banners is dropped.
+    A cancel_token is checked before every request and while reading the body;
+    its deadline also caps the request timeouts.
     """
-    session = requests.Session()
+    client = get_fetch_client()
     # Initial validation
     try:
         validate_url(url)
     except SecurityException as e:
-        return f"Security Error: {str(e)}"
-
+        return ErrorMessage(f"Security Error: {str(e)}")
+    # Cookies gelten nur innerhalb dieser Redirect-Kette
+    cookies = requests.cookies.RequestsCookieJar()
     try:
-        response = session.get(url, allow_redirects=False, timeout=10)
+        response = client.get(url, cookies=cookies, stream=True,
+                              **_fetch_options(client, cancel_token))
+    except SecurityException as e:
+        return ErrorMessage(f"Security Error: {str(e)}")
     except requests.exceptions.RequestException as e:
-        return f"Error fetching URL: {str(e)}"
-
-    redirects = 0
-    max_redirects = 5
-
-    while response.is_redirect and redirects < max_redirects:
-        redirect_url = response.headers.get('Location')
-        if not redirect_url:
-            break
+        return ErrorMessage(f"Error fetching URL: {str(e)}")
+    try:
+        redirects = 0
+        max_redirects = 5
 
-        # Handle relative redirects
-        redirect_url = urljoin(url, redirect_url)
+        while response.is_redirect and redirects < max_redirects:
+            redirect_url = response.headers.get('Location')
+            if not redirect_url:
+                break
 
-        # Validate the redirect target
-        try:
-            validate_url(redirect_url)
-        except SecurityException as e:
-            return f"Security Error on redirect: {str(e)}"
+            # Handle relative redirects
+            redirect_url = urljoin(url, redirect_url)
 
+            # Validate the redirect target
+            try:
+                validate_url(redirect_url)
+            except SecurityException as e:
+                return ErrorMessage(f"Security Error on redirect: {str(e)}")
+            cookies.update(response.cookies)
+            # Verbindung der Redirect-Antwort an den Pool zurückgeben
+            response.close()
+            try:
+                response = client.get(redirect_url, cookies=cookies, stream=True,
+                                      **_fetch_options(client, cancel_token))
+            except SecurityException as e:
+                return ErrorMessage(f"Security Error on redirect: {str(e)}")
+            except requests.exceptions.RequestException as e:
+                 return ErrorMessage(f"Error fetching redirect URL: {str(e)}")
+            redirects += 1
+            url = redirect_url
+
+        if redirects >= max_redirects:
+            return ErrorMessage("Error: Too many redirects")
+        # Now we have the final response
+        if response.status_code != 200:
+            return ErrorMessage(
+                f"Error: Failed to retrieve content (Status code: {response.status_code})")
         try:
-            response = session.get(redirect_url, allow_redirects=False, timeout=10)
+            return _read_response_text(response, max_bytes, backend, main_content, cancel_token)
         except requests.exceptions.RequestException as e:
-             return f"Error fetching redirect URL: {str(e)}"
+            return ErrorMessage(f"Error fetching URL: {str(e)}")
+    finally:
+        response.close()
+
+# TODO eigene funktionen für text und pdf <-- sieht wohl so aus dass ich d
 
-        redirects += 1
-        url = redirect_url
 
-    if redirects >= max_redirects:
-        return "Error: Too many redirects"
+def normalize_text(text, captions=False):
+    """
+    Compacts extracted text before it is cached and sent to the model:
+    NFC Unicode normalization, removal of invisible characters, whitespace
+    collapse within lines (indentation is kept), at most one blank line in a
+    row and removal of directly repeated lines and of repeated lines of at
+    least BOILERPLATE_MIN_CHARS characters. With captions=True (transcripts)
+    caption artefacts such as "[Musik]" are removed as well.
+    """
+    text = unicodedata.normalize("NFC", text)
+    text = _INVISIBLE_RE.sub("", text)
+    if captions:
+        text = _CAPTION_ARTEFACT_RE.sub("", text)
+
+    lines, seen_long, previous, blank = [], set(), None, False
+    for line in text.splitlines():
+        content = line.lstrip()
+        if not content.strip():
+            blank = bool(lines)
+            continue
+        # Einrückung bleibt erhalten (Code, Listen); Transkripte haben keine
+        indentation = "" if captions else line[:len(line) - len(content)]
+        line = indentation + _INLINE_WHITESPACE_RE.sub(" ", content).rstrip()
+        if line == previous:
+            continue
+        if len(line) >= BOILERPLATE_MIN_CHARS:
+            if line in seen_long:
+                continue
+            seen_long.add(line)
+        previous = line
+        if blank:
+            lines.append("")
+            blank = False
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def normalize_extracted(text, captions=False):
+    """
+    Applies normalize_text to an extractor result and records the size before
+    and after in characters (content_chars_raw, content_chars; see metrics).
+    Error messages are returned unchanged.
+    """
+    if not text or is_error(text):
+        return text
+    with timed("normalize"):
+        normalized = normalize_text(text, captions)
+    add_value("content_chars_raw", len(text))
+    add_value("content_chars", len(normalized))
+    return normalized
 
-    # Now we have the final response
-    if response.status_code != 200:
-        return f"Error: Failed to retrieve content (Status code: {response.status_code})"
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    text = soup.get_text()
-    return text
+def _cache_lookup(cache_key):
+    """Returns (cache, cached text); cache is None if the content cache is unavailable."""
+    try:
+        cache = get_content_cache()
+        return cache, cache.get(cache_key)
+    except sqlite3.Error:
+        # Ein defekter Cache darf die Analyse nicht verhindern
+        return None, None
 
-# TODO eigene funktionen für text und pdf <-- sieht wohl so aus dass ich d
+
+def _cache_store(cache, cache_key, ttl, text):
+    # Fehlermeldungen und leere Ergebnisse werden nie gespeichert
+    if cache is not None and text and not is_error(text):
+        try:
+            cache.set(cache_key, text, ttl=ttl)
+        except sqlite3.Error:
+            pass
 
 
-def text_extraction_youtube_website(filePath):
+def _cached_extraction(cache_key, ttl, extractor, source, captions=False):
+    """
+    Looks up extracted content in the persistent content cache and only calls
+    the extractor on a miss; its result is normalized (see normalize_extracted)
+    before it is cached. Error messages and empty results are never cached.
+    """
+    cache, cached = _cache_lookup(cache_key)
+    if cached is not None:
+        return cached
+
+    text = normalize_extracted(extractor(source), captions)
+    _cache_store(cache, cache_key, ttl, text)
+    return text
+
+
+def text_extraction_youtube_website(filePath, cancel_token=None):
     try:
+        if cancel_token is not None:
+            cancel_token.check()
 
         if "youtu" in filePath.lower():  # Erkennt verschiedene YouTube-URL-Formate
-            transkript = extract_transkript(filePath)
-            return transkript
+            cache_key = content_cache_key("youtube", extract_video_id(filePath))
+            return _cached_extraction(cache_key, YOUTUBE_TTL, extract_transkript, filePath,
+                                      captions=True)
         # website analyse
         elif "http" in filePath.lower():  # Erkennt verschiedene URL-Formate
-            text = extract_text_from_website(filePath)
-            return text
+            cache_key = content_cache_key("url", normalize_url(filePath))
+            return _cached_extraction(cache_key, WEBSITE_TTL,
+                                      partial(extract_text_from_website, cancel_token=cancel_token),
+                                      filePath)
         else:
             try:
                 with open(filePath, "r", encoding="utf-8") as file:
                     filePath_string = file.read()
-                    return filePath_string
+                    return normalize_extracted(filePath_string)
             except UnicodeDecodeError:
                 # Versuche andere Kodierungen, wenn UTF-8 fehlschlägt
                 with open(filePath, "r", encoding="latin-1") as file:
                     filePath_string = file.read()
-                    return filePath_string
+                    return normalize_extracted(filePath_string)
     except FileNotFoundError:
-        return "Fehler: Datei konnte nicht gefunden werden"
+        return ErrorMessage("Fehler: Datei konnte nicht gefunden werden")
     except Exception as e:
-        return f"Ein Fehler ist aufgetreten: {str(e)}"
+        return ErrorMessage(f"Ein Fehler ist aufgetreten: {str(e)}")
 
 
-def real_ai_analyse_fortext(text):
+def _llm_cache_lookup(model, messages, use_cache=True, params=None):
+    """Returns (cache, key, cached response); cache is None if caching is off or unavailable."""
+    if not use_cache:
+        return None, None, None
     try:
-        from openai import OpenAI
-        api_key = get_api_key()
+        cache = get_llm_cache()
+        key = llm_cache_key(model, messages, params)
+        return cache, key, cache.get(key)
+    except sqlite3.Error:
+        return None, None, None
 
-        if not api_key:
-            return "Fehler: Kein API-Schlüssel verfügbar"
 
-        client = OpenAI(api_key=api_key)
+def _llm_cache_store(cache, key, response_text):
+    # Fehlermeldungen (z. B. "Fehler bei der KI-Analyse") werden nie gespeichert
+    if cache is None or not response_text or is_error(response_text):
+        return
+    try:
+        cache.set(key, response_text)
+    except sqlite3.Error:
+        pass
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "user",
-                 "content": text}]
-        )
 
-        return response.choices[0].message.content
+def _request_options(cancel_token):
+    # Die Anfrage darf nicht länger laufen als bis zur Deadline der Analyse
+    if cancel_token is None:
+        return {}
+    cancel_token.check()
+    return {"timeout": cancel_token.limit(OPENAI_READ_TIMEOUT)}
+
+
+def real_ai_analyse_messages(messages, on_delta=None, use_cache=True, cancel_token=None):
+    """
+    Sends chat messages (see prompts.build_messages) and returns the response text.
+    If on_delta is given, the response is streamed and on_delta is called with
+    every text fragment as soon as it arrives (from the calling thread); cached
+    responses are passed to on_delta in one piece. Token usage, including
+    tokens served from the provider's prompt cache, is recorded via
+    llm_client.record_usage. A cancelled cancel_token aborts the request
+    (streams are closed between fragments). Latency, time to first token and
+    prompt size are recorded for the current job (see metrics).
+    """
+    cache, key, cached = _llm_cache_lookup(LLM_MODEL, messages, use_cache)
+    if cached is not None:
+        add_value("llm_cache_hits")
+        if on_delta is not None:
+            on_delta(cached)
+        return cached
+
+    # Zu große Prompts gar nicht erst hochladen
+    too_large = check_request(messages, LLM_MODEL)
+    if too_large:
+        return too_large
+
+    started = time.perf_counter()
+    try:
+        client = get_openai_client()
+        if client is None:
+            return ErrorMessage("Fehler: Kein API-Schlüssel verfügbar")
+        record_prompt(messages)
+        if on_delta is None:
+            response = client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                **_request_options(cancel_token)
+            )
+            record_usage(getattr(response, "usage", None))
+            result = response.choices[0].message.content
+        else:
+            stream = client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                stream=True,
+                # Der letzte Chunk enthält dann die Token-Nutzung
+                stream_options={"include_usage": True},
+                **_request_options(cancel_token)
+            )
+
+            parts = []
+            for chunk in stream:
+                if cancel_token is not None and cancel_token.cancelled:
+                    stream.close()
+                    cancel_token.check()
+                record_usage(getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        record_first("ttft_s", time.perf_counter() - started)
+                    parts.append(delta)
+                    on_delta(delta)
+            result = "".join(parts)
+
+        _llm_cache_store(cache, key, result)
+        return result
 
     except Exception as e:
-        return f"Fehler bei der KI-Analyse: {str(e)}"
+        return ErrorMessage(f"Fehler bei der KI-Analyse: {str(e)}")
+    finally:
+        add_time("llm", time.perf_counter() - started)
+
+
+def real_ai_analyse_fortext(text, use_cache=True):
+    return real_ai_analyse_messages([{"role": "user", "content": text}], use_cache=use_cache)
 
 
-def real_ai_analyse_forpdf(pdf_path, prompt):
+def real_ai_analyse_fortext_stream(text, on_delta, use_cache=True):
+    """
+    Streaming variant of real_ai_analyse_fortext.
+    on_delta is called with every text fragment as soon as it arrives (from the
+    calling thread); the complete response is returned at the end.
+    """
+    return real_ai_analyse_messages([{"role": "user", "content": text}], on_delta, use_cache)
+
+
+def _map_chunks(instruction, chunks, max_chunk_tokens=MAX_CHUNK_TOKENS,
+                overlap_tokens=CHUNK_OVERLAP_TOKENS, max_workers=MAP_WORKERS, use_cache=True,
+                cancel_token=None):
+    """
+    Map stage of the map-reduce analysis: analyses every chunk concurrently and
+    returns (partial results joined as text, None), or (None, error message).
+    Partial results that are still too long go through another map stage.
+    """
+    for level in range(MAX_MAP_LEVELS):
+        map_messages = [build_messages(chunk, MAP_PROMPT.format(index=i, total=len(chunks),
+                                                                instruction=instruction))
+                        for i, chunk in enumerate(chunks, 1)]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(map_messages))) as executor:
+            # Jede Anfrage läuft in einer Kopie des Kontexts (Token-Zählung, siehe track_usage)
+            futures = [executor.submit(contextvars.copy_context().run, real_ai_analyse_messages,
+                                       messages, use_cache=use_cache, cancel_token=cancel_token)
+                       for messages in map_messages]
+            partial_results = [future.result() for future in futures]
+
+        for result in partial_results:
+            if is_error(result):
+                return None, result
+
+        results = "\n\n".join(f"Teilergebnis {i}:\n{result}"
+                               for i, result in enumerate(partial_results, 1))
+        if count_tokens(results) <= max_chunk_tokens or level == MAX_MAP_LEVELS - 1:
+            break
+        # Teilergebnisse sind selbst zu lang: eine weitere Map-Stufe über die Teilergebnisse
+        chunks = split_into_chunks(results, max_chunk_tokens, overlap_tokens)
+    return results, None
+
+
+def real_ai_analyse_chunked(instruction, content, max_chunk_tokens=MAX_CHUNK_TOKENS,
+                            overlap_tokens=CHUNK_OVERLAP_TOKENS, max_workers=MAP_WORKERS,
+                            on_delta=None, use_cache=True, cancel_token=None):
+    """
+    Map-reduce analysis for long content.
+    The content is split into token-counted chunks, every chunk is analysed
+    concurrently (map) and the partial results are merged by a final call
+    (reduce). Content that fits into a single chunk is sent in one request.
+    If on_delta is given, the final request is streamed (see real_ai_analyse_messages).
+    With use_cache=False the LLM response cache is bypassed.
+    """
+    chunks = split_into_chunks(content, max_chunk_tokens, overlap_tokens)
+    if len(chunks) <= 1:
+        return real_ai_analyse_messages(build_messages(content, instruction), on_delta, use_cache,
+                                        cancel_token)
+
+    results, error = _map_chunks(instruction, chunks, max_chunk_tokens, overlap_tokens,
+                                 max_workers, use_cache, cancel_token)
+    if error:
+        return error
+    return real_ai_analyse_messages(
+        build_messages(results, REDUCE_PROMPT.format(instruction=instruction)), on_delta, use_cache,
+        cancel_token)
+
+
+def real_ai_analyse_combined(content, max_chunk_tokens=MAX_CHUNK_TOKENS,
+                             overlap_tokens=CHUNK_OVERLAP_TOKENS, max_workers=MAP_WORKERS,
+                             use_cache=True, cancel_token=None):
+    """
+    "Alle Analysen": requests summary, keywords, sentiment and topics in one
+    completion with structured JSON output and returns them as Markdown.
+    Long content is condensed by the map stage first, so the final request
+    still sends it only once.
+    """
+    chunks = split_into_chunks(content, max_chunk_tokens, overlap_tokens)
+    if len(chunks) > 1:
+        content, error = _map_chunks(PROMPT_INSTRUCTIONS[ALL_ANALYSES], chunks, max_chunk_tokens,
+                                     overlap_tokens, max_workers, use_cache, cancel_token)
+        if error:
+            return error
+    messages = build_combined_messages(content, partial_results=len(chunks) > 1)
+    params = {"response_format": COMBINED_RESPONSE_FORMAT}
+
+    cache, key, raw = _llm_cache_lookup(LLM_MODEL, messages, use_cache, params)
+    if raw is None:
+        too_large = check_request(messages, LLM_MODEL)
+        if too_large:
+            return too_large
+        try:
+            client = get_openai_client()
+            if client is None:
+                return ErrorMessage("Fehler: Kein API-Schlüssel verfügbar")
+            record_prompt(messages)
+            with timed("llm"):
+                response = client.chat.completions.create(model=LLM_MODEL, messages=messages,
+                                                          **params, **_request_options(cancel_token))
+            record_usage(getattr(response, "usage", None))
+            message = response.choices[0].message
+            # Bei strukturierter Ausgabe liefert eine Ablehnung keinen JSON-Inhalt, sondern refusal
+            refusal = getattr(message, "refusal", None)
+            if refusal:
+                return ErrorMessage(f"Fehler: Die KI hat die Analyse abgelehnt: {refusal}")
+            raw = message.content or ""
+        except Exception as e:
+            return ErrorMessage(f"Fehler bei der KI-Analyse: {str(e)}")
     try:
-        from openai import OpenAI
-        api_key = get_api_key()
-        if not api_key:
-            return "Fehler: Kein API-Schlüssel verfügbar"
-        client = OpenAI(api_key=api_key)
+        result = CombinedAnalysis.from_json(raw)
+    except ValueError as e:
+        return ErrorMessage(f"Fehler bei der KI-Analyse: {str(e)}")
+    _llm_cache_store(cache, key, raw)
+    return result.to_markdown()
+
+
+class RunTimeoutError(Exception):
+    """Raised when an assistant run does not finish before its deadline."""
+    pass
 
-        # For PDFs:
-        with open(pdf_path, "rb") as file_object:
-            file = client.files.create(
-                file=file_object,
-                purpose="assistants"
-            )
 
-        # Create an assistant
-        assistant = client.beta.assistants.create(
-            model="gpt-4o",
-            instructions="Analyze the provided PDF document",
-            tools=[{"type": "file_search"}]
+def _cancel_run(client, thread_id, run_id):
+    try:
+        client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+    except Exception:
+        pass
+
+
+def _poll_run(client, thread_id, run, deadline, cancel_token=None):
+    """Polls a run with exponential backoff until it reaches a terminal state."""
+    delays = backoff_delays(RUN_POLL_INITIAL, RUN_POLL_MAX)
+    while run.status not in RUN_TERMINAL_STATES:
+        if not sleep_until_next_poll(delays, deadline, cancel_token):
+            raise RunTimeoutError(run.id)
+        run = client.beta.threads.runs.retrieve(
+            thread_id=thread_id,
+            run_id=run.id
         )
+    return run
+
+
+def _run_expired(deadline, cancel_token):
+    return time.monotonic() > deadline or (cancel_token is not None and cancel_token.cancelled)
 
-        # Create a thread
-        thread = client.beta.threads.create()
 
-        # Create message with the PDF attached
-        message = client.beta.threads.messages.create(
-            thread_id=thread.id,
-            role="user",
-            content=[{
-                "type": "text",
-                "text": prompt
+def _stream_run(client, thread_id, assistant_id, deadline, on_run, cancel_token=None):
+    """
+    Starts a run through the streaming run-events API and returns the last
+    run object received, which is in a terminal state once the stream ends.
+    on_run is called with every run update so callers know the run ID.
+    Waiting for the next event ends at the deadline (read timeout) or as soon
+    as cancel_token is cancelled (the stream is closed from its callback).
+    """
+    run = None
+    timeout = min(OPENAI_READ_TIMEOUT, max(0.0, deadline - time.monotonic()))
+    with client.beta.threads.runs.stream(thread_id=thread_id, assistant_id=assistant_id,
+                                         timeout=timeout) as stream:
+        remove_callback = cancel_token.add_callback(stream.close) if cancel_token is not None else None
+        try:
+            for event in stream:
+                if event.event.startswith("thread.run.") and not event.event.startswith("thread.run.step."):
+                    run = event.data
+                    on_run(run)
+                    if run.status in RUN_TERMINAL_STATES:
+                        break
+                if _run_expired(deadline, cancel_token):
+                    raise RunTimeoutError(run.id if run else None)
+        except RunTimeoutError:
+            raise
+        except Exception as e:
+            # Lesefehler durch Zeitüberschreitung oder den vom Abbruch geschlossenen Stream
+            if _run_expired(deadline, cancel_token):
+                raise RunTimeoutError(run.id if run else None) from e
+            raise
+        finally:
+            if remove_callback is not None:
+                remove_callback()
+    if run is not None and run.status not in RUN_TERMINAL_STATES and _run_expired(deadline, cancel_token):
+        raise RunTimeoutError(run.id)
+    return run
+
+
+def _run_assistant(client, thread_id, assistant_id, deadline, cancel_token=None):
+    """
+    Runs the assistant on a thread and waits for a terminal state.
+    Uses run events pushed by the API; if streaming is unavailable or breaks
+    off, falls back to polling with backoff. Runs that exceed the deadline,
+    whose cancel_token is cancelled or that require an action (no function
+    tools are registered) are cancelled remotely.
+    """
+    started = []
+    try:
+        run = _stream_run(client, thread_id, assistant_id, deadline, started.append, cancel_token)
+    except RunTimeoutError:
+        if started:
+            _cancel_run(client, thread_id, started[-1].id)
+        raise
+    except Exception:
+        run = started[-1] if started else None
+
+    try:
+        if run is None or run.status not in RUN_TERMINAL_STATES:
+            if run is None:
+                run = client.beta.threads.runs.create(
+                    thread_id=thread_id,
+                    assistant_id=assistant_id
+                )
+            run = _poll_run(client, thread_id, run, deadline, cancel_token)
+    except RunTimeoutError:
+        _cancel_run(client, thread_id, run.id)
+        raise
+
+    if run.status == "requires_action":
+        _cancel_run(client, thread_id, run.id)
+    return run
+
+
+def real_ai_analyse_forpdf(pdf_path, prompt, cancel_token=None, sha256=None):
+    try:
+        client = get_openai_client()
+        if client is None:
+            return ErrorMessage("Fehler: Kein API-Schlüssel verfügbar")
+        # Datei, Vector Store und Assistent werden über PDFSessionStore wiederverwendet
+        sessions = get_pdf_session_store()
+        sessions.collect_garbage(client)
+        vector_store_id = sessions.get_vector_store(client, pdf_path, cancel_token, sha256=sha256)
+        assistant_id = sessions.get_assistant(client, PDF_MODEL, PDF_INSTRUCTIONS)
+
+        # Create a thread with the question and the PDF's vector store
+        thread = client.beta.threads.create(
+            messages=[{
+                "role": "user",
+                "content": prompt
             }],
-            attachments=[{
-                "file_id": file.id,
-                "tools": [{"type": "file_search"}]
-            }]
+            tool_resources={"file_search": {"vector_store_ids": [vector_store_id]}}
         )
 
-        # Run the assistant
-        run = client.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=assistant.id
-        )
+        try:
+            deadline = time.monotonic() + PDF_RUN_TIMEOUT
+            if cancel_token is not None and cancel_token.deadline is not None:
+                deadline = min(deadline, cancel_token.deadline)
+            run = _run_assistant(client, thread.id, assistant_id, deadline, cancel_token)
 
-        # Wait for completion
-        while run.status not in ["completed", "failed"]:
-            run = client.beta.threads.runs.retrieve(
-                thread_id=thread.id,
-                run_id=run.id
-            )
             if run.status == "failed":
-                return f"Error: {run.last_error}"
-            import time
-            time.sleep(1)
+                return ErrorMessage(f"Error: {run.last_error}")
+            if run.status == "incomplete":
+                return ErrorMessage(f"Error: Run incomplete ({run.incomplete_details})")
+            if run.status != "completed":
+                return ErrorMessage(f"Error: Run ended with status '{run.status}'")
+            # Get the response
+            messages = client.beta.threads.messages.list(
+                thread_id=thread.id
+            )
 
-        # Get the response
-        messages = client.beta.threads.messages.list(
-            thread_id=thread.id
-        )
+            # Return the assistant's response
+            for message in messages.data:
+                if message.role == "assistant":
+                    return message.content[0].text.value
+
+            return ErrorMessage("Fehler: Keine Antwort vom Assistenten erhalten")
+        except RunTimeoutError:
+            if cancel_token is not None and cancel_token.cancelled:
+                return ErrorMessage(f"Fehler: {cancel_token.reason}")
+            return ErrorMessage("Error: PDF analysis timed out")
+        finally:
+            # Threads werden nicht wiederverwendet
+            try:
+                client.beta.threads.delete(thread.id)
+            except Exception:
+                pass
 
-        # Return the assistant's response
-        for message in messages.data:
-            if message.role == "assistant":
-                return message.content[0].text.value
+    except Exception as e:
+        return ErrorMessage(f"Error analyzing PDF: {str(e)}")
 
-        return "No response received"
 
-    except Exception as e:
-        return f"Error analyzing PDF: {str(e)}"
+def analyse_pdf(pdf_path, instruction, on_delta=None, use_cache=True, combined=False,
+                cancel_token=None):
+    """
+    Analyses a local PDF file.
+    PDFs with a text layer are extracted locally (see pdf_extraction) and go
+    through the same chunked pipeline as websites, which avoids upload and
+    remote indexing. Scanned or encrypted PDFs fall back to the Assistants
+    upload path (real_ai_analyse_forpdf).
+    With combined=True extracted text is analysed by real_ai_analyse_combined.
+    """
+    try:
+        sha256 = file_sha256(pdf_path)
+    except OSError as e:
+        return ErrorMessage(f"Error analyzing PDF: {str(e)}")
+    cache_key = content_cache_key("pdf", sha256)
+    text = _cached_extraction(cache_key, PDF_TTL,
+                              partial(extract_pdf_text, cancel_token=cancel_token), pdf_path)
+    if cancel_token is not None and cancel_token.cancelled:
+        return ErrorMessage(f"Fehler: {cancel_token.reason}")
+    if not text:
+        return real_ai_analyse_forpdf(pdf_path, instruction, cancel_token=cancel_token,
+                                      sha256=sha256)
+    if combined:
+        return real_ai_analyse_combined(text, use_cache=use_cache, cancel_token=cancel_token)
+    return real_ai_analyse_chunked(instruction, text, on_delta=on_delta, use_cache=use_cache,
+                                   cancel_token=cancel_token)
@@ -0,0 +1,451 @@
+import asyncio
+import threading
+import time
+import weakref
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse, urlunparse
+
+from analysis import (text_extraction_youtube_website, analyse_pdf, _create_body_parser,
+                      UnsupportedContentType, _cache_lookup, _cache_store,
+                      _llm_cache_lookup, _llm_cache_store, normalize_extracted, LLM_MODEL,
+                      MAX_DOWNLOAD_BYTES, DOWNLOAD_CHUNK_SIZE, MAX_CHUNK_TOKENS,
+                      CHUNK_OVERLAP_TOKENS, MAX_MAP_LEVELS)
+from budget import check_request
+from cache import content_cache_key, normalize_url, WEBSITE_TTL
+from chunking import count_tokens, split_into_chunks
+from errors import ErrorMessage, is_error
+from http_client import CONNECT_TIMEOUT, READ_TIMEOUT, MAX_CONNECTIONS_PER_HOST
+from llm_client import get_async_openai_client, record_usage
+from metrics import add_time, add_value, record_first, record_prompt, timed
+from combined_analysis import CombinedAnalysis, build_combined_messages, COMBINED_RESPONSE_FORMAT
+from prompts import MAP_PROMPT, REDUCE_PROMPT, PROMPT_INSTRUCTIONS, ALL_ANALYSES, build_messages
+from security import resolve_and_validate_addresses, SecurityException
+
+# Obergrenzen für gleichzeitig laufende Arbeitsschritte pro Event-Loop
+FETCH_CONCURRENCY = 64
+# YouTube-Transkripte, lokale Dateien und PDFs haben keine Async-API und laufen in Threads
+BLOCKING_CONCURRENCY = 8
+LLM_CONCURRENCY = 16
+# Gesamtzahl der Verbindungen des Async-HTTP-Clients
+ASYNC_MAX_CONNECTIONS = 100
+MAX_REDIRECTS = 5
+
+
+@lru_cache(maxsize=None)
+def _host_slot_stream_class():
+    import httpx
+
+    class HostSlotStream(httpx.AsyncByteStream):
+        """Response body that gives its per-host slot back once the response is closed."""
+
+        def __init__(self, stream, semaphore):
+            self._stream = stream
+            self._semaphore = semaphore
+
+        async def __aiter__(self):
+            async for chunk in self._stream:
+                yield chunk
+
+        async def aclose(self):
+            semaphore, self._semaphore = self._semaphore, None
+            try:
+                await self._stream.aclose()
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+
+    return HostSlotStream
+
+
+class AsyncFetchClient:
+    """
+    Async counterpart of http_client.FetchClient based on httpx.AsyncClient.
+    Every request is validated with security.resolve_and_validate_addresses
+    and sent to the validated IP addresses, tried in order; the Host header
+    and TLS SNI/certificate checks keep the original hostname. Concurrency per
+    host is capped by a semaphore that is held until the response is closed.
+    """
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_connections=ASYNC_MAX_CONNECTIONS,
+                 max_connections_per_host=MAX_CONNECTIONS_PER_HOST):
+        import httpx
+        from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+        self._httpx = httpx
+        # Cookies werden nicht im Client gespeichert, sondern pro Redirect-Kette weitergereicht
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections),
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            follow_redirects=False,
+            trust_env=False)
+        self._max_connections_per_host = max_connections_per_host
+        # Nur Hosts mit laufenden oder wartenden Anfragen halten ihre Semaphore am Leben
+        self._host_semaphores = weakref.WeakValueDictionary()
+
+    def _host_semaphore(self, hostname):
+        semaphore = self._host_semaphores.get(hostname)
+        if semaphore is None:
+            semaphore = self._host_semaphores[hostname] = asyncio.Semaphore(
+                self._max_connections_per_host)
+        return semaphore
+
+    async def get(self, url, headers=None):
+        """
+        Sends a GET request without following redirects and returns the
+        streaming response; callers must close it with aclose(), which also
+        frees the host's slot. The request time is recorded as "fetch" stage,
+        the validation beforehand as "validation" stage.
+        Raises SecurityException if the target does not pass validation.
+        """
+        # getaddrinfo blockiert und läuft deshalb in einem Thread
+        addresses = await asyncio.to_thread(resolve_and_validate_addresses, url)
+        parsed = urlparse(url)
+        headers = dict(headers or {})
+        headers["Host"] = parsed.netloc.rsplit("@", 1)[-1]
+        extensions = {"sni_hostname": parsed.hostname} if parsed.scheme == "https" else {}
+
+        semaphore = self._host_semaphore(parsed.hostname)
+        await semaphore.acquire()
+        try:
+            with timed("fetch"):
+                response = await self._send_pinned(parsed, addresses, headers, extensions)
+        except BaseException:
+            semaphore.release()
+            raise
+        response.stream = _host_slot_stream_class()(response.stream, semaphore)
+        return response
+
+    async def _send_pinned(self, parsed, addresses, headers, extensions):
+        for index, ip in enumerate(addresses):
+            host = f"[{ip}]" if ":" in ip else ip
+            if parsed.port is not None:
+                host = f"{host}:{parsed.port}"
+            request = self._client.build_request(
+                "GET", urlunparse(parsed._replace(netloc=host)),
+                headers=headers, extensions=extensions)
+            try:
+                return await self._client.send(request, stream=True)
+            except (self._httpx.ConnectError, self._httpx.ConnectTimeout):
+                # Nächste validierte Adresse versuchen
+                if index == len(addresses) - 1:
+                    raise
+
+    @property
+    def errors(self):
+        """Exception type raised for transport errors."""
+        return self._httpx.HTTPError
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class _LoopResources:
+    """Semaphores and the fetch client; asyncio objects are bound to one event loop."""
+
+    def __init__(self):
+        self.fetch_client = AsyncFetchClient()
+        self.fetch = asyncio.Semaphore(FETCH_CONCURRENCY)
+        self.blocking = asyncio.Semaphore(BLOCKING_CONCURRENCY)
+        self.llm = asyncio.Semaphore(LLM_CONCURRENCY)
+
+
+_loop_resources = weakref.WeakKeyDictionary()
+_loop_resources_lock = threading.Lock()
+
+
+def _resources():
+    loop = asyncio.get_running_loop()
+    with _loop_resources_lock:
+        resources = _loop_resources.get(loop)
+        if resources is None:
+            resources = _loop_resources[loop] = _LoopResources()
+        return resources
+
+
+def _cookie_header(cookies, hostname):
+    values = cookies.get(hostname)
+    if not values:
+        return {}
+    return {"Cookie": "; ".join(f"{name}={value}" for name, value in values.items())}
+
+
+def _store_cookies(cookies, hostname, response):
+    # Cookies gelten nur für den Host, der sie gesetzt hat
+    for header in response.headers.get_list("set-cookie"):
+        name, _, value = header.split(";", 1)[0].partition("=")
+        if name.strip():
+            cookies.setdefault(hostname, {})[name.strip()] = value.strip()
+
+
+async def _read_response_text_async(response, max_bytes=MAX_DOWNLOAD_BYTES, backend=None,
+                                    main_content=None):
+    """Async variant of analysis._read_response_text for httpx responses."""
+    try:
+        parser, decoder = _create_body_parser(response.headers.get("Content-Type", ""),
+                                              response.charset_encoding, backend, main_content)
+    except UnsupportedContentType as e:
+        return ErrorMessage(f"Error: Unsupported content type: {e}")
+    started = time.perf_counter()
+    parse_time = 0.0
+    received = 0
+    try:
+        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+            chunk = chunk[:max_bytes - received]
+            received += len(chunk)
+            parse_started = time.perf_counter()
+            parser.feed(decoder.decode(chunk))
+            parse_time += time.perf_counter() - parse_started
+            if received >= max_bytes:
+                break
+        parse_started = time.perf_counter()
+        parser.feed(decoder.decode(b"", final=True))
+        text = parser.close()
+        parse_time += time.perf_counter() - parse_started
+        return text
+    finally:
+        add_time("parse", parse_time)
+        add_time("fetch", time.perf_counter() - started - parse_time)
+
+
+async def async_extract_text_from_website(url, max_bytes=MAX_DOWNLOAD_BYTES, backend=None,
+                                          main_content=None):
+    """
+    Async variant of analysis.extract_text_from_website with the same SSRF
+    checks: the initial URL and every redirect target are validated, and
+    connections go to the validated IP address only.
+    """
+    resources = _resources()
+    client = resources.fetch_client
+    cookies = {}
+
+    async with resources.fetch:
+        try:
+            response = await client.get(url)
+        except SecurityException as e:
+            return ErrorMessage(f"Security Error: {str(e)}")
+        except client.errors as e:
+            return ErrorMessage(f"Error fetching URL: {str(e)}")
+        try:
+            redirects = 0
+            while response.is_redirect and redirects < MAX_REDIRECTS:
+                redirect_url = response.headers.get("Location")
+                if not redirect_url:
+                    break
+                redirect_url = urljoin(url, redirect_url)
+
+                _store_cookies(cookies, urlparse(url).hostname, response)
+                await response.aclose()
+                try:
+                    response = await client.get(
+                        redirect_url,
+                        headers=_cookie_header(cookies, urlparse(redirect_url).hostname))
+                except SecurityException as e:
+                    return ErrorMessage(f"Security Error on redirect: {str(e)}")
+                except client.errors as e:
+                    return ErrorMessage(f"Error fetching redirect URL: {str(e)}")
+                redirects += 1
+                url = redirect_url
+
+            if redirects >= MAX_REDIRECTS:
+                return ErrorMessage("Error: Too many redirects")
+            if response.status_code != 200:
+                return ErrorMessage(
+                    f"Error: Failed to retrieve content (Status code: {response.status_code})")
+            try:
+                return await _read_response_text_async(response, max_bytes, backend, main_content)
+            except client.errors as e:
+                return ErrorMessage(f"Error fetching URL: {str(e)}")
+        finally:
+            await response.aclose()
+
+
+async def run_blocking(function, *args):
+    """Runs a blocking function in a worker thread, bounded by BLOCKING_CONCURRENCY."""
+    async with _resources().blocking:
+        return await asyncio.to_thread(function, *args)
+
+
+async def async_text_extraction_youtube_website(source, cancel_token=None):
+    """
+    Async variant of analysis.text_extraction_youtube_website. cancel_token is
+    only needed for the blocking paths; awaited steps stop with the task.
+    """
+    lowered = source.lower()
+    if "youtu" in lowered or "http" not in lowered:
+        return await run_blocking(text_extraction_youtube_website, source, cancel_token)
+
+    try:
+        cache_key = content_cache_key("url", normalize_url(source))
+        # Lokale SQLite-Zugriffe sind kurz und laufen direkt in der Event-Loop
+        cache, cached = _cache_lookup(cache_key)
+        if cached is not None:
+            return cached
+        text = normalize_extracted(await async_extract_text_from_website(source))
+        _cache_store(cache, cache_key, WEBSITE_TTL, text)
+        return text
+    except Exception as e:
+        return ErrorMessage(f"Ein Fehler ist aufgetreten: {str(e)}")
+
+
+async def async_ai_analyse_messages(messages, on_delta=None, use_cache=True):
+    """
+    Async variant of real_ai_analyse_messages using AsyncOpenAI.
+    If on_delta is given, the response is streamed and on_delta is called
+    with every text fragment (from the event loop thread).
+    """
+    cache, key, cached = _llm_cache_lookup(LLM_MODEL, messages, use_cache)
+    if cached is not None:
+        add_value("llm_cache_hits")
+        if on_delta is not None:
+            on_delta(cached)
+        return cached
+
+    too_large = check_request(messages, LLM_MODEL)
+    if too_large:
+        return too_large
+
+    try:
+        client = get_async_openai_client()
+        if client is None:
+            return ErrorMessage("Fehler: Kein API-Schlüssel verfügbar")
+        async with _resources().llm:
+            # Die Wartezeit auf einen freien Platz zählt nicht zur KI-Latenz
+            record_prompt(messages)
+            started = time.perf_counter()
+            try:
+                if on_delta is None:
+                    response = await client.chat.completions.create(model=LLM_MODEL,
+                                                                    messages=messages)
+                    record_usage(getattr(response, "usage", None))
+                    result = response.choices[0].message.content
+                else:
+                    stream = await client.chat.completions.create(
+                        model=LLM_MODEL, messages=messages, stream=True,
+                        stream_options={"include_usage": True})
+                    parts = []
+                    async for chunk in stream:
+                        record_usage(getattr(chunk, "usage", None))
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            if not parts:
+                                record_first("ttft_s", time.perf_counter() - started)
+                            parts.append(delta)
+                            on_delta(delta)
+                    result = "".join(parts)
+            finally:
+                # Auch fehlgeschlagene, abgelaufene und abgebrochene Anfragen zählen zur KI-Zeit
+                add_time("llm", time.perf_counter() - started)
+
+        _llm_cache_store(cache, key, result)
+        return result
+
+    except Exception as e:
+        return ErrorMessage(f"Fehler bei der KI-Analyse: {str(e)}")
+
+
+async def async_ai_analyse_fortext(text, on_delta=None, use_cache=True):
+    """Async variant of real_ai_analyse_fortext."""
+    return await async_ai_analyse_messages([{"role": "user", "content": text}], on_delta, use_cache)
+
+
+async def _async_map_chunks(instruction, chunks, max_chunk_tokens=MAX_CHUNK_TOKENS,
+                            overlap_tokens=CHUNK_OVERLAP_TOKENS, use_cache=True):
+    """Async variant of analysis._map_chunks; returns (results, None) or (None, error)."""
+    for level in range(MAX_MAP_LEVELS):
+        map_messages = [build_messages(chunk, MAP_PROMPT.format(index=i, total=len(chunks),
+                                                                instruction=instruction))
+                        for i, chunk in enumerate(chunks, 1)]
+        partial_results = await asyncio.gather(
+            *(async_ai_analyse_messages(messages, use_cache=use_cache) for messages in map_messages))
+
+        for result in partial_results:
+            if is_error(result):
+                return None, result
+
+        results = "\n\n".join(f"Teilergebnis {i}:\n{result}"
+                               for i, result in enumerate(partial_results, 1))
+        if count_tokens(results) <= max_chunk_tokens or level == MAX_MAP_LEVELS - 1:
+            break
+        chunks = split_into_chunks(results, max_chunk_tokens, overlap_tokens)
+    return results, None
+
+
+async def async_ai_analyse_chunked(instruction, content, max_chunk_tokens=MAX_CHUNK_TOKENS,
+                                   overlap_tokens=CHUNK_OVERLAP_TOKENS, on_delta=None,
+                                   use_cache=True):
+    """
+    Async variant of real_ai_analyse_chunked.
+    All map requests are started at once; LLM_CONCURRENCY bounds how many
+    are in flight across all analyses of the event loop.
+    """
+    chunks = split_into_chunks(content, max_chunk_tokens, overlap_tokens)
+    if len(chunks) <= 1:
+        return await async_ai_analyse_messages(build_messages(content, instruction), on_delta,
+                                               use_cache)
+
+    results, error = await _async_map_chunks(instruction, chunks, max_chunk_tokens,
+                                             overlap_tokens, use_cache)
+    if error:
+        return error
+    return await async_ai_analyse_messages(
+        build_messages(results, REDUCE_PROMPT.format(instruction=instruction)), on_delta, use_cache)
+
+
+async def async_ai_analyse_combined(content, max_chunk_tokens=MAX_CHUNK_TOKENS,
+                                    overlap_tokens=CHUNK_OVERLAP_TOKENS, use_cache=True):
+    """Async variant of real_ai_analyse_combined."""
+    chunks = split_into_chunks(content, max_chunk_tokens, overlap_tokens)
+    if len(chunks) > 1:
+        content, error = await _async_map_chunks(PROMPT_INSTRUCTIONS[ALL_ANALYSES], chunks,
+                                                 max_chunk_tokens, overlap_tokens, use_cache)
+        if error:
+            return error
+    messages = build_combined_messages(content, partial_results=len(chunks) > 1)
+    params = {"response_format": COMBINED_RESPONSE_FORMAT}
+
+    cache, key, raw = _llm_cache_lookup(LLM_MODEL, messages, use_cache, params)
+    if raw is None:
+        too_large = check_request(messages, LLM_MODEL)
+        if too_large:
+            return too_large
+        try:
+            client = get_async_openai_client()
+            if client is None:
+                return ErrorMessage("Fehler: Kein API-Schlüssel verfügbar")
+            async with _resources().llm:
+                record_prompt(messages)
+                with timed("llm"):
+                    response = await client.chat.completions.create(model=LLM_MODEL,
+                                                                    messages=messages, **params)
+            record_usage(getattr(response, "usage", None))
+            message = response.choices[0].message
+            # Bei strukturierter Ausgabe liefert eine Ablehnung keinen JSON-Inhalt, sondern refusal
+            refusal = getattr(message, "refusal", None)
+            if refusal:
+                return ErrorMessage(f"Fehler: Die KI hat die Analyse abgelehnt: {refusal}")
+            raw = message.content or ""
+        except Exception as e:
+            return ErrorMessage(f"Fehler bei der KI-Analyse: {str(e)}")
+    try:
+        result = CombinedAnalysis.from_json(raw)
+    except ValueError as e:
+        return ErrorMessage(f"Fehler bei der KI-Analyse: {str(e)}")
+    _llm_cache_store(cache, key, raw)
+    return result.to_markdown()
+
+
+async def async_analyse_pdf(pdf_path, instruction, on_delta=None, use_cache=True, combined=False,
+                            cancel_token=None):
+    """
+    Runs analysis.analyse_pdf in a worker thread: local extraction uses a
+    process pool and the upload path the Assistants API, both blocking.
+    on_delta is then called from that worker thread. Cancelling the task does
+    not stop the thread, so cancel_token is passed on to it.
+    """
+    return await run_blocking(analyse_pdf, pdf_path, instruction, on_delta, use_cache, combined,
+                              cancel_token)
+
@@ -0,0 +1,167 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pipeline
+from cancellation import CancellationToken
+from config import check_api_key_exists, get_analysis_timeout
+from errors import ErrorMessage
+from metrics import export_job_metrics
+from profiling import PROFILE_MODES, get_profile_mode, profiling
+from prompts import PROMPT_TYPES
+
+# Standardanzahl paralleler Analysen im Batch-Modus
+BATCH_WORKERS = 4
+DEFAULT_PROMPT_TYPE = "Zusammenfassung"
+
+
+def parse_input_line(line, default_prompt_type=DEFAULT_PROMPT_TYPE):
+    """
+    Parses one input line into a job dict, or returns None for empty lines and comments.
+    Lines are either JSON objects with "source", "prompt_type" and "prompt" or
+    tab-separated "source[<TAB>prompt type[<TAB>custom prompt]]".
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    if line.startswith("{"):
+        data = json.loads(line)
+        job = {"source": data.get("source", ""),
+               "prompt_type": data.get("prompt_type") or default_prompt_type,
+               "prompt": data.get("prompt", "")}
+    else:
+        parts = line.split("\t")
+        job = {"source": parts[0].strip(),
+               "prompt_type": parts[1].strip() if len(parts) > 1 and parts[1].strip() else default_prompt_type,
+               "prompt": parts[2].strip() if len(parts) > 2 else ""}
+
+    if not job["source"]:
+        raise ValueError("Eintrag ohne Quelle")
+    if job["prompt_type"] not in PROMPT_TYPES:
+        raise ValueError(f"Unbekannter Prompt-Typ: {job['prompt_type']}")
+    return job
+
+
+def read_jobs(lines, default_prompt_type=DEFAULT_PROMPT_TYPE):
+    jobs = []
+    for number, line in enumerate(lines, start=1):
+        try:
+            job = parse_input_line(line, default_prompt_type)
+        except ValueError as e:
+            raise ValueError(f"Zeile {number}: {e}") from e
+        if job is not None:
+            jobs.append(job)
+    return jobs
+
+
+def run_job(index, job, use_cache=True, timeout=None):
+    """
+    Analyses one source and returns the JSONL record including per-step timings.
+    With a timeout in seconds the job is aborted once it runs longer.
+    """
+    details = {}
+    started = time.perf_counter()
+    try:
+        result = pipeline.analyse_source(job["source"], job["prompt_type"], job["prompt"],
+                                         details=details, use_cache=use_cache,
+                                         cancel_token=CancellationToken(timeout))
+    except Exception as e:
+        result = ErrorMessage(f"Ein Fehler ist aufgetreten: {e}")
+    total = time.perf_counter() - started
+    status = "error" if pipeline.is_error_result(result) else "ok"
+    export_job_metrics(job["source"], job["prompt_type"], status, total, details)
+
+    return {
+        "index": index,
+        "source": job["source"],
+        "prompt_type": job["prompt_type"],
+        "status": status,
+        "result": result,
+        "usage": details.get("usage"),
+        "metrics": details.get("metrics"),
+        "timings": {
+            "extraction_s": round(details.get("extraction_s", 0.0), 3),
+            "analysis_s": round(details.get("analysis_s", 0.0), 3),
+            "total_s": round(total, 3),
+        },
+    }
+
+
+def run_batch(jobs, output, max_workers=BATCH_WORKERS, use_cache=True, timeout=None):
+    """
+    Runs the jobs on a bounded thread pool and writes one JSON line per job to
+    output as soon as it finishes. Returns the number of failed jobs.
+    """
+    write_lock = threading.Lock()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(run_job, index, job, use_cache, timeout) for index, job in enumerate(jobs)]
+        for future in as_completed(futures):
+            record = future.result()
+            if record["status"] != "ok":
+                failed += 1
+            with write_lock:
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="main.py --batch",
+        description="Analysiert Websites, YouTube-Videos und PDFs ohne GUI.")
+    parser.add_argument("input", help="Datei mit einer Quelle pro Zeile oder '-' für stdin")
+    parser.add_argument("-o", "--output", help="JSONL-Ausgabedatei (Standard: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=BATCH_WORKERS,
+                        help=f"Anzahl paralleler Analysen (Standard: {BATCH_WORKERS})")
+    parser.add_argument("-p", "--prompt-type", default=DEFAULT_PROMPT_TYPE, choices=PROMPT_TYPES,
+                        help="Prompt-Typ für Zeilen ohne eigenen Prompt-Typ")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Gespeicherte KI-Antworten ignorieren")
+    parser.add_argument("--timeout", type=float, default=get_analysis_timeout(),
+                        help="Zeitlimit pro Quelle in Sekunden, 0 für unbegrenzt "
+                             "(Standard: KI_ANALYSIS_TIMEOUT bzw. %(default)g)")
+    parser.add_argument("--profile", nargs="?", const="all", choices=PROFILE_MODES,
+                        help="Worker-Threads profilieren: pstats (cprofile), Collapsed Stacks "
+                             "(sampling) oder beides (all, Standard; auch via KI_PROFILE)")
+    args = parser.parse_args(argv)
+
+    try:
+        profile_mode = args.profile or get_profile_mode()
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if not check_api_key_exists():
+        print("Kein API-Key gefunden (OPENAI_API_KEY oder config.ini).", file=sys.stderr)
+        return 2
+
+    try:
+        if args.input == "-":
+            jobs = read_jobs(sys.stdin, args.prompt_type)
+        else:
+            with open(args.input, encoding="utf-8") as input_file:
+                jobs = read_jobs(input_file, args.prompt_type)
+    except (OSError, ValueError) as e:
+        print(f"Fehler beim Lesen der Eingabe: {e}", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    with profiling(profile_mode):
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output:
+                failed = run_batch(jobs, output, args.workers, not args.no_cache, args.timeout)
+        else:
+            failed = run_batch(jobs, sys.stdout, args.workers, not args.no_cache, args.timeout)
+
+    print(f"{len(jobs)} Quellen analysiert, {failed} Fehler, "
+          f"{time.perf_counter() - started:.1f} s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
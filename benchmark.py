@@ -0,0 +1,428 @@
+"""
+Offline benchmarks for extraction, Markdown rendering and the analysis flow.
+
+A local HTTP server provides a corpus of HTML pages (small to huge) and
+redirect chains as well as a fake OpenAI-compatible chat completions
+endpoint with configurable latency and streaming, so no network access or
+API key is needed. Every stage reports throughput, p50/p95 latency and the
+peak of Python memory allocations (measured in a separate traced run, since
+tracemalloc slows down the timed runs); the report is written as JSON.
+
+    python benchmark.py -o report.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, ExitStack
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import urlparse
+
+BENCHMARK_ITERATIONS = 20
+# Größen der Testseiten in Bytes; "huge" liegt über analysis.MAX_DOWNLOAD_BYTES
+PAGE_SIZES = {"small": 5 * 1024, "medium": 200 * 1024, "large": 2 * 1024 * 1024,
+              "huge": 8 * 1024 * 1024}
+REDIRECT_HOPS = 3
+MARKDOWN_LINES = 5000
+ASYNC_JOBS = 16
+
+# Verhalten des Fake-Endpunkts
+LLM_LATENCY = 0.05
+LLM_CHUNK_DELAY = 0.002
+LLM_STREAM_CHUNKS = 40
+
+STAGES = ["fetch_small", "fetch_medium", "fetch_large", "fetch_huge", "redirect_chain",
+          "markdown_render", "markdown_tk", "llm_completion", "llm_stream", "pipeline",
+          "async_pipeline"]
+
+PARAGRAPH = ("<p>Die Analyse verarbeitet <b>lange Texte</b> aus Webseiten, Videos und PDFs "
+             "und fasst sie mit einem Sprachmodell zusammen.</p>\n")
+
+
+def build_page(size):
+    """HTML page of roughly size bytes with navigation noise and many paragraphs."""
+    head = ("<html><head><title>Benchmark</title><script>var x = 1;</script></head><body>"
+            "<nav><a href='/'>Start</a></nav><article>\n")
+    count = max(1, (size - len(head)) // len(PARAGRAPH))
+    return (head + PARAGRAPH * count + "</article><footer>Impressum</footer></body></html>").encode()
+
+
+class _BenchmarkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    pages = {}
+    llm_latency = LLM_LATENCY
+    llm_chunk_delay = LLM_CHUNK_DELAY
+    llm_stream_chunks = LLM_STREAM_CHUNKS
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        parts = parsed.path.strip("/").split("/")
+        if parts[0] == "redirect" and len(parts) == 2:
+            hops = int(parts[1])
+            target = f"/redirect/{hops - 1}" if hops > 1 else "/page/small"
+            self.send_response(302)
+            self.send_header("Location", target)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if parts[0] == "page" and len(parts) == 2 and parts[1] in self.pages:
+            body = self.pages[parts[1]]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # Der Client bricht zu große Seiten nach MAX_DOWNLOAD_BYTES ab
+                self.close_connection = True
+            return
+        self.send_error(404)
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in request["messages"]) // 4
+        time.sleep(self.llm_latency)
+        if request.get("stream"):
+            self._stream_completion(request, prompt_tokens)
+        else:
+            self._send_completion(request, prompt_tokens)
+
+    def _completion_text(self):
+        return "## Zusammenfassung\n" + " ".join(f"Punkt {i}." for i in range(self.llm_stream_chunks))
+
+    def _usage(self, prompt_tokens, completion_tokens):
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0}}
+
+    def _send_completion(self, request, prompt_tokens):
+        text = self._completion_text()
+        body = json.dumps({
+            "id": "chatcmpl-benchmark", "object": "chat.completion", "created": 0,
+            "model": request["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": self._usage(prompt_tokens, len(text) // 4),
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_completion(self, request, prompt_tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(data):
+            self.wfile.write(f"data: {data}\n\n".encode())
+            self.wfile.flush()
+
+        text = self._completion_text()
+        parts = text.split(" ")
+        for index, part in enumerate(parts):
+            send(json.dumps({
+                "id": "chatcmpl-benchmark", "object": "chat.completion.chunk", "created": 0,
+                "model": request["model"],
+                "choices": [{"index": 0, "finish_reason": None,
+                             "delta": {"content": part if index == 0 else " " + part}}],
+            }))
+            time.sleep(self.llm_chunk_delay)
+        if request.get("stream_options", {}).get("include_usage"):
+            send(json.dumps({"id": "chatcmpl-benchmark", "object": "chat.completion.chunk",
+                             "created": 0, "model": request["model"], "choices": [],
+                             "usage": self._usage(prompt_tokens, len(text) // 4)}))
+        send("[DONE]")
+
+
+class BenchmarkServer:
+    """Serves the page corpus and the fake OpenAI endpoint on 127.0.0.1."""
+
+    def __init__(self, page_sizes=None, llm_latency=LLM_LATENCY, llm_chunk_delay=LLM_CHUNK_DELAY):
+        handler = type("Handler", (_BenchmarkHandler,), {
+            "pages": {name: build_page(size) for name, size in (page_sizes or PAGE_SIZES).items()},
+            "llm_latency": llm_latency,
+            "llm_chunk_delay": llm_chunk_delay,
+        })
+        self.pages = handler.pages
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@contextmanager
+def offline_environment(server):
+    """
+    Points the app at the benchmark server: the SSRF check accepts exactly the
+    server's loopback address (everything else is still validated), the
+    OpenAI clients use the fake endpoint and caches go to a temporary directory.
+    Only the benchmark harness uses this; the application code is unchanged.
+    """
+    import config
+    import llm_client
+    import security
+
+    validate = security.resolve_and_validate_addresses
+    server_host = urlparse(server.base_url).hostname
+
+    def resolve_benchmark_server(url):
+        if urlparse(url).hostname == server_host:
+            return [server_host]
+        return validate(url)
+
+    with ExitStack() as stack, tempfile.TemporaryDirectory() as cache_dir:
+        for target in ("security.resolve_and_validate_addresses",
+                       "http_client.resolve_and_validate_addresses",
+                       "async_analysis.resolve_and_validate_addresses"):
+            stack.enter_context(patch(target, side_effect=resolve_benchmark_server))
+        stack.enter_context(patch.dict(os.environ, {"OPENAI_BASE_URL": server.base_url + "/v1",
+                                                     "KI_CACHE_DIR": cache_dir}))
+        stack.enter_context(patch.object(config, "CURRENT_API_KEY", "benchmark-key"))
+        for name in ("_client", "_client_api_key", "_async_client", "_async_client_key"):
+            stack.enter_context(patch.object(llm_client, name, None))
+        stack.enter_context(patch("cache._content_cache", None))
+        stack.enter_context(patch("cache._llm_cache", None))
+        yield
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def traced_peak(function):
+    """Peak of Python memory allocations in bytes while function() runs."""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        function()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def measure(function, iterations, size_of=None):
+    """
+    Calls function(i) iterations times after one warm-up call and returns the
+    stage statistics. size_of(result) may return the processed bytes for MB/s.
+    """
+    function(-1)
+    durations = []
+    processed = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        result = function(i)
+        durations.append(time.perf_counter() - call_started)
+        if size_of is not None:
+            processed += size_of(result)
+    total = time.perf_counter() - started
+    peak = traced_peak(lambda: function(iterations))
+    return _stage_report(durations, total, iterations, processed, peak)
+
+
+def _stage_report(durations, total, operations, processed, peak):
+    report = {
+        "iterations": operations,
+        "throughput_ops": round(operations / total, 3) if total else None,
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 3),
+        "peak_memory_bytes": peak,
+    }
+    if processed:
+        report["throughput_mb_s"] = round(processed / total / 1024 / 1024, 3)
+    return report
+
+
+def _checked(function):
+    """Wraps a stage so that error results abort the benchmark instead of being timed."""
+    from pipeline import is_error_result
+
+    def call(i):
+        result = function(i)
+        if is_error_result(result):
+            raise RuntimeError(f"Benchmark-Stufe lieferte einen Fehler: {result[:200]}")
+        return result
+    return call
+
+
+def _benchmark_markdown():
+    lines = []
+    for i in range(MARKDOWN_LINES // 5):
+        lines += [f"## Abschnitt {i}", f"Text mit **fett**, *kursiv* und `code` Nr. {i}",
+                  f"- Punkt mit [Link](https://example.com/{i})", "> Zitat", ""]
+    return "\n".join(lines)
+
+
+def _run_markdown_tk(text, iterations):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        return {"skipped": f"Tk nicht verfügbar: {e}"}
+    from markdown_formatter import configure_markdown_tags, markdown_to_tkinter_text
+    try:
+        root.withdraw()
+        widget = tk.Text(root)
+        configure_markdown_tags(widget)
+        # Abschnittsnummer pro Durchlauf variieren, damit der AST-Cache nicht greift
+        return measure(lambda i: (markdown_to_tkinter_text(f"# Lauf {i}\n{text}", widget),
+                                  root.update_idletasks()),
+                       iterations)
+    finally:
+        root.destroy()
+
+
+async def _run_async_pipeline(base_url, jobs):
+    from pipeline import async_analyse_source, is_error_result
+
+    async def one(index):
+        started = time.perf_counter()
+        result = await async_analyse_source(f"{base_url}/page/medium?async={index}",
+                                            "Zusammenfassung", use_cache=False)
+        if is_error_result(result):
+            raise RuntimeError(f"Benchmark-Stufe lieferte einen Fehler: {result[:200]}")
+        return time.perf_counter() - started
+
+    return await asyncio.gather(*(one(index) for index in range(jobs)))
+
+
+def run_benchmarks(iterations=BENCHMARK_ITERATIONS, stages=None, page_sizes=None,
+                   llm_latency=LLM_LATENCY, llm_chunk_delay=LLM_CHUNK_DELAY, async_jobs=ASYNC_JOBS):
+    """Runs the selected stages (default: all) and returns the report as dict."""
+    stages = stages or STAGES
+    results = {}
+    with BenchmarkServer(page_sizes, llm_latency, llm_chunk_delay) as server, \
+            offline_environment(server):
+        # Anwendungsmodule erst hier importieren, damit Caches im Testverzeichnis landen
+        import analysis
+        import pipeline
+        from markdown_ast import parse_markdown
+        from markdown_formatter import render_markdown
+        from prompts import build_messages
+
+        for name in [stage for stage in stages if stage.startswith("fetch_")]:
+            size = name[len("fetch_"):]
+            if size not in server.pages:
+                continue
+            url = f"{server.base_url}/page/{size}"
+            results[name] = measure(_checked(lambda i: analysis.extract_text_from_website(url)), iterations,
+                                    lambda text: min(len(server.pages[size]),
+                                                     analysis.MAX_DOWNLOAD_BYTES))
+
+        if "redirect_chain" in stages:
+            url = f"{server.base_url}/redirect/{REDIRECT_HOPS}"
+            results["redirect_chain"] = measure(
+                _checked(lambda i: analysis.extract_text_from_website(url)), iterations)
+
+        markdown = _benchmark_markdown()
+        if "markdown_render" in stages:
+            results["markdown_render"] = measure(
+                lambda i: render_markdown(f"# Lauf {i}\n{markdown}"), iterations,
+                lambda result: len(result[0].encode()))
+            results["markdown_render"]["cached_parse_ms"] = round(
+                measure(lambda i: parse_markdown(markdown), iterations)["p50_ms"], 3)
+        if "markdown_tk" in stages:
+            results["markdown_tk"] = _run_markdown_tk(markdown, iterations)
+
+        messages = build_messages("Ein kurzer Text über Benchmarks. " * 200, "Fasse zusammen:")
+        if "llm_completion" in stages:
+            results["llm_completion"] = measure(
+                _checked(lambda i: analysis.real_ai_analyse_messages(messages, use_cache=False)),
+                iterations)
+        if "llm_stream" in stages:
+            results["llm_stream"] = measure(
+                _checked(lambda i: analysis.real_ai_analyse_messages(
+                    messages, on_delta=lambda delta: None, use_cache=False)), iterations)
+
+        if "pipeline" in stages:
+            results["pipeline"] = measure(
+                _checked(lambda i: pipeline.analyse_source(f"{server.base_url}/page/medium?run={i}",
+                                                           "Zusammenfassung", use_cache=False)),
+                iterations)
+
+        if "async_pipeline" in stages:
+            started = time.perf_counter()
+            durations = asyncio.run(_run_async_pipeline(server.base_url, async_jobs))
+            total = time.perf_counter() - started
+            peak = traced_peak(lambda: asyncio.run(_run_async_pipeline(server.base_url, async_jobs)))
+            results["async_pipeline"] = _stage_report(durations, total, async_jobs, 0, peak)
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "version": _git_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"iterations": iterations, "llm_latency_s": llm_latency,
+                     "llm_chunk_delay_s": llm_chunk_delay, "async_jobs": async_jobs},
+        "stages": results,
+    }
+
+
+def _git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True,
+                              text=True, timeout=5,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline-Benchmarks für Extraktion, Rendering und Analyse.")
+    parser.add_argument("-o", "--output", help="JSON-Bericht (Standard: stdout)")
+    parser.add_argument("-n", "--iterations", type=int, default=BENCHMARK_ITERATIONS,
+                        help=f"Durchläufe pro Stufe (Standard: {BENCHMARK_ITERATIONS})")
+    parser.add_argument("-s", "--stage", action="append", choices=STAGES,
+                        help="Nur diese Stufe ausführen (mehrfach möglich)")
+    parser.add_argument("--llm-latency", type=float, default=LLM_LATENCY,
+                        help="Antwortverzögerung des Fake-Endpunkts in Sekunden")
+    parser.add_argument("--llm-chunk-delay", type=float, default=LLM_CHUNK_DELAY,
+                        help="Verzögerung zwischen gestreamten Fragmenten in Sekunden")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.iterations, args.stage, llm_latency=args.llm_latency,
+                            llm_chunk_delay=args.llm_chunk_delay)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
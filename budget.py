@@ -0,0 +1,105 @@
+from collections import namedtuple
+
+from chunking import count_tokens, truncate_tokens
+from config import get_budget_strategy, get_token_budget
+from errors import ErrorMessage
+from metrics import add_value
+from prompts import build_messages
+
+# Eingabe-Kontextfenster und Preise in USD pro 1 Mio. Tokens (Eingabe, Ausgabe)
+MODEL_CONTEXT_TOKENS = {"gpt-4o": 128000, "gpt-4o-mini": 128000}
+MODEL_PRICES = {"gpt-4o": (2.50, 10.00), "gpt-4o-mini": (0.15, 0.60)}
+DEFAULT_CONTEXT_TOKENS = 128000
+# Zusätzliche Tokens des Chat-Formats pro Nachricht und für den Beginn der Antwort
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+# Erwartete Antwortlänge für Kosten- und Latenzschätzung
+EXPECTED_OUTPUT_TOKENS = 800
+# Latenzmodell: feste Grundlatenz, Verarbeitung des Prompts, Generierung der Antwort
+BASE_LATENCY_S = 0.4
+PROMPT_TOKENS_PER_S = 4000
+OUTPUT_TOKENS_PER_S = 60
+
+STRATEGY_TRUNCATE = "truncate"
+STRATEGY_HEAD_TAIL = "head_tail"
+STRATEGY_CHUNKED = "chunked"
+# Markiert die Stelle, an der Inhalt weggelassen wurde
+OMISSION_MARKER = "\n\n[…]\n\n"
+
+
+class Preflight(namedtuple("Preflight", "prompt_tokens output_tokens cost_usd latency_s")):
+    """Token count, estimated cost in USD and estimated latency in seconds of one request."""
+    __slots__ = ()
+
+
+def count_message_tokens(messages, model="gpt-4o"):
+    """Counts the prompt tokens of chat messages including the chat format overhead."""
+    return REPLY_OVERHEAD_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + count_tokens(str(message.get("content", "")), model)
+        for message in messages)
+
+
+def estimate_cost(prompt_tokens, output_tokens, model="gpt-4o"):
+    """Returns the estimated cost in USD, or None for models without a known price."""
+    if model not in MODEL_PRICES:
+        return None
+    input_price, output_price = MODEL_PRICES[model]
+    return (prompt_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def estimate_latency(prompt_tokens, output_tokens):
+    return BASE_LATENCY_S + prompt_tokens / PROMPT_TOKENS_PER_S + output_tokens / OUTPUT_TOKENS_PER_S
+
+
+def preflight(messages, model="gpt-4o", output_tokens=EXPECTED_OUTPUT_TOKENS):
+    prompt_tokens = count_message_tokens(messages, model)
+    return Preflight(prompt_tokens, output_tokens, estimate_cost(prompt_tokens, output_tokens, model),
+                     estimate_latency(prompt_tokens, output_tokens))
+
+
+def check_request(messages, model="gpt-4o"):
+    """
+    Preflight before a request is sent: records the estimate for the current
+    job (see metrics) and returns an error message if the prompt does not fit
+    into the model's context window, otherwise None.
+    """
+    estimate = preflight(messages, model)
+    add_value("preflight_tokens", estimate.prompt_tokens)
+    add_value("preflight_latency_s", round(estimate.latency_s, 3))
+    if estimate.cost_usd is not None:
+        add_value("preflight_cost_usd", round(estimate.cost_usd, 6))
+
+    limit = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+    if estimate.prompt_tokens + estimate.output_tokens > limit:
+        return ErrorMessage(f"Fehler: Anfrage zu groß ({estimate.prompt_tokens} Tokens, "
+                            f"Modell {model} erlaubt {limit})")
+    return None
+
+
+def fit_content(content, instruction, model="gpt-4o", budget=None, strategy=None):
+    """
+    Applies the token budget (config.get_token_budget) to the content of a
+    single request with the given instruction. Returns (content, chunked):
+    content that fits is returned unchanged; otherwise "truncate" keeps the
+    beginning, "head_tail" keeps beginning and end and "chunked" returns the
+    content with chunked=True so the caller switches to the map-reduce analysis.
+    """
+    budget = get_token_budget() if budget is None else budget
+    strategy = strategy or get_budget_strategy()
+    available = budget - count_message_tokens(build_messages("", instruction), model)
+    content_tokens = count_tokens(content, model)
+    if content_tokens <= available:
+        return content, False
+    if strategy == STRATEGY_CHUNKED:
+        add_value("budget_chunked")
+        return content, True
+
+    available -= count_tokens(OMISSION_MARKER, model)
+    if strategy == STRATEGY_HEAD_TAIL:
+        head = truncate_tokens(content, available - available // 2, model)
+        tail = truncate_tokens(content, available // 2, model, from_end=True)
+        fitted = head + OMISSION_MARKER + tail
+    else:
+        fitted = truncate_tokens(content, available, model) + OMISSION_MARKER
+    add_value("budget_truncated_tokens", content_tokens - count_tokens(fitted, model))
+    return fitted, False
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+from config import get_cache_dir
+
+# Standard-TTLs in Sekunden
+WEBSITE_TTL = 6 * 60 * 60
+YOUTUBE_TTL = 7 * 24 * 60 * 60
+# PDFs werden über ihren Inhalts-Hash adressiert und veralten daher nicht
+PDF_TTL = 30 * 24 * 60 * 60
+
+# Obergrenzen für den Inhalts-Cache (LRU-Verdrängung, sobald eine Grenze überschritten wird)
+CONTENT_CACHE_MAX_ENTRIES = 500
+CONTENT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# LLM-Antworten: komprimiert gespeichert, ebenfalls LRU-begrenzt
+LLM_CACHE_TTL = 7 * 24 * 60 * 60
+LLM_CACHE_MAX_ENTRIES = 2000
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Query-Parameter, die den Inhalt einer Seite nicht verändern
+_TRACKING_PARAMS = ("utm_source", "utm_medium", "utm_campaign", "utm_term",
+                    "utm_content", "fbclid", "gclid")
+
+
+def normalize_url(url):
+    """
+    Normalizes a URL for use as a cache key.
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters and sorts the remaining query parameters.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and not ((scheme == "http" and parsed.port == 80) or
+                            (scheme == "https" and parsed.port == 443)):
+        host = f"{host}:{parsed.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                   if k.lower() not in _TRACKING_PARAMS)
+    return urlunparse((scheme, host, parsed.path or "/", "", urlencode(query), ""))
+
+
+class PersistentCache:
+    """
+    Thread-safe, SQLite-backed key/value cache with TTLs and size-bounded LRU eviction.
+    Hit/miss counters are kept per instance and exposed via stats().
+    """
+
+    def __init__(self, path, default_ttl, max_entries, max_bytes):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " expires REAL NOT NULL,"
+                " accessed REAL NOT NULL)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed)")
+
+    def _encode(self, value):
+        return value.encode("utf-8")
+
+    def _decode(self, blob):
+        return bytes(blob).decode("utf-8")
+
+    def get(self, key):
+        """Returns the cached value or None if missing or expired."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return self._decode(row[0])
+
+    def set(self, key, value, ttl=None):
+        """Stores a value and evicts least recently used entries if a bound is exceeded."""
+        blob = self._encode(value)
+        now = time.time()
+        expires = now + (self.default_ttl if ttl is None else ttl)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) "
+                "VALUES (?, ?, ?, ?, ?)", (key, blob, len(blob), expires, now))
+            self._evict(now)
+
+    def _evict(self, now):
+        # Abgelaufene Einträge zuerst entfernen, danach nach LRU-Reihenfolge
+        self._conn.execute("DELETE FROM entries WHERE expires < ?", (now,))
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def delete(self, key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Returns hit/miss counters and the current size of the cache."""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": count, "bytes": total}
+
+
+class CompressedCache(PersistentCache):
+    """PersistentCache that stores values zlib-compressed."""
+
+    def _encode(self, value):
+        return zlib.compress(value.encode("utf-8"))
+
+    def _decode(self, blob):
+        return zlib.decompress(bytes(blob)).decode("utf-8")
+
+
+# Version der gespeicherten Inhalte; erhöhen, wenn sich Extraktion oder Bereinigung ändern,
+# damit ältere Einträge nicht mehr gelesen werden
+CONTENT_CACHE_VERSION = 2
+
+
+def content_cache_key(kind, identifier):
+    """Cache key for extracted content, e.g. content_cache_key("url", normalize_url(url))."""
+    return f"{kind}:v{CONTENT_CACHE_VERSION}:{identifier}"
+
+
+def llm_cache_key(model, messages, params=None):
+    """Cache key for a completion: hash over model, messages and request parameters."""
+    payload = json.dumps({"model": model, "messages": messages, "params": params or {}},
+                         sort_keys=True, ensure_ascii=False)
+    return "llm:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_content_cache = None
+_content_cache_lock = threading.Lock()
+
+
+def get_content_cache():
+    """Gibt den gemeinsamen Cache für extrahierte Website-, YouTube- und PDF-Inhalte zurück."""
+    global _content_cache
+    with _content_cache_lock:
+        if _content_cache is None:
+            _content_cache = PersistentCache(
+                os.path.join(get_cache_dir(), "content_cache.sqlite3"),
+                default_ttl=WEBSITE_TTL,
+                max_entries=CONTENT_CACHE_MAX_ENTRIES,
+                max_bytes=CONTENT_CACHE_MAX_BYTES)
+        return _content_cache
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Gibt den gemeinsamen Cache für LLM-Antworten zurück."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = CompressedCache(
+                os.path.join(get_cache_dir(), "llm_cache.sqlite3"),
+                default_ttl=LLM_CACHE_TTL,
+                max_entries=LLM_CACHE_MAX_ENTRIES,
+                max_bytes=LLM_CACHE_MAX_BYTES)
+        return _llm_cache
@@ -0,0 +1,84 @@
+import threading
+import time
+
+
+class AnalysisCancelled(Exception):
+    """Raised when an analysis was cancelled or its deadline has passed."""
+    pass
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation for one analysis job.
+    cancel() may be called from any thread; long-running steps check
+    cancelled/check() between units of work. With a timeout the token also
+    counts as cancelled once the deadline has passed.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    @property
+    def reason(self):
+        if self._event.is_set() or self.deadline is None:
+            return "Analyse abgebrochen"
+        return f"Zeitlimit von {self.timeout:g} s überschritten"
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        """Registers a function called on cancel(); returns a function that removes it again."""
+        with self._lock:
+            self._callbacks.append(callback)
+        call_now = self._event.is_set()
+        if call_now:
+            callback()
+
+        def remove():
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+        return remove
+
+    def restart_deadline(self):
+        """Starts the timeout anew, e.g. when a queued job actually begins to run."""
+        if self.timeout:
+            self.deadline = time.monotonic() + self.timeout
+
+    def check(self):
+        """Raises AnalysisCancelled if the job was cancelled or the deadline has passed."""
+        if self.cancelled:
+            raise AnalysisCancelled(self.reason)
+
+    def remaining(self):
+        """Seconds until the deadline, or None without a deadline."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def limit(self, timeout):
+        """Caps a timeout in seconds at the remaining time until the deadline."""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def wait(self, timeout):
+        """Sleeps up to timeout seconds, waking up early on cancel(). Returns cancelled."""
+        self._event.wait(self.limit(timeout))
+        return self.cancelled
@@ -0,0 +1,105 @@
+import re
+from functools import lru_cache
+
+# Grobe Schätzung, falls tiktoken nicht verfügbar ist
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+|\n\s*\n")
+_WORD_RE = re.compile(r"\S+\s*")
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model):
+    """Returns a cached tiktoken encoding or None if tiktoken is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # z. B. wenn die Encoding-Datei nicht heruntergeladen werden kann
+            return None
+
+
+def count_tokens(text, model="gpt-4o"):
+    """Counts tokens with tiktoken, falling back to a character-based estimate."""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text, max_tokens, model="gpt-4o", from_end=False):
+    """
+    Returns the first (or with from_end=True the last) max_tokens tokens of text.
+    Without tiktoken the cut is made after max_tokens * CHARS_PER_TOKEN characters.
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        limit = max_tokens * CHARS_PER_TOKEN
+        return text[-limit:] if from_end else text[:limit]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[-max_tokens:] if from_end else tokens[:max_tokens])
+
+
+def split_sentences(text):
+    """Splits text at sentence ends and paragraph breaks."""
+    return [s.strip() for s in _SENTENCE_END_RE.split(text) if s and s.strip()]
+
+
+def _split_long_sentence(sentence, max_tokens, model):
+    # Sätze, die allein zu lang sind (z. B. Transkripte ohne Satzzeichen), wortweise teilen
+    pieces, current, current_tokens = [], [], 0
+    for word in _WORD_RE.findall(sentence):
+        tokens = count_tokens(word, model)
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append("".join(current).strip())
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += tokens
+    if current:
+        pieces.append("".join(current).strip())
+    return pieces
+
+
+def split_into_chunks(text, max_tokens, overlap_tokens=0, model="gpt-4o"):
+    """
+    Splits text into chunks of at most max_tokens tokens along sentence boundaries.
+    Consecutive chunks share up to overlap_tokens tokens of trailing sentences so
+    context at the chunk borders is not lost.
+    """
+    units = []
+    for sentence in split_sentences(text):
+        tokens = count_tokens(sentence, model)
+        if tokens > max_tokens:
+            units.extend((piece, count_tokens(piece, model))
+                         for piece in _split_long_sentence(sentence, max_tokens, model))
+        else:
+            units.append((sentence, tokens))
+
+    chunks = []
+    current, current_tokens = [], 0
+    for sentence, tokens in units:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(s for s, _ in current))
+            # Überlappung: die letzten Sätze des vorherigen Abschnitts übernehmen
+            overlap, overlap_count = [], 0
+            for prev in reversed(current):
+                if overlap_count + prev[1] > overlap_tokens or overlap_count + prev[1] + tokens > max_tokens:
+                    break
+                overlap.insert(0, prev)
+                overlap_count += prev[1]
+            current, current_tokens = overlap, overlap_count
+        current.append((sentence, tokens))
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(s for s, _ in current))
+    return chunks
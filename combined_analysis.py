@@ -0,0 +1,88 @@
+import json
+
+from prompts import COMBINED_INSTRUCTION, COMBINED_PARTIAL_RESULTS, build_messages
+
+SENTIMENT_LABELS = ["positiv", "neutral", "negativ", "gemischt"]
+
+# JSON-Schema für die strukturierte Ausgabe (strict: alle Felder sind Pflicht)
+COMBINED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "zusammenfassung": {"type": "string"},
+        "schluesselwoerter": {"type": "array", "items": {"type": "string"}},
+        "stimmung": {
+            "type": "object",
+            "properties": {
+                "einordnung": {"type": "string", "enum": SENTIMENT_LABELS},
+                "begruendung": {"type": "string"},
+            },
+            "required": ["einordnung", "begruendung"],
+            "additionalProperties": False,
+        },
+        "themen": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "thema": {"type": "string"},
+                    "beschreibung": {"type": "string"},
+                },
+                "required": ["thema", "beschreibung"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["zusammenfassung", "schluesselwoerter", "stimmung", "themen"],
+    "additionalProperties": False,
+}
+
+COMBINED_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "alle_analysen", "strict": True, "schema": COMBINED_SCHEMA},
+}
+
+
+def build_combined_messages(content, partial_results=False):
+    """Messages for the combined request; content is sent once for all four analyses."""
+    instruction = COMBINED_INSTRUCTION
+    if partial_results:
+        instruction = f"{instruction} {COMBINED_PARTIAL_RESULTS}"
+    return build_messages(content, instruction)
+
+
+class CombinedAnalysis:
+    """Result of the "Alle Analysen" mode: summary, keywords, sentiment and topics."""
+
+    def __init__(self, summary, keywords, sentiment, sentiment_reason, topics):
+        self.summary = summary
+        self.keywords = keywords
+        self.sentiment = sentiment
+        self.sentiment_reason = sentiment_reason
+        # Liste von (Thema, Beschreibung)
+        self.topics = topics
+
+    @classmethod
+    def from_json(cls, text):
+        """Parses the structured model output. Raises ValueError if it does not match the schema."""
+        try:
+            data = json.loads(text)
+            sentiment = data["stimmung"]
+            return cls(summary=str(data["zusammenfassung"]).strip(),
+                       keywords=[str(keyword).strip() for keyword in data["schluesselwoerter"]],
+                       sentiment=str(sentiment["einordnung"]),
+                       sentiment_reason=str(sentiment["begruendung"]).strip(),
+                       topics=[(str(topic["thema"]).strip(), str(topic["beschreibung"]).strip())
+                               for topic in data["themen"]])
+        except (TypeError, KeyError, json.JSONDecodeError) as e:
+            raise ValueError(f"Antwort entspricht nicht dem Schema: {e}") from e
+
+    def to_markdown(self):
+        """Renders all sections as Markdown for markdown_formatter."""
+        sections = ["## Zusammenfassung", self.summary, "",
+                    "## Schlüsselwörter"]
+        sections += [f"- {keyword}" for keyword in self.keywords]
+        sections += ["", "## Sentiment Analyse",
+                     f"**{self.sentiment.capitalize()}**: {self.sentiment_reason}", "",
+                     "## Themen"]
+        sections += [f"- **{topic}**: {description}" for topic, description in self.topics]
+        return "\n".join(sections)
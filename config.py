@@ -2,11 +2,51 @@ import configparser
 import os
 
 CURRENT_API_KEY = None
+# Zeitlimit für eine komplette Analyse (Extraktion und KI-Anfragen) in Sekunden
+DEFAULT_ANALYSIS_TIMEOUT = 600
+# Maximale Prompt-Größe einer einzelnen KI-Anfrage in Tokens und Vorgehen bei Überschreitung
+DEFAULT_TOKEN_BUDGET = 100000
+DEFAULT_BUDGET_STRATEGY = "head_tail"
+BUDGET_STRATEGIES = ("truncate", "head_tail", "chunked")
 
 def get_config_path():
     """Gibt den absoluten Pfad zur Konfigurationsdatei zurück."""
     return os.path.abspath('config.ini')
 
+def get_cache_dir():
+    """Gibt das Verzeichnis für persistente Caches zurück (überschreibbar via KI_CACHE_DIR)."""
+    return os.path.abspath(os.environ.get('KI_CACHE_DIR') or '.ki_cache')
+
+def get_metrics_dir():
+    """Gibt das Verzeichnis für Metrik-Logs zurück (überschreibbar via KI_METRICS_DIR)."""
+    return os.path.abspath(os.environ.get('KI_METRICS_DIR') or '.ki_metrics')
+
+def get_profile_dir():
+    """Gibt das Verzeichnis für Profiling-Ausgaben zurück (überschreibbar via KI_PROFILE_DIR)."""
+    return os.path.abspath(os.environ.get('KI_PROFILE_DIR') or '.ki_profile')
+
+def get_analysis_timeout():
+    """Gibt das Zeitlimit pro Analyse in Sekunden zurück (überschreibbar via KI_ANALYSIS_TIMEOUT)."""
+    try:
+        return float(os.environ.get('KI_ANALYSIS_TIMEOUT') or DEFAULT_ANALYSIS_TIMEOUT)
+    except ValueError:
+        return DEFAULT_ANALYSIS_TIMEOUT
+
+def get_token_budget():
+    """Gibt das Token-Budget pro KI-Anfrage zurück (überschreibbar via KI_TOKEN_BUDGET)."""
+    try:
+        return int(os.environ.get('KI_TOKEN_BUDGET') or DEFAULT_TOKEN_BUDGET)
+    except ValueError:
+        return DEFAULT_TOKEN_BUDGET
+
+def get_budget_strategy():
+    """
+    Gibt zurück, wie zu lange Inhalte gekürzt werden (überschreibbar via KI_BUDGET_STRATEGY):
+    truncate (Anfang behalten), head_tail (Anfang und Ende) oder chunked (Map-Reduce).
+    """
+    strategy = (os.environ.get('KI_BUDGET_STRATEGY') or DEFAULT_BUDGET_STRATEGY).strip().lower()
+    return strategy if strategy in BUDGET_STRATEGIES else DEFAULT_BUDGET_STRATEGY
+
 def check_api_key_exists():
 
     global CURRENT_API_KEY
@@ -0,0 +1,13 @@
+class ErrorMessage(str):
+    """
+    Error message returned in place of extracted content or an analysis
+    result. It is a str, so callers can display and store it like any result,
+    but errors are recognised by type (is_error) instead of by wording:
+    content that merely starts with "Fehler" or "Error" is not an error.
+    """
+
+    __slots__ = ()
+
+
+def is_error(text):
+    return isinstance(text, ErrorMessage)
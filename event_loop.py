@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+
+class BackgroundLoop:
+    """
+    Runs one asyncio event loop in a daemon thread so synchronous code (the
+    Tk mainloop) can hand coroutines to it. All analyses share this loop and
+    with it the async HTTP and OpenAI connection pools.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="asyncio-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine):
+        """Schedules a coroutine on the loop and returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+
+def get_background_loop():
+    """Gibt die gemeinsame Hintergrund-Event-Loop zurück (lazy gestartet)."""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = BackgroundLoop()
+        return _background_loop
@@ -0,0 +1,277 @@
+import re
+from abc import ABC, abstractmethod
+from html.parser import HTMLParser
+
+# Elemente, deren Inhalt nie sichtbarer Text ist
+SKIP_TAGS = frozenset(("script", "style", "noscript", "template", "svg"))
+
+# Elemente, nach denen im extrahierten Text ein Zeilenumbruch stehen soll
+BLOCK_TAGS = frozenset((
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "figcaption", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "td", "th",
+    "tr", "ul",
+))
+VOID_TAGS = frozenset(("br", "hr"))
+
+# Hauptinhalts-Modus: Elemente, die immer als Boilerplate gelten
+BOILERPLATE_TAGS = frozenset(("nav", "aside", "form", "button", "iframe", "select"))
+# ... und solche, die nur außerhalb von <main>/<article> Boilerplate sind
+PAGE_CHROME_TAGS = frozenset(("header", "footer"))
+MAIN_CONTENT_TAGS = frozenset(("main", "article"))
+# Seitenrahmen tragen oft Zustandsklassen wie "has-sidebar" oder "menu-open";
+# für sie gilt die id/class-Heuristik nicht, sonst fiele die ganze Seite weg
+ATTR_CHECK_EXEMPT_TAGS = frozenset(("html", "body")) | MAIN_CONTENT_TAGS
+# id/class-Werte typischer Cookie-Banner, Menüs und Werbeblöcke
+BOILERPLATE_ATTR_RE = re.compile(
+    r"(?:^|[\s_-])(?:cookie|consent|gdpr|banner|newsletter|advert|ads|sidebar|menu|navbar"
+    r"|navigation|breadcrumbs?|share|social|popup|modal)(?:$|[\s_-])",
+    re.IGNORECASE)
+# Unterhalb dieser Länge gilt ein gefilterter Text als unbrauchbar
+MIN_MAIN_CONTENT_CHARS = 200
+
+_INLINE_SPACE_RE = re.compile(r"[ \t\r\f\v\xa0]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def compact_whitespace(text):
+    """Collapses runs of spaces within lines and runs of blank lines."""
+    lines = (_INLINE_SPACE_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+class _TextCollector:
+    """
+    Backend-independent text collection driven by start/end/data events.
+    In main-content mode boilerplate blocks are dropped and, if the page has a
+    <main> or <article> element with enough text, only that text is returned.
+    If filtering leaves too little text, the unfiltered text is used instead.
+    """
+
+    def __init__(self, main_content=False):
+        self.main_content = main_content
+        self._raw_parts = []
+        self._filtered_parts = []
+        self._main_parts = []
+        # (Tag, Verschachtelungstiefe) des aktuell übersprungenen Elements
+        self._hidden = None
+        self._boilerplate = None
+        self._main = None
+
+    @staticmethod
+    def _enter(state, tag):
+        if state is not None and state[0] == tag:
+            state[1] += 1
+
+    @staticmethod
+    def _leave(state, tag):
+        """Returns True when the element tracked by state has been closed."""
+        if state is not None and state[0] == tag:
+            state[1] -= 1
+            return state[1] == 0
+        return False
+
+    def _is_boilerplate(self, tag, attrs):
+        if tag in BOILERPLATE_TAGS:
+            return True
+        if tag in PAGE_CHROME_TAGS and self._main is None:
+            return True
+        if tag in ATTR_CHECK_EXEMPT_TAGS:
+            return False
+        marker = f"{attrs.get('id') or ''} {attrs.get('class') or ''} {attrs.get('role') or ''}"
+        return BOILERPLATE_ATTR_RE.search(marker) is not None
+
+    def _append(self, text):
+        self._raw_parts.append(text)
+        if self._boilerplate is None:
+            self._filtered_parts.append(text)
+            if self._main is not None:
+                self._main_parts.append(text)
+
+    def start(self, tag, attrs):
+        if self._hidden is not None:
+            self._enter(self._hidden, tag)
+            return
+        if tag in SKIP_TAGS:
+            self._hidden = [tag, 1]
+            return
+        if tag in BLOCK_TAGS:
+            self._append("\n")
+        if not self.main_content:
+            return
+        if self._boilerplate is not None:
+            self._enter(self._boilerplate, tag)
+        elif self._is_boilerplate(tag, attrs):
+            self._boilerplate = [tag, 1]
+        elif self._main is None and tag in MAIN_CONTENT_TAGS:
+            self._main = [tag, 1]
+        else:
+            self._enter(self._main, tag)
+
+    def end(self, tag):
+        if self._hidden is not None:
+            if self._leave(self._hidden, tag):
+                self._hidden = None
+            return
+        if tag in BLOCK_TAGS and tag not in VOID_TAGS:
+            self._append("\n")
+        if self._boilerplate is not None:
+            if self._leave(self._boilerplate, tag):
+                self._boilerplate = None
+        elif self._leave(self._main, tag):
+            self._main = None
+
+    def data(self, data):
+        if self._hidden is None:
+            self._append(data)
+
+    def text(self):
+        if self.main_content:
+            for parts in (self._main_parts, self._filtered_parts):
+                text = compact_whitespace("".join(parts))
+                if len(text) >= MIN_MAIN_CONTENT_CHARS:
+                    return text
+        return compact_whitespace("".join(self._raw_parts))
+
+
+class TextExtractor(ABC):
+    """
+    Interface for incremental HTML-to-text backends.
+    HTML is passed in chunks via feed(); close() returns the extracted text.
+    """
+
+    name = None
+
+    @abstractmethod
+    def feed(self, data):
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+
+class StreamingHTMLTextParser(HTMLParser, TextExtractor):
+    """
+    Incremental HTML-to-text parser based on the standard library html.parser.
+    Text is collected as soon as it is parsed, so no document tree is ever built.
+    """
+
+    name = "html.parser"
+
+    def __init__(self, main_content=False):
+        super().__init__(convert_charrefs=True)
+        self._collector = _TextCollector(main_content)
+
+    def handle_starttag(self, tag, attrs):
+        self._collector.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self._collector.start(tag, dict(attrs))
+        self._collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self._collector.end(tag)
+
+    def handle_data(self, data):
+        self._collector.data(data)
+
+    def close(self):
+        super().close()
+        return self._collector.text()
+
+
+class _LxmlTarget:
+    """Parser target that forwards lxml's SAX-like events to a _TextCollector."""
+
+    def __init__(self, collector):
+        self._collector = collector
+
+    def start(self, tag, attrib):
+        self._collector.start(tag, attrib)
+
+    def end(self, tag):
+        self._collector.end(tag)
+
+    def data(self, data):
+        self._collector.data(data)
+
+    def close(self):
+        return self._collector.text()
+
+
+class LxmlTextExtractor(TextExtractor):
+    """
+    Incremental HTML-to-text backend based on lxml's C parser (libxml2).
+    Uses a parser target, so like the html.parser backend no tree is built.
+    """
+
+    name = "lxml"
+
+    def __init__(self, main_content=False):
+        from lxml import etree
+        self._parser = etree.HTMLParser(target=_LxmlTarget(_TextCollector(main_content)),
+                                        remove_comments=True, remove_pis=True)
+        self._fed = False
+
+    def feed(self, data):
+        if data:
+            self._parser.feed(data)
+            self._fed = True
+
+    def close(self):
+        if not self._fed:
+            # lxml lehnt leere Dokumente ab
+            return ""
+        return self._parser.close()
+
+
+class PlainTextCollector(TextExtractor):
+    """Collects text/plain responses with the same feed()/close() interface."""
+
+    name = "text"
+
+    def __init__(self):
+        self._parts = []
+
+    def feed(self, data):
+        self._parts.append(data)
+
+    def close(self):
+        text = "".join(self._parts)
+        self._parts = []
+        return text
+
+
+EXTRACTORS = {
+    StreamingHTMLTextParser.name: StreamingHTMLTextParser,
+    LxmlTextExtractor.name: LxmlTextExtractor,
+}
+
+
+def _default_backend():
+    try:
+        import lxml.etree  # noqa: F401
+        return LxmlTextExtractor.name
+    except ImportError:
+        return StreamingHTMLTextParser.name
+
+
+DEFAULT_BACKEND = _default_backend()
+DEFAULT_MAIN_CONTENT = True
+
+
+def get_extractor(backend=None, main_content=None):
+    """
+    Returns a new HTML extractor instance.
+    backend is a key of EXTRACTORS (default: lxml if installed, else html.parser),
+    main_content enables boilerplate removal (default: DEFAULT_MAIN_CONTENT).
+    """
+    backend = backend or DEFAULT_BACKEND
+    if main_content is None:
+        main_content = DEFAULT_MAIN_CONTENT
+    try:
+        extractor_cls = EXTRACTORS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown HTML extractor backend: {backend}")
+    return extractor_cls(main_content=main_content)
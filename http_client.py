@@ -0,0 +1,115 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from metrics import timed
+from security import resolve_and_validate_addresses, resolve_and_validate_url
+
+# Timeouts in Sekunden (Verbindungsaufbau, Lesen)
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+
+# Anzahl der Hosts, für die ein Verbindungspool vorgehalten wird
+POOL_HOSTS = 20
+# Maximale Anzahl gleichzeitiger Verbindungen pro Host
+MAX_CONNECTIONS_PER_HOST = 4
+
+
+def _is_connect_error(error):
+    # Nur Fehler beim Verbindungsaufbau; danach wurde die Anfrage womöglich schon verarbeitet
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class PinnedIPAdapter(HTTPAdapter):
+    """
+    Transport adapter that connects to the IP addresses validated by
+    security.resolve_and_validate_addresses instead of letting urllib3 resolve
+    the hostname again. The addresses are tried in order until a connection
+    can be established. TLS still uses the hostname for SNI and certificate
+    checks, and the Host header keeps the original name.
+    Raises SecurityException if the target does not pass validation.
+    """
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(
+            request, verify, cert)
+        hostname = host_params["host"]
+        host_params["host"] = (getattr(request, "_pinned_ip", None)
+                               or resolve_and_validate_url(request.url))
+        if host_params["scheme"] == "https":
+            pool_kwargs["server_hostname"] = hostname
+            pool_kwargs["assert_hostname"] = hostname
+        return host_params, pool_kwargs
+
+    def send(self, request, **kwargs):
+        if "Host" not in request.headers:
+            netloc = urlparse(request.url).netloc
+            request.headers["Host"] = netloc.rsplit("@", 1)[-1]
+        addresses = resolve_and_validate_addresses(request.url)
+        # Nur die Anfrage selbst zählt als "fetch"; die Prüfung ist die Stufe "validation"
+        with timed("fetch"):
+            for index, address in enumerate(addresses):
+                # Die gewählte Adresse reist mit der Anfrage zu build_connection_pool_key_attributes
+                request._pinned_ip = address
+                try:
+                    return super().send(request, **kwargs)
+                except requests.exceptions.ConnectionError as e:
+                    if index == len(addresses) - 1 or not _is_connect_error(e):
+                        raise
+
+
+class FetchClient:
+    """
+    Shared HTTP client for website fetching.
+    Wraps a single requests.Session with a keep-alive connection pool so repeated
+    fetches (and redirect hops) reuse TCP/TLS connections, and every connection
+    is pinned to the validated IP addresses (see PinnedIPAdapter). The pool blocks once
+    MAX_CONNECTIONS_PER_HOST connections to one host are in use, which caps
+    per-host concurrency under batch load.
+    """
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 pool_hosts=POOL_HOSTS, max_connections_per_host=MAX_CONNECTIONS_PER_HOST):
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        # Proxys aus der Umgebung würden die Verbindung zur validierten IP umgehen
+        self.session.trust_env = False
+        # Cookies nicht zwischen Analysen teilen; innerhalb einer Redirect-Kette
+        # werden sie vom Aufrufer explizit weitergereicht.
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        adapter = PinnedIPAdapter(pool_connections=pool_hosts,
+                                  pool_maxsize=max_connections_per_host,
+                                  pool_block=True,
+                                  max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, **kwargs):
+        """GET without automatic redirects; redirects are validated by the caller."""
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("allow_redirects", False)
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_fetch_client = None
+_fetch_client_lock = threading.Lock()
+
+
+def get_fetch_client():
+    """Gibt den gemeinsamen, thread-sicheren FetchClient zurück (lazy erzeugt)."""
+    global _fetch_client
+    with _fetch_client_lock:
+        if _fetch_client is None:
+            _fetch_client = FetchClient()
+        return _fetch_client
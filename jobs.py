@@ -0,0 +1,164 @@
+import asyncio
+import itertools
+import threading
+import time
+
+from cancellation import CancellationToken
+from errors import ErrorMessage
+from event_loop import get_background_loop
+from metrics import export_job_metrics
+from pipeline import async_analyse_source, is_error_result
+
+# Anzahl gleichzeitig laufender Analysen in der GUI; weitere Aufträge warten
+MAX_CONCURRENT_JOBS = 4
+# So viele abgeschlossene Aufträge bleiben abrufbar; ältere werden verworfen
+MAX_FINISHED_JOBS = 100
+
+JOB_QUEUED = "Wartend"
+JOB_RUNNING = "Läuft"
+JOB_DONE = "Fertig"
+JOB_FAILED = "Fehler"
+JOB_CANCELLED = "Abgebrochen"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+# Status im Metrik-Log (wie im Batch-Modus)
+METRICS_STATUS = {JOB_DONE: "ok", JOB_FAILED: "error", JOB_CANCELLED: "cancelled"}
+
+
+class AnalysisJob:
+    """One queued analysis of a source together with its state and result."""
+
+    def __init__(self, job_id, source, prompt_type, custom_prompt, use_cache, cancel_token):
+        self.id = job_id
+        self.source = source
+        self.prompt_type = prompt_type
+        self.custom_prompt = custom_prompt
+        self.use_cache = use_cache
+        self.cancel_token = cancel_token
+        self.state = JOB_QUEUED
+        self.result = ""
+        # Bisher gestreamter Antworttext, solange der Auftrag läuft
+        self.partial_result = ""
+        self.details = {}
+        self.started = None
+        self.finished = None
+
+    @property
+    def finished_state(self):
+        return self.state in FINISHED_STATES
+
+    @property
+    def elapsed(self):
+        """Run time in seconds (0 while queued)."""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+
+class JobQueue:
+    """
+    Runs analysis jobs on the shared background event loop, at most
+    max_concurrent at a time; the remaining jobs wait in submission order.
+    on_update(job) is called whenever a job changes state and
+    on_delta(job, delta) for every streamed fragment, both from background
+    threads - GUI callers have to hand them over to the Tk mainloop.
+    Only the newest max_finished finished jobs are kept in jobs; get()
+    returns None for older ones.
+    """
+
+    def __init__(self, on_update=None, on_delta=None, max_concurrent=MAX_CONCURRENT_JOBS,
+                 timeout=None, background_loop=None, max_finished=MAX_FINISHED_JOBS):
+        self._on_update = on_update
+        self._on_delta = on_delta
+        self._timeout = timeout
+        self._background_loop = background_loop
+        self._max_finished = max_finished
+        self._slots = asyncio.Semaphore(max(1, max_concurrent))
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.jobs = {}
+
+    def submit(self, source, prompt_type, custom_prompt="", use_cache=True):
+        """Queues a job and returns it; the result arrives via on_update."""
+        job = AnalysisJob(next(self._ids), source, prompt_type, custom_prompt, use_cache,
+                          CancellationToken(self._timeout))
+        with self._lock:
+            self.jobs[job.id] = job
+        background_loop = self._background_loop or get_background_loop()
+        background_loop.submit(self._run(job))
+        self._notify(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job. Returns False if it had already finished."""
+        job = self.get(job_id)
+        if job is None or job.finished_state:
+            return False
+        job.cancel_token.cancel()
+        with self._lock:
+            # Wartende Aufträge werden sofort als abgebrochen markiert
+            queued = job.state == JOB_QUEUED
+            if queued:
+                job.state = JOB_CANCELLED
+                job.result = ErrorMessage(f"Fehler: {job.cancel_token.reason}")
+                self._evict_finished()
+        if queued:
+            self._notify(job)
+        return True
+
+    def cancel_all(self):
+        with self._lock:
+            job_ids = list(self.jobs)
+        for job_id in job_ids:
+            self.cancel(job_id)
+
+    def _evict_finished(self):
+        # Aufruf mit gehaltenem Lock; dicts behalten die Einfügereihenfolge, die ältesten zuerst
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_state]
+        for job_id in finished[:max(0, len(finished) - self._max_finished)]:
+            del self.jobs[job_id]
+
+    def _notify(self, job):
+        if self._on_update is not None:
+            self._on_update(job)
+
+    def _stream(self, job, delta):
+        job.partial_result += delta
+        if self._on_delta is not None:
+            self._on_delta(job, delta)
+
+    async def _run(self, job):
+        async with self._slots:
+            with self._lock:
+                if job.state != JOB_QUEUED:
+                    return
+                job.state = JOB_RUNNING
+                job.started = time.monotonic()
+            job.cancel_token.restart_deadline()
+            self._notify(job)
+
+            try:
+                result = await async_analyse_source(
+                    job.source, job.prompt_type, job.custom_prompt,
+                    on_delta=lambda delta: self._stream(job, delta), details=job.details,
+                    use_cache=job.use_cache, cancel_token=job.cancel_token)
+            except Exception as e:
+                result = ErrorMessage(f"Ein Fehler ist aufgetreten:\n{str(e)}")
+
+            with self._lock:
+                job.result = result
+                job.finished = time.monotonic()
+                if job.cancel_token.cancelled:
+                    job.state = JOB_CANCELLED
+                elif is_error_result(result):
+                    job.state = JOB_FAILED
+                else:
+                    job.state = JOB_DONE
+                self._evict_finished()
+            # Lokales Datei-Schreiben ist kurz und läuft direkt in der Event-Loop
+            export_job_metrics(job.source, job.prompt_type, METRICS_STATUS[job.state], job.elapsed,
+                               job.details)
+            self._notify(job)
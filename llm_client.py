@@ -0,0 +1,138 @@
+import asyncio
+import contextvars
+import threading
+from contextlib import contextmanager
+
+from config import get_api_key
+
+# Timeouts in Sekunden
+OPENAI_CONNECT_TIMEOUT = 10
+OPENAI_READ_TIMEOUT = 300
+OPENAI_MAX_RETRIES = 2
+# Größe des Verbindungspools zur API
+OPENAI_MAX_CONNECTIONS = 20
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 10
+
+_client = None
+_client_api_key = None
+_client_lock = threading.Lock()
+
+# Async-Clients sind an die Event-Loop gebunden, in der ihre Verbindungen entstehen
+_async_client = None
+_async_client_key = None
+
+
+def _http_settings():
+    import httpx
+
+    timeout = httpx.Timeout(OPENAI_READ_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+    limits = httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                          max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS)
+    return timeout, limits
+
+
+def _create_client(api_key):
+    from openai import OpenAI, DefaultHttpxClient
+
+    timeout, limits = _http_settings()
+    # DefaultHttpxClient behält die SDK-Voreinstellungen (z. B. Redirects) bei
+    http_client = DefaultHttpxClient(timeout=timeout, limits=limits)
+    return OpenAI(api_key=api_key, timeout=timeout, max_retries=OPENAI_MAX_RETRIES,
+                  http_client=http_client)
+
+
+def _create_async_client(api_key):
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    timeout, limits = _http_settings()
+    http_client = DefaultAsyncHttpxClient(timeout=timeout, limits=limits)
+    return AsyncOpenAI(api_key=api_key, timeout=timeout, max_retries=OPENAI_MAX_RETRIES,
+                       http_client=http_client)
+
+
+def get_openai_client():
+    """
+    Returns the shared OpenAI client, or None if no API key is available.
+    The client (and with it the HTTP connection pool) is created lazily and
+    only replaced when the API key changes, e.g. after config.save_api_key.
+    """
+    global _client, _client_api_key
+    api_key = get_api_key()
+    if not api_key:
+        return None
+
+    with _client_lock:
+        if _client is None or _client_api_key != api_key:
+            # Der alte Client wird nicht geschlossen, da laufende Anfragen ihn noch nutzen können
+            _client = _create_client(api_key)
+            _client_api_key = api_key
+        return _client
+
+
+def get_async_openai_client():
+    """
+    Returns the shared AsyncOpenAI client for the running event loop, or None
+    if no API key is available. Must be called from a coroutine; the client is
+    replaced when the API key or the event loop changes.
+    """
+    global _async_client, _async_client_key
+    api_key = get_api_key()
+    if not api_key:
+        return None
+
+    key = (api_key, asyncio.get_running_loop())
+    with _client_lock:
+        if _async_client is None or _async_client_key != key:
+            _async_client = _create_async_client(api_key)
+            _async_client_key = key
+        return _async_client
+
+
+class TokenUsage:
+    """Thread-safe sum of the token usage reported by the API for one analysis."""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        # Prompt-Tokens, die der Anbieter aus seinem Prompt-Cache bedient hat
+        self.cached_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, usage):
+        details = getattr(usage, "prompt_tokens_details", None)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            self.cached_tokens += getattr(details, "cached_tokens", 0) or 0
+
+    def as_dict(self):
+        with self._lock:
+            return {"requests": self.requests, "prompt_tokens": self.prompt_tokens,
+                    "completion_tokens": self.completion_tokens,
+                    "cached_tokens": self.cached_tokens}
+
+
+_current_usage = contextvars.ContextVar("token_usage", default=None)
+
+
+@contextmanager
+def track_usage():
+    """
+    Collects the usage of all completions made in this context into a TokenUsage.
+    Worker threads must run in a copy of the context (contextvars.copy_context).
+    """
+    usage = TokenUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+def record_usage(usage):
+    """Adds the usage field of an API response to the active TokenUsage, if any."""
+    tracker = _current_usage.get()
+    if tracker is not None and usage is not None:
+        tracker.add(usage)
@@ -1,8 +1,25 @@
-import tkinter as tk
-from Gui import Gui
+import sys
 
 
 if __name__ == "__main__":
-    window = tk.Tk()
-    app = Gui(window)
-    window.mainloop()
+    if sys.argv[1:2] == ["--batch"]:
+        # Headless-Modus: keine Tk-Abhängigkeit
+        from batch import main
+        sys.exit(main(sys.argv[2:]))
+
+    import tkinter as tk
+    from Gui import Gui
+    from profiling import get_profile_mode, profiling
+
+    # --profile[=all|cprofile|sampling] oder KI_PROFILE profiliert die GUI-Sitzung
+    # einschließlich Event-Loop- und Worker-Threads
+    try:
+        profile_mode = get_profile_mode(sys.argv[1:])
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+
+    with profiling(profile_mode):
+        window = tk.Tk()
+        app = Gui(window)
+        window.mainloop()
@@ -0,0 +1,119 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+# Ein Inline-Abschnitt mit einheitlicher Formatierung; styles ist ein frozenset aus
+# "bold", "italic", "code", "strikethrough" und "link" (dann mit href)
+Span = namedtuple("Span", "text styles href", defaults=(frozenset(), None))
+
+# Ein Block entspricht genau einer Ausgabezeile. kind ist "heading" (level 1-6),
+# "paragraph", "quote", "list_item" (level = Einrückungstiefe, marker "•" oder "1.")
+# oder "code" (eine Zeile eines Codeblocks, spans enthält den Rohtext).
+Block = namedtuple("Block", "kind spans level marker", defaults=(0, ""))
+
+HEADING_PATTERN = re.compile(r"(#{1,6}) (.*)")
+QUOTE_PATTERN = re.compile(r"> ?(.*)")
+LIST_PATTERN = re.compile(r"( *)([-*+]|\d+[.)]) +(.*)")
+FENCE_PREFIX = "```"
+
+# Alle Inline-Auszeichnungen in einem Muster; die erste passende Alternative gewinnt
+INLINE_PATTERN = re.compile(r"""
+      `(?P<code>[^`]+)`
+    | \[(?P<link_text>[^\]]+)\]\((?P<href>[^)\s]+)\)
+    | \*\*(?P<bold>.+?)\*\*
+    | (?<!\w)__(?P<bold_underscore>.+?)__(?!\w)
+    | ~~(?P<strikethrough>.+?)~~
+    | \*(?P<italic>[^*\s](?:[^*]*[^*\s])?)\*
+    | (?<!\w)_(?P<italic_underscore>[^_\s](?:[^_]*[^_\s])?)_(?!\w)
+""", re.VERBOSE)
+
+AST_CACHE_MAX_ENTRIES = 64
+
+_ast_cache = OrderedDict()
+_ast_cache_lock = threading.Lock()
+
+
+def parse_inline(text, styles=frozenset(), href=None):
+    """Splits one line into Spans; nested markup (e.g. italic inside bold) is resolved recursively."""
+    spans = []
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        if match.start() > position:
+            spans.append(Span(text[position:match.start()], styles, href))
+        position = match.end()
+
+        if match.group("code") is not None:
+            spans.append(Span(match.group("code"), styles | {"code"}, href))
+        elif match.group("link_text") is not None:
+            spans += parse_inline(match.group("link_text"), styles | {"link"}, match.group("href"))
+        else:
+            name = match.lastgroup
+            inner = match.group(name)
+            style = name.replace("_underscore", "")
+            spans += parse_inline(inner, styles | {style}, href)
+
+    if position < len(text):
+        spans.append(Span(text[position:], styles, href))
+    return spans
+
+
+def parse_lines(lines, in_code=False):
+    """
+    Tokenizes complete lines into Blocks in a single pass. in_code is the
+    code block state before the first line; returns (blocks, in_code) so a
+    growing text can be parsed piece by piece.
+    """
+    blocks = []
+    for line in lines:
+        if line.startswith(FENCE_PREFIX):
+            in_code = not in_code
+            continue
+        if in_code:
+            blocks.append(Block("code", (Span(line),)))
+            continue
+
+        match = HEADING_PATTERN.match(line)
+        if match:
+            blocks.append(Block("heading", tuple(parse_inline(match.group(2))), len(match.group(1))))
+            continue
+        match = QUOTE_PATTERN.match(line)
+        if match:
+            blocks.append(Block("quote", tuple(parse_inline(match.group(1)))))
+            continue
+        match = LIST_PATTERN.match(line)
+        if match:
+            marker = match.group(2)
+            blocks.append(Block("list_item", tuple(parse_inline(match.group(3))),
+                                len(match.group(1)) // 2,
+                                "•" if marker in "-*+" else marker))
+            continue
+        blocks.append(Block("paragraph", tuple(parse_inline(line))))
+    return blocks, in_code
+
+
+def parse_markdown(text):
+    """
+    Parses a complete Markdown text into a tuple of Blocks. Results are
+    cached by a hash of the content, so re-rendering or exporting the same
+    answer does not tokenize it again.
+    """
+    key = hashlib.sha256(text.encode("utf-8")).digest()
+    with _ast_cache_lock:
+        blocks = _ast_cache.get(key)
+        if blocks is not None:
+            _ast_cache.move_to_end(key)
+            return blocks
+
+    blocks = tuple(parse_lines(text.split("\n"))[0])
+
+    with _ast_cache_lock:
+        _ast_cache[key] = blocks
+        if len(_ast_cache) > AST_CACHE_MAX_ENTRIES:
+            _ast_cache.popitem(last=False)
+    return blocks
+
+
+def block_text(block):
+    """Plain text of a block without markup."""
+    return "".join(span.text for span in block.spans)
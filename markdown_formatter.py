@@ -1,12 +1,16 @@
 
 import tkinter as tk
+from collections import Counter
 from tkinter import ttk
 
+from markdown_ast import parse_lines, parse_markdown
+
 
 #defining the tags
 def configure_markdown_tags(text_widget):
     text_widget.tag_config("bold", font=("Helvetica", 12, "bold"))
     text_widget.tag_config("italic", font=("Helvetica", 12, "italic"))
+    text_widget.tag_config("bold_italic", font=("Helvetica", 12, "bold italic"))
     text_widget.tag_config("underline", font=("Helvetica", 12, "underline"))
     text_widget.tag_config("strikethrough", font=("Helvetica", 12, "overstrike"))
     text_widget.tag_config("h1", font=("Helvetica", 24, "bold"))
@@ -17,83 +21,153 @@ def configure_markdown_tags(text_widget):
     text_widget.tag_config("h6", font=("Helvetica", 10, "bold"))
     text_widget.tag_config("code", font=("Courier", 12, "normal"))
     text_widget.tag_config("blockquote", font=("Helvetica", 12, "italic"))
-    text_widget.tag_config("link", font=("Helvetica", 12, "underline"))
-#TODO funtkionen fertigstellen mit allen ausgaben
+    text_widget.tag_config("link", font=("Helvetica", 12, "underline"), foreground="blue")
+    text_widget.tag_config("list_item", lmargin1=10, lmargin2=25)
+
+# Markierung vor der zuletzt gerenderten, noch unvollständigen Zeile (MarkdownRenderer)
+TAIL_MARK = "markdown_tail"
+BLOCK_TAGS = {"quote": "blockquote", "list_item": "list_item", "code": "code"}
+INLINE_TAGS = ("code", "strikethrough", "link")
+
+
+class _RenderBuffer:
+    """Collects the rendered text and the character ranges of each tag."""
+
+    def __init__(self):
+        self.parts = []
+        self.length = 0
+        self.ranges = {}
+
+    def add(self, text, tags=()):
+        if text:
+            for tag in tags:
+                self.ranges.setdefault(tag, []).append((self.length, self.length + len(text)))
+        self.parts.append(text)
+        self.length += len(text)
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+
+def _span_tags(span):
+    tags = [tag for tag in INLINE_TAGS if tag in span.styles]
+    if "bold" in span.styles and "italic" in span.styles:
+        tags.append("bold_italic")
+    elif "bold" in span.styles:
+        tags.append("bold")
+    elif "italic" in span.styles:
+        tags.append("italic")
+    return tags
+
+
+def _render_blocks(blocks, buffer):
+    """Renders AST blocks (see markdown_ast) into buffer, one line per block."""
+    for block in blocks:
+        if block.kind == "heading":
+            line_tags = [f"h{block.level}"]
+        else:
+            line_tags = [BLOCK_TAGS[block.kind]] if block.kind in BLOCK_TAGS else []
+
+        start = buffer.length
+        if block.kind == "list_item":
+            buffer.add("    " * block.level + block.marker + " ")
+        for span in block.spans:
+            buffer.add(span.text, _span_tags(span))
+        buffer.add("\n")
+        for tag in line_tags:
+            buffer.ranges.setdefault(tag, []).append((start, buffer.length))
+
+
+def render_markdown(mark_down_text):
+    """
+    Renders Markdown to plain text and tag ranges without touching Tk.
+    Returns (text, ranges) where ranges maps each tag to a list of
+    (start, end) character offsets into text.
+    """
+    buffer = _RenderBuffer()
+    _render_blocks(parse_markdown(mark_down_text), buffer)
+    return buffer.text, buffer.ranges
+
+
+def _tagged_segments(text, ranges):
+    """
+    Splits text at every tag boundary into alternating segment and tag tuple
+    arguments for a single Text.insert(index, chars, tags, chars, tags, ...).
+    """
+    starts, ends = {}, {}
+    for tag, spans in ranges.items():
+        for start, end in spans:
+            if start < end:
+                starts.setdefault(start, []).append(tag)
+                ends.setdefault(end, []).append(tag)
+
+    active = Counter()
+    arguments = []
+    boundaries = sorted({0, len(text), *starts, *ends})
+    for start, end in zip(boundaries, boundaries[1:]):
+        for tag in ends.get(start, ()):
+            active[tag] -= 1
+        for tag in starts.get(start, ()):
+            active[tag] += 1
+        arguments += [text[start:end], tuple(tag for tag, count in active.items() if count > 0)]
+    return arguments
+
+
+def _insert_rendered(text_widget, text, ranges):
+    # Ein einziger Tcl-Aufruf für Text und Tags. Tk 8.6 zählt Zeichen außerhalb der BMP
+    # (z. B. Emojis) doppelt, daher keine Indizes aus Python-Offsets ("+Nc") berechnen
+    if text:
+        text_widget.insert("end-1c", *_tagged_segments(text, ranges))
+
 
 def markdown_to_tkinter_text(mark_down_text, text_widget):
     text_widget.delete(1.0, tk.END)  # Clear existing content
-
-    # Process line-based formatting
-    lines = mark_down_text.split("\n")
-    i = 0
-
-    while i < len(lines):
-        line = lines[i]
-
-        # Handle headings
-        if line.startswith("# "):
-            text_widget.insert(tk.END, line[2:] + "\n", "h1")
-        elif line.startswith("## "):
-            text_widget.insert(tk.END, line[3:] + "\n", "h2")
-        elif line.startswith("### "):
-            text_widget.insert(tk.END, line[4:] + "\n", "h3")
-        elif line.startswith("#### "):
-            text_widget.insert(tk.END, line[5:] + "\n", "h4")
-        elif line.startswith("##### "):
-            text_widget.insert(tk.END, line[6:] + "\n", "h5")
-        elif line.startswith("###### "):
-            text_widget.insert(tk.END, line[7:] + "\n", "h6")
-        # Handle code blocks
-        elif line.startswith("```"):
-            code_block = []
-            i += 1  # Skip the opening ```
-
-            # Collect all lines until closing ```
-            while i < len(lines) and not lines[i].startswith("```"):
-                code_block.append(lines[i])
-                i += 1
-
-            text_widget.insert(tk.END, "\n".join(code_block) + "\n", "code")
-        # Handle blockquotes
-        elif line.startswith("> "):
-            text_widget.insert(tk.END, line[2:] + "\n", "blockquote")
-        # Regular text
+    _insert_rendered(text_widget, *render_markdown(mark_down_text))
+
+
+class MarkdownRenderer:
+    """
+    Renders a growing Markdown text (e.g. a streamed answer) into a Text
+    widget. update() only inserts the lines completed since the last call
+    and re-renders the unfinished last line; if the text no longer extends
+    the previous one, it is rendered from scratch.
+    """
+
+    def __init__(self, text_widget):
+        self.text_widget = text_widget
+        self._reset(clear=False)
+
+    def _reset(self, clear=True):
+        self._source = ""
+        self._in_code = False
+        if clear:
+            self.text_widget.delete(1.0, tk.END)
+        # Vorhandener Inhalt (z. B. ein Platzhalter) wird beim ersten update() ersetzt
+        self.text_widget.mark_set(TAIL_MARK, "1.0")
+        self.text_widget.mark_gravity(TAIL_MARK, tk.LEFT)
+
+    def render(self, mark_down_text):
+        """Replaces the widget content with the rendered text."""
+        self._reset()
+        self.update(mark_down_text)
+
+    def update(self, mark_down_text):
+        if mark_down_text.startswith(self._source):
+            self.text_widget.delete(TAIL_MARK, tk.END)
         else:
-            # Process inline formatting
-            process_inline_formatting(text_widget, line)
-            text_widget.insert(tk.END, "\n")
-
-        i += 1
-
-
-def process_inline_formatting(text_widget, line):
-    # Split the line into segments to handle different formatting
-    current_pos = 0
-
-    # Process bold (**text**)
-    while "**" in line[current_pos:]:
-        start = line.find("**", current_pos)
-        if start == -1:
-            break
-
-        # Insert text before the bold marker
-        text_widget.insert(tk.END, line[current_pos:start])
-
-        # Find closing bold marker
-        end = line.find("**", start + 2)
-        if end == -1:
-            # No closing marker, insert rest as regular text
-            text_widget.insert(tk.END, line[start:])
-            return
-
-        # Insert the bold text with the bold tag
-        text_widget.insert(tk.END, line[start + 2:end], "bold")
-        current_pos = end + 2
-
-    # Process italic (*text* or _text_)
-    # This would be similar to bold processing
-
-    # Insert any remaining text
-    if current_pos < len(line):
-        text_widget.insert(tk.END, line[current_pos:])
-
+            self._reset()
+
+        complete_end = mark_down_text.rfind("\n") + 1
+        if complete_end > len(self._source):
+            buffer = _RenderBuffer()
+            new_lines = mark_down_text[len(self._source):complete_end - 1].split("\n")
+            blocks, self._in_code = parse_lines(new_lines, self._in_code)
+            _render_blocks(blocks, buffer)
+            _insert_rendered(self.text_widget, buffer.text, buffer.ranges)
+            self._source = mark_down_text[:complete_end]
+
+        self.text_widget.mark_set(TAIL_MARK, "end-1c")
+        buffer = _RenderBuffer()
+        _render_blocks(parse_lines([mark_down_text[complete_end:]], self._in_code)[0], buffer)
+        _insert_rendered(self.text_widget, buffer.text, buffer.ranges)
@@ -0,0 +1,222 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import get_metrics_dir
+
+METRICS_LOG_FILE = "metrics.jsonl"
+PROMETHEUS_FILE = "metrics.prom"
+
+# Anzeigenamen der Stufen für die Statusleiste
+STAGE_LABELS = {"validation": "Prüfung", "fetch": "Abruf", "parse": "Parsen", "normalize": "Bereinigen",
+                "llm": "KI"}
+
+
+class JobMetrics:
+    """
+    Thread-safe per-job metrics: seconds per stage (validation, fetch, parse,
+    llm), counters such as prompt size and LLM requests, and values where
+    only the first occurrence counts (time to first token).
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.first = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_first(self, name, value):
+        with self._lock:
+            self.first.setdefault(name, value)
+
+    def as_dict(self):
+        with self._lock:
+            result = {"stages_s": {stage: round(seconds, 4) for stage, seconds in self.stages.items()}}
+            result.update(self.counters)
+            result.update({name: round(value, 4) for name, value in self.first.items()})
+            return result
+
+
+_current_metrics = contextvars.ContextVar("job_metrics", default=None)
+
+
+@contextmanager
+def track_metrics():
+    """
+    Collects the metrics of everything that runs in this context into a
+    JobMetrics. Like llm_client.track_usage, worker threads must run in a copy
+    of the context; asyncio tasks and asyncio.to_thread copy it automatically.
+    """
+    metrics = JobMetrics()
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+def add_time(stage, seconds):
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.add_time(stage, seconds)
+
+
+def add_value(name, value=1):
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.add(name, value)
+
+
+def record_first(name, value):
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.record_first(name, value)
+
+
+@contextmanager
+def timed(stage):
+    """Adds the duration of the with block to the stage of the current job (no-op outside a job)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(stage, time.perf_counter() - started)
+
+
+def record_prompt(messages):
+    """Counts one LLM request and the size of its prompt in characters."""
+    add_value("llm_requests")
+    add_value("prompt_chars", sum(len(str(message.get("content", ""))) for message in messages))
+
+
+def format_metrics(metrics):
+    """Short summary for the status bar, e.g. "Abruf 0.42 s, KI 3.10 s (erstes Token 0.80 s)"."""
+    if not metrics:
+        return ""
+    parts = [f"{STAGE_LABELS.get(stage, stage)} {seconds:.2f} s"
+             for stage, seconds in metrics.get("stages_s", {}).items()]
+    if "ttft_s" in metrics and parts:
+        parts[-1] += f" (erstes Token {metrics['ttft_s']:.2f} s)"
+    if "content_chars_raw" in metrics:
+        parts.append(f"Text {metrics['content_chars_raw']} → {metrics['content_chars']} Zeichen")
+    return ", ".join(parts)
+
+
+class MetricsExporter:
+    """
+    Appends one JSON line per finished job to metrics.jsonl and rewrites
+    metrics.prom (Prometheus text format, e.g. for the node_exporter textfile
+    collector) with totals since the start of the process.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._stage_seconds = {}
+        self._stage_counts = {}
+        self._tokens = {"prompt": 0, "completion": 0, "cached": 0}
+        self._prompt_chars = 0
+        self._estimated_cost = 0.0
+        self._ttft_sum = 0.0
+        self._ttft_count = 0
+
+    def export(self, record):
+        """record: dict with status, metrics (JobMetrics.as_dict) and usage (TokenUsage.as_dict)."""
+        metrics = record.get("metrics") or {}
+        usage = record.get("usage") or {}
+        with self._lock:
+            status = record.get("status", "ok")
+            self._jobs[status] = self._jobs.get(status, 0) + 1
+            for stage, seconds in metrics.get("stages_s", {}).items():
+                self._stage_seconds[stage] = self._stage_seconds.get(stage, 0.0) + seconds
+                self._stage_counts[stage] = self._stage_counts.get(stage, 0) + 1
+            for name in self._tokens:
+                self._tokens[name] += usage.get(f"{name}_tokens", 0)
+            self._prompt_chars += metrics.get("prompt_chars", 0)
+            self._estimated_cost += metrics.get("preflight_cost_usd", 0.0)
+            if "ttft_s" in metrics:
+                self._ttft_sum += metrics["ttft_s"]
+                self._ttft_count += 1
+
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(os.path.join(self.directory, METRICS_LOG_FILE), "a", encoding="utf-8") as log:
+                    log.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._write_prometheus()
+            except OSError:
+                # Metriken dürfen eine Analyse nie fehlschlagen lassen
+                pass
+
+    def _write_prometheus(self):
+        lines = ["# HELP ki_analysis_jobs_total Finished analyses by status.",
+                 "# TYPE ki_analysis_jobs_total counter"]
+        lines += [f'ki_analysis_jobs_total{{status="{status}"}} {count}'
+                  for status, count in sorted(self._jobs.items())]
+        lines += ["# HELP ki_analysis_stage_seconds Time spent per stage.",
+                  "# TYPE ki_analysis_stage_seconds summary"]
+        for stage in sorted(self._stage_seconds):
+            lines.append(f'ki_analysis_stage_seconds_sum{{stage="{stage}"}} '
+                         f'{self._stage_seconds[stage]:.6f}')
+            lines.append(f'ki_analysis_stage_seconds_count{{stage="{stage}"}} '
+                         f'{self._stage_counts[stage]}')
+        lines += ["# HELP ki_analysis_time_to_first_token_seconds Time to the first streamed token.",
+                  "# TYPE ki_analysis_time_to_first_token_seconds summary",
+                  f"ki_analysis_time_to_first_token_seconds_sum {self._ttft_sum:.6f}",
+                  f"ki_analysis_time_to_first_token_seconds_count {self._ttft_count}",
+                  "# HELP ki_analysis_tokens_total Tokens reported by the API.",
+                  "# TYPE ki_analysis_tokens_total counter"]
+        lines += [f'ki_analysis_tokens_total{{type="{name}"}} {count}'
+                  for name, count in self._tokens.items()]
+        lines += ["# HELP ki_analysis_prompt_chars_total Characters sent in prompts.",
+                  "# TYPE ki_analysis_prompt_chars_total counter",
+                  f"ki_analysis_prompt_chars_total {self._prompt_chars}",
+                  "# HELP ki_analysis_estimated_cost_usd_total Cost estimated before sending.",
+                  "# TYPE ki_analysis_estimated_cost_usd_total counter",
+                  f"ki_analysis_estimated_cost_usd_total {self._estimated_cost:.6f}"]
+
+        # Atomar ersetzen, damit ein Collector nie eine halb geschriebene Datei liest
+        path = os.path.join(self.directory, PROMETHEUS_FILE)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as prom:
+            prom.write("\n".join(lines) + "\n")
+        os.replace(temporary_path, path)
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_metrics_exporter():
+    """Gibt den gemeinsamen MetricsExporter zurück (Verzeichnis siehe config.get_metrics_dir)."""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = MetricsExporter(get_metrics_dir())
+        return _exporter
+
+
+def export_job_metrics(source, prompt_type, status, total_s, details):
+    """Builds the metrics record of a finished job and hands it to the exporter."""
+    record = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "source": source,
+        "prompt_type": prompt_type,
+        "status": status,
+        "total_s": round(total_s, 4),
+        "metrics": details.get("metrics"),
+        "usage": details.get("usage"),
+    }
+    get_metrics_exporter().export(record)
+    return record
@@ -0,0 +1,74 @@
+from xml.sax.saxutils import escape
+
+from markdown_ast import parse_markdown, block_text
+
+HEADING_STYLES = ["Heading2", "Heading3", "Heading4", "Heading5", "Heading6", "Heading6"]
+
+
+def span_markup(span):
+    """Converts one AST span into reportlab paragraph markup."""
+    markup = escape(span.text)
+    if "code" in span.styles:
+        markup = f'<font face="Courier">{markup}</font>'
+    if "bold" in span.styles:
+        markup = f"<b>{markup}</b>"
+    if "italic" in span.styles:
+        markup = f"<i>{markup}</i>"
+    if "strikethrough" in span.styles:
+        markup = f"<strike>{markup}</strike>"
+    if "link" in span.styles and span.href:
+        markup = f'<a href="{escape(span.href, {chr(34): "&quot;"})}" color="blue">{markup}</a>'
+    return markup
+
+
+def note_paragraphs(markdown):
+    """
+    Converts a Markdown note into (style name, content) pairs using the same
+    AST as the Tk renderer. Content is paragraph markup, except for "Code"
+    where it is the raw text of a whole code block.
+    """
+    paragraphs = []
+    code_lines = []
+    for block in parse_markdown(markdown):
+        if block.kind == "code":
+            code_lines.append(block_text(block))
+            continue
+        if code_lines:
+            paragraphs.append(("Code", "\n".join(code_lines)))
+            code_lines = []
+
+        markup = "".join(span_markup(span) for span in block.spans)
+        if block.kind == "heading":
+            paragraphs.append((HEADING_STYLES[block.level - 1], markup))
+        elif block.kind == "quote":
+            paragraphs.append(("Italic", markup))
+        elif block.kind == "list_item":
+            paragraphs.append(("Bullet", f"<bullet>{escape(block.marker)}</bullet>{markup}"))
+        elif markup.strip():
+            paragraphs.append(("Normal", markup))
+    if code_lines:
+        paragraphs.append(("Code", "\n".join(code_lines)))
+    return paragraphs
+
+
+def export_notes_pdf(file_path, notes):
+    """Writes the Markdown notes as formatted PDF (reportlab is imported lazily)."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Spacer, Paragraph, Preformatted
+
+    pdf = SimpleDocTemplate(file_path, pagesize=letter)
+    styles = getSampleStyleSheet()
+    story = [Paragraph("Notizen", styles["Heading1"]), Spacer(1, 0.25 * inch)]
+
+    for i, note in enumerate(notes, 1):
+        story.append(Paragraph(f"Notiz {i}", styles["Heading2"]))
+        for style, content in note_paragraphs(note):
+            if style == "Code":
+                story.append(Preformatted(content, styles["Code"]))
+            else:
+                story.append(Paragraph(content, styles[style]))
+        story.append(Spacer(1, 0.1 * inch))
+
+    pdf.build(story)
@@ -0,0 +1,147 @@
+import mmap
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# Anzahl der Prozesse für die seitenparallele Extraktion
+PDF_WORKERS = min(4, os.cpu_count() or 1)
+# Fork aus einem Prozess mit Threads (GUI, Event-Loop, Worker-Pools) kann im Kindprozess
+# gehaltene Locks erben; die Worker werden deshalb neu gestartet statt geforkt
+PROCESS_START_METHOD = ("forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+                        else "spawn")
+# So oft wird während der Extraktion auf einen Abbruch geprüft (Sekunden)
+CANCEL_POLL_INTERVAL = 0.2
+# Seiten pro Arbeitspaket; kleinere PDFs werden ohne Prozesspool verarbeitet
+PAGES_PER_TASK = 16
+# Weniger Text pro Seite deutet auf ein gescanntes PDF (nur Bilder) hin
+MIN_CHARS_PER_PAGE = 100
+
+
+def _open_reader(file_object):
+    from pypdf import PdfReader
+    # Die Datei wird per mmap eingeblendet statt vollständig eingelesen
+    mapped = mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ)
+    return PdfReader(mapped), mapped
+
+
+def _extract_page_range(pdf_path, start, end):
+    """Extracts the text of pages [start, end); runs in a worker process."""
+    with open(pdf_path, "rb") as file_object:
+        reader, mapped = _open_reader(file_object)
+        try:
+            pages = []
+            for page in reader.pages[start:end]:
+                try:
+                    pages.append(page.extract_text() or "")
+                except Exception:
+                    # Einzelne defekte Seiten sollen nicht das ganze PDF verwerfen
+                    pages.append("")
+            return pages
+        finally:
+            mapped.close()
+
+
+def _page_count(pdf_path):
+    with open(pdf_path, "rb") as file_object:
+        reader, mapped = _open_reader(file_object)
+        try:
+            if reader.is_encrypted:
+                return None
+            return len(reader.pages)
+        finally:
+            mapped.close()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_pdf_executor():
+    """Gibt den gemeinsamen Prozesspool für die Seitenextraktion zurück (lazy erzeugt)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context(PROCESS_START_METHOD))
+        return _executor
+
+
+def _discard_executor(executor):
+    # Ein abgestürzter Worker macht den Pool unbrauchbar; der nächste Aufruf startet einen neuen
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_pdf_pages(pdf_path, max_workers=PDF_WORKERS, pages_per_task=PAGES_PER_TASK,
+                      cancel_token=None):
+    """
+    Extracts the text of every page, in page order.
+    Large PDFs are split into page ranges that are processed in parallel on
+    the shared process pool (see get_pdf_executor); with max_workers <= 1 the
+    pages are extracted in this process. Returns None for encrypted PDFs.
+    Raises AnalysisCancelled once cancel_token is cancelled; page ranges that
+    have not started yet are dropped.
+    """
+    page_count = _page_count(pdf_path)
+    if page_count is None:
+        return None
+
+    ranges = [(start, min(start + pages_per_task, page_count))
+              for start in range(0, page_count, pages_per_task)]
+    if len(ranges) <= 1 or max_workers <= 1:
+        pages = []
+        for start, end in ranges:
+            if cancel_token is not None:
+                cancel_token.check()
+            pages.extend(_extract_page_range(pdf_path, start, end))
+        return pages
+
+    executor = get_pdf_executor()
+    futures = [executor.submit(_extract_page_range, pdf_path, start, end) for start, end in ranges]
+    try:
+        pending = set(futures)
+        while pending:
+            if cancel_token is not None:
+                cancel_token.check()
+            _, pending = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        return [text for future in futures for text in future.result()]
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def looks_scanned(pages):
+    """True if the PDF has (almost) no text layer, e.g. scanned documents."""
+    if not pages:
+        return True
+    return sum(len(page.strip()) for page in pages) / len(pages) < MIN_CHARS_PER_PAGE
+
+
+def extract_pdf_text(pdf_path, max_workers=PDF_WORKERS, cancel_token=None):
+    """
+    Extracts the text of a PDF locally.
+    Returns None if pypdf is not installed, the PDF is encrypted or scanned,
+    or cancel_token was cancelled; callers then check the token or fall back
+    to the Assistants upload path.
+    """
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return None
+
+    try:
+        pages = extract_pdf_pages(pdf_path, max_workers, cancel_token=cancel_token)
+    except Exception:
+        return None
+    if pages is None or looks_scanned(pages):
+        return None
+    return "\n\n".join(page.strip() for page in pages if page.strip())
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from config import get_cache_dir
+from polling import backoff_delays, sleep_until_next_poll
+
+# Remote-Objekte (Dateien, Vector Stores), die so lange nicht genutzt wurden, werden gelöscht
+REMOTE_OBJECT_MAX_AGE = 7 * 24 * 60 * 60
+# Server-seitiges Ablaufdatum der Vector Stores als zweite Absicherung
+VECTOR_STORE_EXPIRY_DAYS = 7
+# Höchstens so oft wird nach veralteten Remote-Objekten gesucht
+GC_INTERVAL = 60 * 60
+
+# Abfrageintervall beim Warten auf die Indexierung (wächst exponentiell bis zum Maximum)
+VECTOR_STORE_POLL_INITIAL = 0.5
+VECTOR_STORE_POLL_MAX = 5
+VECTOR_STORE_TIMEOUT = 300
+
+
+def file_sha256(path):
+    """Hashes a file in blocks without loading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_object:
+        for block in iter(lambda: file_object.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _vector_stores(client):
+    # Neuere SDK-Versionen bieten Vector Stores außerhalb von client.beta an
+    vector_stores = getattr(client, "vector_stores", None)
+    return vector_stores if vector_stores is not None else client.beta.vector_stores
+
+
+def _is_not_found(error):
+    return getattr(error, "status_code", None) == 404
+
+
+class PDFSessionStore:
+    """
+    Reuses remote Assistants API objects across PDF analyses.
+    Uploaded files and their vector stores are keyed by the SHA-256 of the PDF
+    content, assistants by model and instructions. The mapping is kept in a
+    local SQLite registry so it survives restarts; objects that have not been
+    used for REMOTE_OBJECT_MAX_AGE seconds are deleted remotely by
+    collect_garbage().
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._last_gc = 0.0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pdf_files ("
+                " sha256 TEXT PRIMARY KEY,"
+                " file_id TEXT NOT NULL,"
+                " vector_store_id TEXT NOT NULL,"
+                " last_used REAL NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS assistants ("
+                " key TEXT PRIMARY KEY,"
+                " assistant_id TEXT NOT NULL,"
+                " last_used REAL NOT NULL)")
+
+    def _key_lock(self, key):
+        # Verhindert, dass dieselbe PDF parallel mehrfach hochgeladen wird
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _fetchone(self, query, params):
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()
+
+    def _execute(self, query, params):
+        with self._lock, self._conn:
+            self._conn.execute(query, params)
+
+    def get_vector_store(self, client, pdf_path, cancel_token=None, sha256=None):
+        """
+        Returns the ID of a ready vector store containing the PDF, uploading it only once.
+        Waiting for the indexing stops early if cancel_token is cancelled. sha256 is
+        the file's digest if the caller already has it; otherwise the file is hashed.
+        """
+        if sha256 is None:
+            sha256 = file_sha256(pdf_path)
+        with self._key_lock(f"pdf:{sha256}"):
+            row = self._fetchone(
+                "SELECT file_id, vector_store_id FROM pdf_files WHERE sha256 = ?", (sha256,))
+            if row is not None:
+                try:
+                    # Ohne Vector Store ist der Eintrag ein Rest eines abgebrochenen Uploads
+                    vector_store = _vector_stores(client).retrieve(row[1]) if row[1] else None
+                    if vector_store is not None and vector_store.status != "expired":
+                        self._execute("UPDATE pdf_files SET last_used = ? WHERE sha256 = ?",
+                                      (time.time(), sha256))
+                        return row[1]
+                except Exception as e:
+                    if not _is_not_found(e):
+                        raise
+                # Remote-Objekte sind nicht mehr vorhanden: Eintrag verwerfen und neu hochladen
+                self._delete_remote_file(client, row[0])
+                self._execute("DELETE FROM pdf_files WHERE sha256 = ?", (sha256,))
+
+            with open(pdf_path, "rb") as file_object:
+                uploaded = client.files.create(file=file_object, purpose="assistants")
+            vector_store = None
+            try:
+                vector_store = _vector_stores(client).create(
+                    name=f"pdf-{sha256[:16]}",
+                    file_ids=[uploaded.id],
+                    expires_after={"anchor": "last_active_at", "days": VECTOR_STORE_EXPIRY_DAYS})
+                self._wait_until_indexed(client, vector_store, cancel_token)
+            except BaseException:
+                # Zeitüberschreitung, Abbruch oder Indexierungsfehler: Remote-Objekte nicht verwaisen
+                # lassen. Scheitert das Löschen, übernimmt collect_garbage den Eintrag später
+                vector_store_id = vector_store.id if vector_store is not None else ""
+                if not self._delete_remote_objects(client, uploaded.id, vector_store_id):
+                    self._register_file(sha256, uploaded.id, vector_store_id)
+                raise
+
+            self._register_file(sha256, uploaded.id, vector_store.id)
+            return vector_store.id
+
+    def _register_file(self, sha256, file_id, vector_store_id):
+        self._execute(
+            "INSERT OR REPLACE INTO pdf_files (sha256, file_id, vector_store_id, last_used) "
+            "VALUES (?, ?, ?, ?)", (sha256, file_id, vector_store_id, time.time()))
+
+    def _wait_until_indexed(self, client, vector_store, cancel_token=None):
+        deadline = time.monotonic() + VECTOR_STORE_TIMEOUT
+        delays = backoff_delays(VECTOR_STORE_POLL_INITIAL, VECTOR_STORE_POLL_MAX)
+        while vector_store.file_counts.in_progress:
+            if not sleep_until_next_poll(delays, deadline, cancel_token):
+                if cancel_token is not None:
+                    cancel_token.check()
+                raise TimeoutError("Indexing the PDF took too long")
+            vector_store = _vector_stores(client).retrieve(vector_store.id)
+        if vector_store.file_counts.failed:
+            raise RuntimeError("The PDF could not be indexed")
+
+    def get_assistant(self, client, model, instructions):
+        """Returns the ID of an assistant for model and instructions, creating it only once."""
+        key = hashlib.sha256(f"{model}\n{instructions}".encode("utf-8")).hexdigest()
+        with self._key_lock(f"assistant:{key}"):
+            row = self._fetchone("SELECT assistant_id FROM assistants WHERE key = ?", (key,))
+            if row is not None:
+                try:
+                    client.beta.assistants.retrieve(row[0])
+                    self._execute("UPDATE assistants SET last_used = ? WHERE key = ?",
+                                  (time.time(), key))
+                    return row[0]
+                except Exception as e:
+                    if not _is_not_found(e):
+                        raise
+                    self._execute("DELETE FROM assistants WHERE key = ?", (key,))
+
+            assistant = client.beta.assistants.create(
+                model=model,
+                instructions=instructions,
+                tools=[{"type": "file_search"}]
+            )
+            self._execute(
+                "INSERT OR REPLACE INTO assistants (key, assistant_id, last_used) VALUES (?, ?, ?)",
+                (key, assistant.id, time.time()))
+            return assistant.id
+
+    @staticmethod
+    def _delete_remote_file(client, file_id):
+        try:
+            client.files.delete(file_id)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _delete_remote_objects(client, file_id, vector_store_id):
+        """Deletes a vector store and its file; returns False if one of them may still exist."""
+        deleted = True
+        for delete, object_id in ((_vector_stores(client).delete, vector_store_id),
+                                  (client.files.delete, file_id)):
+            if not object_id:
+                continue
+            try:
+                delete(object_id)
+            except Exception as e:
+                deleted = deleted and _is_not_found(e)
+        return deleted
+
+    def collect_garbage(self, client, max_age=REMOTE_OBJECT_MAX_AGE, force=False):
+        """
+        Deletes files, vector stores and assistants that have not been used for
+        max_age seconds. Runs at most once per GC_INTERVAL unless force is set.
+        Returns the number of removed registry entries.
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_gc < GC_INTERVAL:
+                return 0
+            self._last_gc = now
+            stale_files = self._conn.execute(
+                "SELECT sha256, file_id, vector_store_id FROM pdf_files WHERE last_used < ?",
+                (now - max_age,)).fetchall()
+            stale_assistants = self._conn.execute(
+                "SELECT key, assistant_id FROM assistants WHERE last_used < ?",
+                (now - max_age,)).fetchall()
+
+        for sha256, file_id, vector_store_id in stale_files:
+            self._delete_remote_objects(client, file_id, vector_store_id)
+            self._execute("DELETE FROM pdf_files WHERE sha256 = ?", (sha256,))
+
+        for key, assistant_id in stale_assistants:
+            try:
+                client.beta.assistants.delete(assistant_id)
+            except Exception:
+                pass
+            self._execute("DELETE FROM assistants WHERE key = ?", (key,))
+
+        return len(stale_files) + len(stale_assistants)
+
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+
+def get_pdf_session_store():
+    """Gibt die gemeinsame PDFSessionStore-Instanz zurück (lazy erzeugt)."""
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = PDFSessionStore(os.path.join(get_cache_dir(), "pdf_sessions.sqlite3"))
+        return _session_store
@@ -0,0 +1,180 @@
+import asyncio
+import time
+
+from analysis import (text_extraction_youtube_website, real_ai_analyse_messages,
+                      real_ai_analyse_chunked, real_ai_analyse_combined, analyse_pdf, is_pdf_file,
+                      LLM_MODEL)
+from async_analysis import (async_text_extraction_youtube_website, async_ai_analyse_messages,
+                            async_ai_analyse_chunked, async_ai_analyse_combined, async_analyse_pdf)
+from budget import fit_content
+from errors import ErrorMessage, is_error
+from llm_client import track_usage
+from metrics import track_metrics
+from prompts import MODE_MAP_REDUCE, MODE_COMBINED, build_messages, get_instruction, get_analysis_mode
+
+
+def is_error_result(text):
+    """True for empty results and the error messages (errors.ErrorMessage) of extraction and analysis."""
+    return not text or is_error(text)
+
+
+def _cancelled_result(cancel_token):
+    if cancel_token is not None and cancel_token.cancelled:
+        return ErrorMessage(f"Fehler: {cancel_token.reason}")
+    return None
+
+
+def analyse_text(prompt_type, custom_prompt, content, on_delta=None, use_cache=True,
+                 cancel_token=None):
+    # Der Analysemodus (einzelne Anfrage, Map-Reduce oder alle Analysen) hängt vom Prompt-Typ ab
+    if get_analysis_mode(prompt_type) == MODE_COMBINED:
+        return real_ai_analyse_combined(content, use_cache=use_cache, cancel_token=cancel_token)
+    if get_analysis_mode(prompt_type) == MODE_MAP_REDUCE:
+        return real_ai_analyse_chunked(get_instruction(prompt_type, custom_prompt), content,
+                                       on_delta=on_delta, use_cache=use_cache,
+                                       cancel_token=cancel_token)
+    # Einzelne Anfrage: zu lange Inhalte vorher gemäß Token-Budget kürzen oder abschnittsweise analysieren
+    instruction = get_instruction(prompt_type, custom_prompt)
+    content, chunked = fit_content(content, instruction, LLM_MODEL)
+    if chunked:
+        return real_ai_analyse_chunked(instruction, content, on_delta=on_delta, use_cache=use_cache,
+                                       cancel_token=cancel_token)
+    return real_ai_analyse_messages(build_messages(content, instruction), on_delta, use_cache,
+                                    cancel_token=cancel_token)
+
+
+def analyse_source(source, prompt_type, custom_prompt="", on_delta=None, details=None,
+                   use_cache=True, cancel_token=None):
+    """
+    Runs extraction and analysis for one source (website, YouTube link, PDF or
+    text file) and returns the result text.
+    If a dict is passed as details, it receives the extracted content, the
+    duration of the extraction and analysis steps in seconds, the token
+    usage ("usage", see llm_client.TokenUsage) and per-stage metrics such as
+    fetch, parse and LLM time ("metrics", see metrics.JobMetrics).
+    With use_cache=False the LLM response cache is bypassed.
+    Extraction errors are returned directly instead of being sent to the model.
+    A cancellation.CancellationToken stops the job between steps and aborts
+    running requests; the result is then an error message with the reason.
+    """
+    details = {} if details is None else details
+    with track_usage() as usage, track_metrics() as metrics:
+        try:
+            return _analyse_source(source, prompt_type, custom_prompt, on_delta, details, use_cache,
+                                   cancel_token)
+        finally:
+            details["usage"] = usage.as_dict()
+            details["metrics"] = metrics.as_dict()
+
+
+def _analyse_source(source, prompt_type, custom_prompt, on_delta, details, use_cache,
+                    cancel_token=None):
+    lowered = source.lower()
+
+    if is_pdf_file(source) and not ("http" in lowered or "youtu" in lowered):
+        # Lokale PDFs: Extraktion und Analyse übernimmt analyse_pdf
+        started = time.perf_counter()
+        details["content"] = source
+        result = analyse_pdf(source, get_instruction(prompt_type, custom_prompt), on_delta=on_delta,
+                             use_cache=use_cache,
+                             combined=get_analysis_mode(prompt_type) == MODE_COMBINED,
+                             cancel_token=cancel_token)
+        details["extraction_s"] = 0.0
+        details["analysis_s"] = time.perf_counter() - started
+        return _cancelled_result(cancel_token) or result
+
+    started = time.perf_counter()
+    content = text_extraction_youtube_website(source, cancel_token=cancel_token)
+    details["content"] = content
+    details["extraction_s"] = time.perf_counter() - started
+    cancelled = _cancelled_result(cancel_token)
+    if cancelled:
+        details["analysis_s"] = 0.0
+        return cancelled
+    if is_error_result(content):
+        details["analysis_s"] = 0.0
+        return content or ErrorMessage("Fehler: Kein Inhalt gefunden")
+
+    started = time.perf_counter()
+    result = analyse_text(prompt_type, custom_prompt, content, on_delta, use_cache, cancel_token)
+    details["analysis_s"] = time.perf_counter() - started
+    return _cancelled_result(cancel_token) or result
+
+
+async def async_analyse_text(prompt_type, custom_prompt, content, on_delta=None, use_cache=True):
+    """Async variant of analyse_text."""
+    if get_analysis_mode(prompt_type) == MODE_COMBINED:
+        return await async_ai_analyse_combined(content, use_cache=use_cache)
+    if get_analysis_mode(prompt_type) == MODE_MAP_REDUCE:
+        return await async_ai_analyse_chunked(get_instruction(prompt_type, custom_prompt), content,
+                                              on_delta=on_delta, use_cache=use_cache)
+    instruction = get_instruction(prompt_type, custom_prompt)
+    content, chunked = fit_content(content, instruction, LLM_MODEL)
+    if chunked:
+        return await async_ai_analyse_chunked(instruction, content, on_delta=on_delta,
+                                              use_cache=use_cache)
+    return await async_ai_analyse_messages(build_messages(content, instruction), on_delta, use_cache)
+
+
+async def async_analyse_source(source, prompt_type, custom_prompt="", on_delta=None, details=None,
+                               use_cache=True, cancel_token=None):
+    """
+    Async variant of analyse_source. Many sources can be analysed concurrently
+    on one event loop; the per-stage limits are defined in async_analysis.
+    With a cancel_token the work runs in its own task, which is cancelled on
+    cancel() (from any thread) or when the token's deadline passes.
+    """
+    details = {} if details is None else details
+    with track_usage() as usage, track_metrics() as metrics:
+        try:
+            work = _async_analyse_source(source, prompt_type, custom_prompt, on_delta, details,
+                                         use_cache, cancel_token)
+            if cancel_token is None:
+                return await work
+            return await _run_cancellable(work, cancel_token)
+        finally:
+            details["usage"] = usage.as_dict()
+            details["metrics"] = metrics.as_dict()
+
+
+async def _run_cancellable(work, cancel_token):
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(work)
+    remove_callback = cancel_token.add_callback(lambda: loop.call_soon_threadsafe(task.cancel))
+    try:
+        return await asyncio.wait_for(task, cancel_token.remaining())
+    except (asyncio.CancelledError, TimeoutError):
+        # Abbruch von außen (z. B. Beenden der Event-Loop) wird weitergereicht
+        if not cancel_token.cancelled or asyncio.current_task().cancelling():
+            raise
+        return ErrorMessage(f"Fehler: {cancel_token.reason}")
+    finally:
+        remove_callback()
+
+
+async def _async_analyse_source(source, prompt_type, custom_prompt, on_delta, details, use_cache,
+                                cancel_token=None):
+    lowered = source.lower()
+
+    if is_pdf_file(source) and not ("http" in lowered or "youtu" in lowered):
+        started = time.perf_counter()
+        details["content"] = source
+        result = await async_analyse_pdf(source, get_instruction(prompt_type, custom_prompt), on_delta,
+                                         use_cache, get_analysis_mode(prompt_type) == MODE_COMBINED,
+                                         cancel_token)
+        details["extraction_s"] = 0.0
+        details["analysis_s"] = time.perf_counter() - started
+        return result
+
+    started = time.perf_counter()
+    content = await async_text_extraction_youtube_website(source, cancel_token)
+    details["content"] = content
+    details["extraction_s"] = time.perf_counter() - started
+    if is_error_result(content):
+        details["analysis_s"] = 0.0
+        return content or ErrorMessage("Fehler: Kein Inhalt gefunden")
+
+    started = time.perf_counter()
+    result = await async_analyse_text(prompt_type, custom_prompt, content, on_delta, use_cache)
+    details["analysis_s"] = time.perf_counter() - started
+    return result
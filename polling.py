@@ -0,0 +1,24 @@
+import time
+
+
+def backoff_delays(initial, maximum, factor=2.0):
+    """Yields exponentially growing sleep intervals, capped at maximum."""
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * factor, maximum)
+
+
+def sleep_until_next_poll(delays, deadline, cancel_token=None):
+    """
+    Sleeps for the next backoff interval, but never past the deadline
+    (a time.monotonic() value). Returns False if the deadline has passed or
+    the cancel_token (see cancellation.CancellationToken) was cancelled.
+    """
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return False
+    if cancel_token is None:
+        time.sleep(min(next(delays), remaining))
+        return True
+    return not cancel_token.wait(min(next(delays), remaining))
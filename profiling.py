@@ -0,0 +1,212 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from config import get_profile_dir
+
+PROFILE_MODES = ("all", "cprofile", "sampling")
+# Abtastintervall des Sampling-Profilers in Sekunden
+SAMPLING_INTERVAL = 0.005
+PSTATS_SUMMARY_LINES = 60
+
+
+def get_profile_mode(argv=None):
+    """
+    Returns the profiling mode from "--profile[=mode]" in argv or the
+    KI_PROFILE environment variable, or None if profiling is off.
+    "1"/"on" mean "all" (cProfile and sampling).
+    """
+    mode = None
+    for argument in argv or []:
+        if argument == "--profile":
+            mode = "all"
+        elif argument.startswith("--profile="):
+            mode = argument.split("=", 1)[1]
+    if mode is None:
+        mode = os.environ.get("KI_PROFILE", "").strip().lower()
+    if mode in ("", "0", "off", "false"):
+        return None
+    if mode in ("1", "on", "true"):
+        return "all"
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unbekannter Profiling-Modus: {mode} (erlaubt: {', '.join(PROFILE_MODES)})")
+    return mode
+
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling profiler: a daemon thread records the stacks of all
+    other threads every interval seconds and counts identical stacks. The
+    result is written in collapsed-stack format ("frame;frame;frame count"),
+    which flamegraph.pl, speedscope and inferno read directly.
+    """
+
+    def __init__(self, interval=SAMPLING_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                                 f"{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as output:
+            for stack, count in self.samples.most_common():
+                output.write(f"{stack} {count}\n")
+
+
+class _StatsSnapshot:
+    """Stats of one profile in the form pstats.Stats accepts (an object with create_stats and stats)."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ThreadProfiler:
+    """
+    Deterministic cProfile for the calling thread and every thread started
+    while it is active (worker pools, the asyncio loop thread); the results
+    are merged into one pstats file. Up to Python 3.11 a profile only sees
+    its own thread, so each new thread gets its own cProfile.Profile via
+    threading.setprofile. From 3.12 cProfile is based on sys.monitoring: one
+    profile covers all threads and a second active one is rejected. Call
+    counts stay exact, but cProfile keeps a single call stack there, so the
+    times of overlapping threads are mixed; the sampling mode is exact per thread.
+    """
+
+    PROCESS_WIDE = sys.version_info >= (3, 12)
+
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def _new_profile(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Ein anderes Profiling-Werkzeug ist bereits aktiv
+            return
+        with self._lock:
+            self._profiles.append((threading.current_thread(), profile))
+
+    def _start_in_new_thread(self, frame, event, arg):
+        # Erster Profiling-Aufruf im neuen Thread: cProfile übernimmt den Hook
+        self._new_profile()
+
+    def start(self):
+        if not self.PROCESS_WIDE:
+            threading.setprofile(self._start_in_new_thread)
+        self._new_profile()
+
+    def stop(self):
+        """Stops profiling and returns one snapshot per profile for write_stats."""
+        if not self.PROCESS_WIDE:
+            threading.setprofile(None)
+        with self._lock:
+            profiles = list(self._profiles)
+
+        current = threading.current_thread()
+        snapshots = []
+        for thread, profile in profiles:
+            if thread is current or self.PROCESS_WIDE:
+                profile.disable()
+            # Bis 3.11 wirkt disable() nur im aufrufenden Thread. Noch laufende Threads
+            # (Event-Loop, Worker von to_thread) werden nur ausgelesen; ihr Profiler bleibt
+            # bis zum Ende des Threads angehängt, spätere Aufrufe fehlen in den Dateien
+            profile.snapshot_stats()
+            if profile.stats:
+                snapshots.append(_StatsSnapshot(profile.stats))
+        return snapshots
+
+    @staticmethod
+    def write_stats(snapshots, pstats_path, summary_path):
+        stats = pstats.Stats(*snapshots)
+        stats.dump_stats(pstats_path)
+
+        summary = io.StringIO()
+        pstats.Stats(pstats_path, stream=summary).sort_stats("cumulative").print_stats(
+            PSTATS_SUMMARY_LINES)
+        with open(summary_path, "w", encoding="utf-8") as output:
+            output.write(summary.getvalue())
+
+
+class ProfilingSession:
+    """Runs the profilers of one mode and writes their output files on stop()."""
+
+    def __init__(self, mode, output_dir=None, interval=SAMPLING_INTERVAL):
+        self.mode = mode
+        self.output_dir = output_dir or get_profile_dir()
+        self._thread_profiler = ThreadProfiler() if mode in ("all", "cprofile") else None
+        self._sampler = SamplingProfiler(interval) if mode in ("all", "sampling") else None
+
+    def start(self):
+        if self._sampler is not None:
+            self._sampler.start()
+        if self._thread_profiler is not None:
+            if ThreadProfiler.PROCESS_WIDE:
+                print("Hinweis: Ab Python 3.12 mischt cProfile die Zeiten paralleler Threads; "
+                      "genaue Zeiten pro Thread liefert --profile=sampling.", file=sys.stderr)
+            self._thread_profiler.start()
+
+    def stop(self):
+        """Stops profiling and returns the paths of the written files."""
+        profiles = self._thread_profiler.stop() if self._thread_profiler is not None else None
+        if self._sampler is not None:
+            self._sampler.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        paths = []
+        if profiles:
+            ThreadProfiler.write_stats(profiles, base + ".pstats", base + ".txt")
+            paths += [base + ".pstats", base + ".txt"]
+        if self._sampler is not None:
+            self._sampler.write_collapsed(base + ".collapsed")
+            paths.append(base + ".collapsed")
+        return paths
+
+
+@contextmanager
+def profiling(mode, output_dir=None):
+    """Profiles the with block if mode is set (see get_profile_mode) and reports the output files."""
+    if not mode:
+        yield None
+        return
+    session = ProfilingSession(mode, output_dir)
+    session.start()
+    try:
+        yield session
+    finally:
+        for path in session.stop():
+            print(f"Profil geschrieben: {path}", file=sys.stderr)
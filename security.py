@@ -1,14 +1,74 @@
 import ipaddress
 import socket
+import threading
+import time
 from urllib.parse import urlparse
 
+from metrics import timed
+
+# Wie lange eine validierte DNS-Auflösung wiederverwendet wird (Sekunden)
+DNS_CACHE_TTL = 300
+DNS_CACHE_MAX_ENTRIES = 1024
+
+# hostname -> (expires, [ip, ...]); enthält nur Auflösungen, die validiert wurden
+_dns_cache = {}
+_dns_cache_lock = threading.Lock()
+
 class SecurityException(Exception):
     """Exception raised for security violations."""
     pass
 
+def clear_dns_cache() -> None:
+    with _dns_cache_lock:
+        _dns_cache.clear()
+
+def _cached_addresses(hostname: str):
+    with _dns_cache_lock:
+        entry = _dns_cache.get(hostname)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _dns_cache[hostname]
+            return None
+        return entry[1]
+
+def _store_addresses(hostname: str, ips) -> None:
+    with _dns_cache_lock:
+        if len(_dns_cache) >= DNS_CACHE_MAX_ENTRIES and hostname not in _dns_cache:
+            # Ältesten Eintrag verwerfen (dicts behalten die Einfügereihenfolge)
+            del _dns_cache[next(iter(_dns_cache))]
+        _dns_cache[hostname] = (time.monotonic() + DNS_CACHE_TTL, ips)
+
 def validate_url(url: str) -> None:
     """
     Validates a URL to prevent SSRF attacks.
+    See resolve_and_validate_url for the checks that are applied.
+    """
+    resolve_and_validate_url(url)
+
+def resolve_and_validate_url(url: str) -> str:
+    """
+    Validates a URL to prevent SSRF attacks and returns the first IP address to connect to.
+    See resolve_and_validate_addresses for all validated addresses.
+    """
+    return resolve_and_validate_addresses(url)[0]
+
+def resolve_and_validate_addresses(url: str) -> list:
+    """
+    Validates a URL to prevent SSRF attacks and returns all IP addresses to
+    connect to, in resolver order; callers try them one after another.
+    The time spent (including DNS resolution) is recorded as "validation" stage
+    of the current job, see metrics.track_metrics.
+    """
+    with timed("validation"):
+        return list(_resolve_and_validate_url(url))
+
+def _resolve_and_validate_url(url: str) -> list:
+    """
+    Validates a URL to prevent SSRF attacks and returns the IP addresses to connect to.
+    Connecting to exactly these addresses (instead of resolving the hostname again)
+    closes the DNS rebinding window between validation and fetch.
+    Validated resolutions are cached for DNS_CACHE_TTL seconds.
     Raises SecurityException if the URL is invalid or points to a private/restricted network.
     Checks IPv4 and IPv6 addresses.
     Blocks:
@@ -27,6 +87,10 @@ def validate_url(url: str) -> None:
         if not hostname:
              raise SecurityException("Invalid URL: No hostname found.")
 
+        cached = _cached_addresses(hostname)
+        if cached:
+            return cached
+
         try:
             # getaddrinfo returns a list of (family, type, proto, canonname, sockaddr)
             # sockaddr is a tuple, index 0 is the IP address string
@@ -35,6 +99,7 @@ def validate_url(url: str) -> None:
         except socket.error:
              raise SecurityException("Could not resolve hostname.")
 
+        ips = []
         for addr_info in addr_infos:
             ip = addr_info[4][0]
             try:
@@ -50,6 +115,13 @@ def validate_url(url: str) -> None:
 
             except ValueError:
                 continue
+            if ip not in ips:
+                ips.append(ip)
+
+        if not ips:
+            raise SecurityException("Could not resolve hostname.")
+        _store_addresses(hostname, ips)
+        return ips
 
     except SecurityException:
         raise
@@ -0,0 +1,219 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import analysis
+import llm_client
+import pipeline
+from cache import CompressedCache
+from cancellation import CancellationToken
+from errors import is_error
+
+
+def _stream_chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class TestStreamingAnalysis(unittest.TestCase):
+    def setUp(self):
+        cache = CompressedCache(":memory:", default_ttl=60, max_entries=10, max_bytes=100000)
+        patcher = patch('analysis.get_llm_cache', return_value=cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('analysis.get_openai_client')
+    def test_deltas_are_forwarded(self, mock_get_client):
+        client = mock_get_client.return_value
+        client.chat.completions.create.return_value = iter([
+            _stream_chunk("Hallo"), SimpleNamespace(choices=[]), _stream_chunk(None), _stream_chunk(" Welt")
+        ])
+        deltas = []
+
+        result = analysis.real_ai_analyse_fortext_stream("Prompt", deltas.append)
+
+        self.assertEqual(result, "Hallo Welt")
+        self.assertEqual(deltas, ["Hallo", " Welt"])
+        _, kwargs = client.chat.completions.create.call_args
+        self.assertTrue(kwargs["stream"])
+
+    @patch('analysis.get_openai_client')
+    def test_errors_are_returned_as_text(self, mock_get_client):
+        mock_get_client.return_value.chat.completions.create.side_effect = RuntimeError("Timeout")
+        result = analysis.real_ai_analyse_fortext_stream("Prompt", MagicMock())
+        self.assertEqual(result, "Fehler bei der KI-Analyse: Timeout")
+
+
+    @patch('analysis.get_openai_client', return_value=None)
+    def test_missing_api_key(self, _):
+        result = analysis.real_ai_analyse_fortext_stream("Prompt", MagicMock())
+        self.assertEqual(result, "Fehler: Kein API-Schlüssel verfügbar")
+
+
+class TestSharedOpenAIClient(unittest.TestCase):
+    def setUp(self):
+        llm_client._client = None
+        llm_client._client_api_key = None
+        self.addCleanup(setattr, llm_client, "_client", None)
+
+    @patch('llm_client._create_client')
+    @patch('llm_client.get_api_key')
+    def test_client_is_reused_until_key_changes(self, mock_get_key, mock_create):
+        mock_create.side_effect = lambda key: MagicMock(name=key)
+        mock_get_key.return_value = "sk-eins"
+
+        first = llm_client.get_openai_client()
+        self.assertIs(llm_client.get_openai_client(), first)
+
+        mock_get_key.return_value = "sk-zwei"
+        second = llm_client.get_openai_client()
+        self.assertIsNot(second, first)
+        self.assertEqual(mock_create.call_count, 2)
+
+    @patch('llm_client.get_api_key', return_value=None)
+    def test_no_client_without_api_key(self, _):
+        self.assertIsNone(llm_client.get_openai_client())
+
+
+class TestTokenUsage(unittest.TestCase):
+    def setUp(self):
+        cache = CompressedCache(":memory:", default_ttl=60, max_entries=100, max_bytes=100000)
+        patcher = patch('analysis.get_llm_cache', return_value=cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('pipeline.text_extraction_youtube_website')
+    @patch('analysis.get_openai_client')
+    def test_cached_tokens_are_reported_for_all_map_requests(self, mock_get_client, mock_extract):
+        mock_extract.return_value = " ".join(f"Satz {i} mit Inhalt." for i in range(3000))
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10,
+                                prompt_tokens_details=SimpleNamespace(cached_tokens=64))
+        mock_get_client.return_value.chat.completions.create.return_value = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Teil"))], usage=usage)
+        details = {}
+
+        pipeline.analyse_source("https://example.com", "Zusammenfassung", details=details)
+
+        calls = mock_get_client.return_value.chat.completions.create.call_count
+        self.assertGreater(calls, 2)
+        self.assertEqual(details["usage"], {"requests": calls, "prompt_tokens": 100 * calls,
+                                            "completion_tokens": 10 * calls,
+                                            "cached_tokens": 64 * calls})
+
+    def test_usage_outside_tracking_is_ignored(self):
+        llm_client.record_usage(SimpleNamespace(prompt_tokens=5))
+        with llm_client.track_usage() as usage:
+            llm_client.record_usage(SimpleNamespace(prompt_tokens=5, completion_tokens=1))
+        self.assertEqual(usage.as_dict()["prompt_tokens"], 5)
+        self.assertEqual(usage.as_dict()["cached_tokens"], 0)
+
+
+def _run(status, id="run-1"):
+    return SimpleNamespace(id=id, status=status, last_error=None, incomplete_details=None)
+
+
+def _event(name, run):
+    return SimpleNamespace(event=name, data=run)
+
+
+class TestAssistantRuns(unittest.TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.stream = self.client.beta.threads.runs.stream.return_value.__enter__.return_value
+
+    def test_stream_events_until_completed(self):
+        self.stream.__iter__.return_value = iter([
+            _event("thread.run.created", _run("queued")),
+            _event("thread.run.step.created", SimpleNamespace(status="in_progress")),
+            _event("thread.run.completed", _run("completed")),
+        ])
+        run = analysis._run_assistant(self.client, "thread-1", "asst-1", time.monotonic() + 60)
+
+        self.assertEqual(run.status, "completed")
+        self.client.beta.threads.runs.retrieve.assert_not_called()
+
+    @patch('polling.time.sleep')
+    def test_falls_back_to_polling_when_stream_fails(self, mock_sleep):
+        self.stream.__iter__.side_effect = RuntimeError("stream abgebrochen")
+        self.client.beta.threads.runs.create.return_value = _run("queued")
+        self.client.beta.threads.runs.retrieve.side_effect = [_run("in_progress"), _run("expired")]
+
+        run = analysis._run_assistant(self.client, "thread-1", "asst-1", time.monotonic() + 60)
+
+        self.assertEqual(run.status, "expired")
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        self.assertEqual(delays, [analysis.RUN_POLL_INITIAL, analysis.RUN_POLL_INITIAL * 2])
+
+    @patch('polling.time.sleep')
+    def test_polls_run_started_by_broken_stream(self, _):
+        def events():
+            yield _event("thread.run.in_progress", _run("in_progress", id="run-7"))
+            raise RuntimeError("Verbindung verloren")
+        self.stream.__iter__.side_effect = lambda: events()
+        self.client.beta.threads.runs.retrieve.return_value = _run("completed", id="run-7")
+
+        run = analysis._run_assistant(self.client, "thread-1", "asst-1", time.monotonic() + 60)
+
+        self.assertEqual(run.status, "completed")
+        self.client.beta.threads.runs.create.assert_not_called()
+
+    def test_deadline_cancels_run(self):
+        self.stream.__iter__.return_value = iter([_event("thread.run.created", _run("queued"))])
+        with self.assertRaises(analysis.RunTimeoutError):
+            analysis._run_assistant(self.client, "thread-1", "asst-1", time.monotonic() - 1)
+        self.client.beta.threads.runs.cancel.assert_called_once_with(thread_id="thread-1", run_id="run-1")
+
+    def test_stream_read_timeout_ends_at_deadline(self):
+        self.stream.__iter__.return_value = iter([_event("thread.run.completed", _run("completed"))])
+        analysis._run_assistant(self.client, "thread-1", "asst-1", time.monotonic() + 5)
+
+        _, kwargs = self.client.beta.threads.runs.stream.call_args
+        self.assertLessEqual(kwargs["timeout"], 5)
+
+    def test_cancel_closes_waiting_stream(self):
+        closed = threading.Event()
+
+        def events():
+            yield _event("thread.run.in_progress", _run("in_progress"))
+            # Blockiert wie ein Lesen ohne neue Ereignisse, bis der Stream geschlossen wird
+            closed.wait(5)
+            raise RuntimeError("Stream geschlossen")
+        self.stream.__iter__.side_effect = lambda: events()
+        self.stream.close.side_effect = closed.set
+        token = CancellationToken()
+        threading.Timer(0.1, token.cancel).start()
+
+        started = time.monotonic()
+        with self.assertRaises(analysis.RunTimeoutError):
+            analysis._run_assistant(self.client, "thread-1", "asst-1", time.monotonic() + 60, token)
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.client.beta.threads.runs.cancel.assert_called_once_with(thread_id="thread-1", run_id="run-1")
+
+    def test_requires_action_is_cancelled(self):
+        self.stream.__iter__.return_value = iter([_event("thread.run.requires_action", _run("requires_action"))])
+        run = analysis._run_assistant(self.client, "thread-1", "asst-1", time.monotonic() + 60)
+
+        self.assertEqual(run.status, "requires_action")
+        self.client.beta.threads.runs.cancel.assert_called_once()
+
+
+class TestPDFAssistantAnalysis(unittest.TestCase):
+    @patch("analysis._run_assistant", return_value=_run("completed"))
+    @patch("analysis.get_pdf_session_store")
+    @patch("analysis.get_openai_client")
+    def test_thread_without_assistant_message_is_an_error(self, mock_get_client, _, __):
+        client = mock_get_client.return_value
+        client.beta.threads.messages.list.return_value = SimpleNamespace(
+            data=[SimpleNamespace(role="user", content=[])])
+
+        result = analysis.real_ai_analyse_forpdf("bericht.pdf", "Fasse zusammen")
+
+        self.assertTrue(is_error(result))
+        self.assertEqual(result, "Fehler: Keine Antwort vom Assistenten erhalten")
+        client.beta.threads.delete.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
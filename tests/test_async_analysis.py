@@ -0,0 +1,210 @@
+import asyncio
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import async_analysis
+from cache import CompressedCache
+from event_loop import BackgroundLoop
+from metrics import track_metrics
+from security import SecurityException
+
+
+class _RedirectHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/start":
+            self.send_response(302)
+            self.send_header("Location", "/ziel")
+            self.send_header("Set-Cookie", "sitzung=abc; Path=/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/extern":
+            self.send_response(302)
+            self.send_header("Location", "http://intern.invalid/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = (f"<html><body><p>Host {self.headers.get('Host')}</p>"
+                f"<p>Cookie {self.headers.get('Cookie')}</p></body></html>").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _pinned_to_loopback(url):
+    if "intern.invalid" in url:
+        raise SecurityException("URL points to a restricted IP address: 10.0.0.1")
+    return ["127.0.0.1"]
+
+
+class TestAsyncFetch(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), _RedirectHandler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @patch("async_analysis.resolve_and_validate_addresses", side_effect=_pinned_to_loopback)
+    def test_follows_redirects_on_pinned_ip(self, mock_resolve):
+        url = f"http://seite.invalid:{self.port}/start"
+
+        text = asyncio.run(async_analysis.async_extract_text_from_website(url))
+
+        self.assertIn(f"Host seite.invalid:{self.port}", text)
+        self.assertIn("Cookie sitzung=abc", text)
+        self.assertEqual(mock_resolve.call_count, 2)
+
+    @patch("async_analysis.resolve_and_validate_addresses", side_effect=_pinned_to_loopback)
+    def test_redirect_to_blocked_target(self, _):
+        url = f"http://seite.invalid:{self.port}/extern"
+
+        text = asyncio.run(async_analysis.async_extract_text_from_website(url))
+
+        self.assertTrue(text.startswith("Security Error on redirect"))
+
+    @patch("async_analysis.resolve_and_validate_addresses")
+    def test_next_validated_ip_is_tried_if_connection_fails(self, mock_resolve):
+        # Der Server lauscht nur auf 127.0.0.1; 127.0.0.2 lehnt die Verbindung ab
+        mock_resolve.return_value = ["127.0.0.2", "127.0.0.1"]
+        url = f"http://seite.invalid:{self.port}/ziel"
+
+        text = asyncio.run(async_analysis.async_extract_text_from_website(url))
+
+        self.assertIn(f"Host seite.invalid:{self.port}", text)
+
+    @patch("async_analysis.resolve_and_validate_addresses", side_effect=_pinned_to_loopback)
+    def test_host_slot_is_held_until_response_is_closed(self, _):
+        url = f"http://seite.invalid:{self.port}/ziel"
+
+        async def fetch_twice():
+            client = async_analysis.AsyncFetchClient(max_connections_per_host=1)
+            first = await client.get(url)
+            second = asyncio.create_task(client.get(url))
+            await asyncio.sleep(0.1)
+            self.assertFalse(second.done())
+            await first.aclose()
+            await (await asyncio.wait_for(second, 5)).aclose()
+            # Semaphoren von Hosts ohne offene Antwort werden nicht aufbewahrt
+            self.assertEqual(len(client._host_semaphores), 0)
+            await client.aclose()
+
+        asyncio.run(fetch_twice())
+
+    @patch("async_analysis.resolve_and_validate_addresses")
+    def test_fetch_time_excludes_validation(self, mock_resolve):
+        mock_resolve.side_effect = lambda url: time.sleep(0.3) or ["127.0.0.1"]
+        url = f"http://seite.invalid:{self.port}/ziel"
+
+        with track_metrics() as job:
+            asyncio.run(async_analysis.async_extract_text_from_website(url))
+
+        self.assertLess(job.stages["fetch"], 0.3)
+
+    def test_invalid_scheme_is_rejected(self):
+        text = asyncio.run(async_analysis.async_extract_text_from_website("ftp://example.com/"))
+        self.assertTrue(text.startswith("Security Error"))
+
+
+class _FakeStream:
+    def __init__(self, parts):
+        self._parts = iter(parts)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            content = next(self._parts)
+        except StopIteration:
+            raise StopAsyncIteration
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class TestAsyncAnalysis(unittest.TestCase):
+    def setUp(self):
+        cache = CompressedCache(":memory:", default_ttl=60, max_entries=100, max_bytes=100000)
+        patcher = patch("analysis.get_llm_cache", return_value=cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("async_analysis.get_async_openai_client")
+    def test_streaming_forwards_deltas(self, mock_get_client):
+        async def create(**kwargs):
+            return _FakeStream(["Hallo", None, " Welt"])
+
+        mock_get_client.return_value.chat.completions.create = create
+        deltas = []
+
+        result = asyncio.run(async_analysis.async_ai_analyse_fortext("Prompt", deltas.append))
+
+        self.assertEqual(result, "Hallo Welt")
+        self.assertEqual(deltas, ["Hallo", " Welt"])
+
+    @patch("async_analysis.get_async_openai_client", return_value=None)
+    def test_missing_api_key(self, _):
+        result = asyncio.run(async_analysis.async_ai_analyse_fortext("Prompt"))
+        self.assertEqual(result, "Fehler: Kein API-Schlüssel verfügbar")
+
+    @patch("async_analysis.get_async_openai_client")
+    def test_failed_request_counts_towards_llm_time(self, mock_get_client):
+        async def create(model, messages):
+            await asyncio.sleep(0.05)
+            raise TimeoutError("Zeitüberschreitung")
+
+        mock_get_client.return_value.chat.completions.create = create
+
+        with track_metrics() as job:
+            result = asyncio.run(async_analysis.async_ai_analyse_fortext("Prompt"))
+
+        self.assertTrue(result.startswith("Fehler bei der KI-Analyse"))
+        self.assertGreaterEqual(job.stages["llm"], 0.05)
+
+    @patch("async_analysis.LLM_CONCURRENCY", 2)
+    @patch("async_analysis.get_async_openai_client")
+    def test_map_requests_are_bounded(self, mock_get_client):
+        state = {"active": 0, "peak": 0}
+
+        async def create(model, messages):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.01)
+            state["active"] -= 1
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="kurz"))])
+
+        mock_get_client.return_value.chat.completions.create = create
+        content = " ".join(f"Satz Nummer {i} enthält etwas Text." for i in range(60))
+
+        result = asyncio.run(async_analysis.async_ai_analyse_chunked("Fasse zusammen:", content,
+                                                                     max_chunk_tokens=40))
+
+        self.assertEqual(result, "kurz")
+        self.assertEqual(state["peak"], 2)
+
+
+class TestBackgroundLoop(unittest.TestCase):
+    def test_submit_returns_future(self):
+        background = BackgroundLoop()
+        self.addCleanup(background.stop)
+
+        async def double(value):
+            await asyncio.sleep(0)
+            return value * 2
+
+        self.assertEqual(background.submit(double(21)).result(timeout=5), 42)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+import batch
+from errors import ErrorMessage
+
+
+class TestBatchInput(unittest.TestCase):
+    def test_parses_tab_separated_and_json_lines(self):
+        jobs = batch.read_jobs([
+            "# Kommentar",
+            "https://example.com",
+            "",
+            "https://example.com/b\tSentiment Analyse",
+            '{"source": "doc.pdf", "prompt_type": "Prompt senden", "prompt": "Was steht drin?"}',
+        ])
+
+        self.assertEqual(jobs, [
+            {"source": "https://example.com", "prompt_type": "Zusammenfassung", "prompt": ""},
+            {"source": "https://example.com/b", "prompt_type": "Sentiment Analyse", "prompt": ""},
+            {"source": "doc.pdf", "prompt_type": "Prompt senden", "prompt": "Was steht drin?"},
+        ])
+
+    def test_unknown_prompt_type_reports_line(self):
+        with self.assertRaisesRegex(ValueError, "Zeile 2"):
+            batch.read_jobs(["https://example.com", "https://example.com\tGibtEsNicht"])
+
+
+class TestBatchRun(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("batch.export_job_metrics")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_writes_one_record_per_job_with_timings(self):
+        def fake_analyse(source, prompt_type, custom_prompt="", on_delta=None, details=None,
+                         use_cache=True, cancel_token=None):
+            details.update(extraction_s=0.5, analysis_s=1.25)
+            if "fail" in source:
+                return ErrorMessage("Error: Failed to retrieve the webpage.")
+            return f"Ergebnis für {source}"
+
+        jobs = batch.read_jobs(["https://example.com/ok", "https://example.com/fail"])
+        output = io.StringIO()
+        with patch("batch.pipeline.analyse_source", side_effect=fake_analyse):
+            failed = batch.run_batch(jobs, output, max_workers=2)
+
+        records = sorted((json.loads(line) for line in output.getvalue().splitlines()),
+                         key=lambda record: record["index"])
+        self.assertEqual(failed, 1)
+        self.assertEqual([r["status"] for r in records], ["ok", "error"])
+        self.assertEqual(records[0]["result"], "Ergebnis für https://example.com/ok")
+        self.assertEqual(records[0]["timings"]["extraction_s"], 0.5)
+        self.assertEqual(records[0]["timings"]["analysis_s"], 1.25)
+        self.assertIn("total_s", records[1]["timings"])
+
+    def test_exceptions_become_error_records(self):
+        output = io.StringIO()
+        with patch("batch.pipeline.analyse_source", side_effect=RuntimeError("kaputt")):
+            failed = batch.run_batch([{"source": "x", "prompt_type": "Sentiment Analyse", "prompt": ""}], output)
+
+        record = json.loads(output.getvalue())
+        self.assertEqual(failed, 1)
+        self.assertEqual(record["status"], "error")
+        self.assertIn("kaputt", record["result"])
+
+    @patch("pipeline.analyse_text", return_value="Fehlerkultur: offene Kommunikation hilft.")
+    @patch("pipeline.text_extraction_youtube_website",
+           return_value="Fehlerkultur in Unternehmen beginnt bei der Führung.")
+    def test_content_starting_with_error_words_is_analysed(self, _, mock_analyse_text):
+        record = batch.run_job(0, {"source": "https://example.com/fehlerkultur",
+                                   "prompt_type": "Zusammenfassung", "prompt": ""})
+
+        self.assertEqual(record["status"], "ok")
+        self.assertEqual(record["result"], "Fehlerkultur: offene Kommunikation hilft.")
+        self.assertEqual(mock_analyse_text.call_args.args[2],
+                         "Fehlerkultur in Unternehmen beginnt bei der Führung.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import benchmark
+import security
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_quick_run_reports_all_stages(self):
+        stages = ["fetch_small", "redirect_chain", "markdown_render", "llm_completion",
+                  "llm_stream", "pipeline", "async_pipeline"]
+
+        report = benchmark.run_benchmarks(iterations=2, stages=stages,
+                                          page_sizes={"small": 2048, "medium": 8192},
+                                          llm_latency=0, llm_chunk_delay=0, async_jobs=3)
+
+        self.assertEqual(set(report["stages"]), set(stages))
+        for name in stages:
+            stage = report["stages"][name]
+            self.assertLessEqual(stage["p50_ms"], stage["p95_ms"], name)
+            self.assertGreater(stage["throughput_ops"], 0, name)
+            self.assertIn("peak_memory_bytes", stage)
+        self.assertEqual(report["stages"]["async_pipeline"]["iterations"], 3)
+
+    def test_loopback_is_blocked_again_afterwards(self):
+        with benchmark.BenchmarkServer(page_sizes={"small": 1024}) as server:
+            with benchmark.offline_environment(server):
+                self.assertEqual(security.resolve_and_validate_url(server.base_url), "127.0.0.1")
+                with self.assertRaises(security.SecurityException):
+                    security.resolve_and_validate_url("http://10.0.0.1/")
+
+        with self.assertRaises(security.SecurityException):
+            security.resolve_and_validate_url(server.base_url)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(benchmark.percentile(values, 0.95), 95)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import unittest
+from unittest.mock import patch
+
+import analysis
+import budget
+import metrics
+import pipeline
+from chunking import count_tokens
+from prompts import build_messages
+
+
+class TestPreflight(unittest.TestCase):
+    def test_estimates_tokens_cost_and_latency(self):
+        messages = [{"role": "user", "content": "Wort " * 400}]
+        estimate = budget.preflight(messages, "gpt-4o", output_tokens=100)
+
+        self.assertEqual(estimate.prompt_tokens,
+                         count_tokens("Wort " * 400) + budget.MESSAGE_OVERHEAD_TOKENS
+                         + budget.REPLY_OVERHEAD_TOKENS)
+        self.assertAlmostEqual(estimate.cost_usd, (estimate.prompt_tokens * 2.5 + 100 * 10) / 1e6)
+        self.assertGreater(estimate.latency_s, budget.BASE_LATENCY_S)
+        self.assertIsNone(budget.preflight(messages, "unbekannt").cost_usd)
+
+    @patch("analysis.get_openai_client")
+    def test_oversized_prompt_is_rejected_without_a_request(self, mock_get_client):
+        messages = [{"role": "user", "content": "x"}]
+        with patch.dict(budget.MODEL_CONTEXT_TOKENS, {analysis.LLM_MODEL: 10}), \
+                metrics.track_metrics() as job:
+            result = analysis.real_ai_analyse_messages(messages, use_cache=False)
+
+        self.assertTrue(result.startswith("Fehler: Anfrage zu groß"))
+        mock_get_client.assert_not_called()
+        self.assertIn("preflight_tokens", job.as_dict())
+
+
+class TestFitContent(unittest.TestCase):
+    content = " ".join(f"Satz{i}." for i in range(2000))
+
+    def test_content_within_budget_is_unchanged(self):
+        self.assertEqual(budget.fit_content("kurz", "Frage", budget=1000), ("kurz", False))
+
+    def test_truncate_keeps_the_beginning(self):
+        fitted, chunked = budget.fit_content(self.content, "Frage", budget=500, strategy="truncate")
+
+        self.assertFalse(chunked)
+        self.assertTrue(fitted.startswith("Satz0."))
+        self.assertTrue(fitted.endswith(budget.OMISSION_MARKER))
+        self.assertLessEqual(budget.count_message_tokens(build_messages(fitted, "Frage")),
+                             500)
+
+    def test_head_tail_keeps_beginning_and_end(self):
+        fitted, _ = budget.fit_content(self.content, "Frage", budget=500, strategy="head_tail")
+
+        self.assertTrue(fitted.startswith("Satz0."))
+        self.assertTrue(fitted.endswith("Satz1999."))
+        self.assertIn(budget.OMISSION_MARKER, fitted)
+
+    @patch("pipeline.real_ai_analyse_messages")
+    @patch("pipeline.real_ai_analyse_chunked", return_value="Ergebnis")
+    def test_chunked_strategy_switches_to_map_reduce(self, mock_chunked, mock_single):
+        with patch.dict(os.environ, {"KI_TOKEN_BUDGET": "500", "KI_BUDGET_STRATEGY": "chunked"}):
+            result = pipeline.analyse_text("Prompt senden", "Wer ist der Autor?", self.content)
+
+        self.assertEqual(result, "Ergebnis")
+        self.assertEqual(mock_chunked.call_args.args[:2], ("Wer ist der Autor?", self.content))
+        mock_single.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from cache import CompressedCache, PersistentCache, llm_cache_key, normalize_url
+import analysis
+from errors import ErrorMessage
+
+
+class TestNormalizeUrl(unittest.TestCase):
+    def test_normalize_url(self):
+        self.assertEqual(
+            normalize_url("HTTPS://Example.com:443/page?b=2&utm_source=x&a=1#top"),
+            "https://example.com/page?a=1&b=2")
+
+    def test_normalize_url_keeps_custom_port(self):
+        self.assertEqual(normalize_url("http://example.com:8080"), "http://example.com:8080/")
+
+
+class TestPersistentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+        self.cache = PersistentCache(self.path, default_ttl=60, max_entries=3, max_bytes=1000)
+
+    def tearDown(self):
+        self.cache._conn.close()
+        self.tmpdir.cleanup()
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.set("a", "Inhalt")
+        self.assertEqual(self.cache.get("a"), "Inhalt")
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_expired_entry_is_a_miss(self):
+        self.cache.set("a", "alt", ttl=-1)
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    @patch("cache.time.time")
+    def test_lru_eviction_by_entry_count(self, mock_time):
+        for i, key in enumerate(["a", "b", "c"]):
+            mock_time.return_value = 100.0 + i
+            self.cache.set(key, key)
+        # "a" wird gelesen und ist damit nicht mehr der älteste Eintrag
+        mock_time.return_value = 110.0
+        self.cache.get("a")
+        mock_time.return_value = 111.0
+        self.cache.set("d", "d")
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), "a")
+        self.assertEqual(self.cache.stats()["entries"], 3)
+
+    def test_eviction_by_size(self):
+        self.cache.set("gross", "x" * 900)
+        self.cache.set("neu", "y" * 200)
+        self.assertIsNone(self.cache.get("gross"))
+        self.assertEqual(self.cache.get("neu"), "y" * 200)
+
+    def test_persistence_across_instances(self):
+        self.cache.set("a", "bleibt")
+        other = PersistentCache(self.path, default_ttl=60, max_entries=3, max_bytes=1000)
+        try:
+            self.assertEqual(other.get("a"), "bleibt")
+        finally:
+            other._conn.close()
+
+
+class TestExtractionCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = PersistentCache(":memory:", default_ttl=60, max_entries=10, max_bytes=10000)
+        patcher = patch("analysis.get_content_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("analysis.extract_text_from_website")
+    def test_website_is_fetched_once(self, mock_extract):
+        mock_extract.return_value = "Seiteninhalt"
+        first = analysis.text_extraction_youtube_website("https://example.com/a?utm_source=x")
+        second = analysis.text_extraction_youtube_website("https://EXAMPLE.com/a")
+
+        self.assertEqual(first, "Seiteninhalt")
+        self.assertEqual(second, "Seiteninhalt")
+        mock_extract.assert_called_once()
+
+    @patch("analysis.extract_text_from_website")
+    def test_errors_are_not_cached(self, mock_extract):
+        mock_extract.return_value = ErrorMessage("Error: Too many redirects")
+        analysis.text_extraction_youtube_website("https://example.com")
+        analysis.text_extraction_youtube_website("https://example.com")
+        self.assertEqual(mock_extract.call_count, 2)
+
+    @patch("analysis.extract_transkript")
+    def test_youtube_keyed_by_video_id(self, mock_extract):
+        mock_extract.return_value = "Hello World "
+        analysis.text_extraction_youtube_website("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+        result = analysis.text_extraction_youtube_website("https://youtu.be/dQw4w9WgXcQ")
+
+        self.assertEqual(result, "Hello World")
+        mock_extract.assert_called_once()
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = CompressedCache(":memory:", default_ttl=60, max_entries=10, max_bytes=100000)
+        patcher = patch("analysis.get_llm_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_values_are_compressed(self):
+        self.cache.set("k", "Wiederholung " * 1000)
+        self.assertEqual(self.cache.get("k"), "Wiederholung " * 1000)
+        self.assertLess(self.cache.stats()["bytes"], 1000)
+
+    def test_key_depends_on_model_messages_and_params(self):
+        messages = [{"role": "user", "content": "Text"}]
+        self.assertEqual(llm_cache_key("gpt-4o", messages), llm_cache_key("gpt-4o", list(messages)))
+        self.assertNotEqual(llm_cache_key("gpt-4o", messages), llm_cache_key("gpt-4o-mini", messages))
+        self.assertNotEqual(llm_cache_key("gpt-4o", messages),
+                            llm_cache_key("gpt-4o", messages, {"temperature": 0}))
+
+    @patch("analysis.get_openai_client")
+    def test_identical_prompt_is_answered_from_cache(self, mock_get_client):
+        create = mock_get_client.return_value.chat.completions.create
+        create.return_value = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Antwort"))])
+
+        self.assertEqual(analysis.real_ai_analyse_fortext("Prompt"), "Antwort")
+        deltas = []
+        self.assertEqual(analysis.real_ai_analyse_fortext_stream("Prompt", deltas.append), "Antwort")
+
+        create.assert_called_once()
+        self.assertEqual(deltas, ["Antwort"])
+
+    @patch("analysis.get_openai_client")
+    def test_bypass_and_errors_are_not_cached(self, mock_get_client):
+        create = mock_get_client.return_value.chat.completions.create
+        create.side_effect = RuntimeError("Timeout")
+        self.assertTrue(analysis.real_ai_analyse_fortext("Prompt").startswith("Fehler bei der KI-Analyse"))
+
+        create.side_effect = None
+        create.return_value = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Antwort"))])
+        analysis.real_ai_analyse_fortext("Prompt")
+        analysis.real_ai_analyse_fortext("Prompt", use_cache=False)
+
+        self.assertEqual(create.call_count, 3)
+        self.assertEqual(self.cache.stats()["entries"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import pipeline
+from cancellation import AnalysisCancelled, CancellationToken
+from polling import sleep_until_next_poll
+
+
+class TestCancellationToken(unittest.TestCase):
+    def test_cancel_runs_callbacks_once(self):
+        token = CancellationToken()
+        calls = []
+        token.add_callback(lambda: calls.append(1))
+
+        token.cancel()
+        token.cancel()
+
+        self.assertTrue(token.cancelled)
+        self.assertEqual(calls, [1])
+        self.assertEqual(token.reason, "Analyse abgebrochen")
+        with self.assertRaises(AnalysisCancelled):
+            token.check()
+
+    def test_removed_callback_is_not_called(self):
+        token = CancellationToken()
+        calls = []
+        remove = token.add_callback(lambda: calls.append(1))
+        remove()
+
+        token.cancel()
+
+        self.assertEqual(calls, [])
+
+    def test_deadline_counts_as_cancelled(self):
+        token = CancellationToken(timeout=0.01)
+        time.sleep(0.02)
+
+        self.assertTrue(token.cancelled)
+        self.assertIn("Zeitlimit", token.reason)
+        self.assertEqual(token.limit(30), 0.0)
+
+    def test_without_timeout_limit_is_unchanged(self):
+        token = CancellationToken()
+        self.assertIsNone(token.remaining())
+        self.assertEqual(token.limit(30), 30)
+
+    def test_cancel_wakes_up_polling(self):
+        token = CancellationToken()
+        threading.Timer(0.05, token.cancel).start()
+        started = time.monotonic()
+
+        keep_polling = sleep_until_next_poll(iter([10.0]), time.monotonic() + 10, token)
+
+        self.assertFalse(keep_polling)
+        self.assertLess(time.monotonic() - started, 5)
+
+
+class TestPipelineCancellation(unittest.TestCase):
+    def test_sync_pipeline_stops_after_extraction(self):
+        token = CancellationToken()
+
+        def extract(source, cancel_token=None):
+            cancel_token.cancel()
+            return "Inhalt"
+
+        with patch("pipeline.text_extraction_youtube_website", side_effect=extract), \
+                patch("pipeline.analyse_text") as mock_analyse:
+            result = pipeline.analyse_source("https://example.com", "Zusammenfassung",
+                                             cancel_token=token)
+
+        self.assertEqual(result, "Fehler: Analyse abgebrochen")
+        mock_analyse.assert_not_called()
+
+    def test_async_pipeline_is_cancelled_from_other_thread(self):
+        token = CancellationToken()
+
+        async def slow_extraction(source, cancel_token=None):
+            await asyncio.sleep(10)
+            return "Inhalt"
+
+        async def run():
+            threading.Timer(0.05, token.cancel).start()
+            return await pipeline.async_analyse_source("https://example.com", "Zusammenfassung",
+                                                       cancel_token=token)
+
+        with patch("pipeline.async_text_extraction_youtube_website", side_effect=slow_extraction):
+            result = asyncio.run(run())
+
+        self.assertEqual(result, "Fehler: Analyse abgebrochen")
+
+    def test_async_pipeline_deadline(self):
+        async def slow_extraction(source, cancel_token=None):
+            await asyncio.sleep(10)
+            return "Inhalt"
+
+        with patch("pipeline.async_text_extraction_youtube_website", side_effect=slow_extraction):
+            result = asyncio.run(pipeline.async_analyse_source(
+                "https://example.com", "Zusammenfassung", cancel_token=CancellationToken(0.05)))
+
+        self.assertIn("Zeitlimit", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
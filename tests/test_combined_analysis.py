@@ -0,0 +1,116 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import analysis
+import async_analysis
+import pipeline
+from cache import CompressedCache
+from combined_analysis import CombinedAnalysis, COMBINED_RESPONSE_FORMAT
+from prompts import ALL_ANALYSES, PROMPT_TYPES
+
+RESPONSE = {
+    "zusammenfassung": "Der Text beschreibt ein Projekt.",
+    "schluesselwoerter": ["Projekt", "Analyse"],
+    "stimmung": {"einordnung": "positiv", "begruendung": "Zuversichtlicher Ton."},
+    "themen": [{"thema": "Planung", "beschreibung": "Ablauf des Projekts."}],
+}
+
+
+def _completion(content, refusal=None):
+    return SimpleNamespace(choices=[SimpleNamespace(
+        message=SimpleNamespace(content=content, refusal=refusal))])
+
+
+class TestCombinedAnalysis(unittest.TestCase):
+    def test_parses_and_renders_all_sections(self):
+        result = CombinedAnalysis.from_json(json.dumps(RESPONSE))
+
+        self.assertEqual(result.keywords, ["Projekt", "Analyse"])
+        self.assertEqual(result.topics, [("Planung", "Ablauf des Projekts.")])
+        markdown = result.to_markdown()
+        for heading in ("## Zusammenfassung", "## Schlüsselwörter", "## Sentiment Analyse", "## Themen"):
+            self.assertIn(heading, markdown)
+        self.assertIn("- **Planung**: Ablauf des Projekts.", markdown)
+        self.assertIn("**Positiv**: Zuversichtlicher Ton.", markdown)
+
+    def test_invalid_response_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            CombinedAnalysis.from_json('{"zusammenfassung": "nur ein Feld"}')
+        with self.assertRaises(ValueError):
+            CombinedAnalysis.from_json("kein JSON")
+
+    def test_mode_is_offered(self):
+        self.assertIn(ALL_ANALYSES, PROMPT_TYPES)
+
+
+class TestCombinedRequest(unittest.TestCase):
+    def setUp(self):
+        self.cache = CompressedCache(":memory:", default_ttl=60, max_entries=10, max_bytes=100000)
+        patcher = patch("analysis.get_llm_cache", return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("analysis.get_openai_client")
+    def test_content_is_sent_once_with_schema(self, mock_get_client):
+        create = mock_get_client.return_value.chat.completions.create
+        create.return_value = _completion(json.dumps(RESPONSE))
+
+        result = pipeline.analyse_text(ALL_ANALYSES, "", "Inhalt der Seite.")
+        again = pipeline.analyse_text(ALL_ANALYSES, "", "Inhalt der Seite.")
+
+        self.assertIn("## Themen", result)
+        self.assertEqual(again, result)
+        create.assert_called_once()
+        _, kwargs = create.call_args
+        self.assertEqual(kwargs["response_format"], COMBINED_RESPONSE_FORMAT)
+        contents = "".join(message["content"] for message in kwargs["messages"])
+        self.assertEqual(contents.count("Inhalt der Seite."), 1)
+
+    @patch("analysis.get_openai_client")
+    def test_invalid_json_is_an_uncached_error(self, mock_get_client):
+        mock_get_client.return_value.chat.completions.create.return_value = _completion("{")
+
+        result = analysis.real_ai_analyse_combined("Inhalt")
+
+        self.assertTrue(result.startswith("Fehler bei der KI-Analyse"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    @patch("analysis.get_openai_client")
+    def test_refusal_is_an_uncached_error(self, mock_get_client):
+        mock_get_client.return_value.chat.completions.create.return_value = _completion(
+            None, refusal="Dazu kann ich nichts sagen.")
+
+        result = analysis.real_ai_analyse_combined("Inhalt")
+
+        self.assertEqual(result, "Fehler: Die KI hat die Analyse abgelehnt: Dazu kann ich nichts sagen.")
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    @patch("async_analysis.get_async_openai_client")
+    def test_async_refusal_is_an_uncached_error(self, mock_get_client):
+        mock_get_client.return_value.chat.completions.create = AsyncMock(
+            return_value=_completion(None, refusal="Dazu kann ich nichts sagen."))
+
+        result = asyncio.run(async_analysis.async_ai_analyse_combined("Inhalt"))
+
+        self.assertEqual(result, "Fehler: Die KI hat die Analyse abgelehnt: Dazu kann ich nichts sagen.")
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    @patch("analysis.get_openai_client")
+    @patch("analysis.real_ai_analyse_messages", return_value="Teil")
+    def test_long_content_is_condensed_first(self, mock_map, mock_get_client):
+        create = mock_get_client.return_value.chat.completions.create
+        create.return_value = _completion(json.dumps(RESPONSE))
+        content = " ".join(f"Satz {i} mit Inhalt." for i in range(100))
+
+        analysis.real_ai_analyse_combined(content, max_chunk_tokens=50, overlap_tokens=0)
+
+        self.assertGreater(mock_map.call_count, 1)
+        _, kwargs = create.call_args
+        self.assertIn("Teilergebnis 1:", kwargs["messages"][1]["content"])
+
+
+if __name__ == "__main__":
+    unittest.main()
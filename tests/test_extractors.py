@@ -0,0 +1,126 @@
+import unittest
+from unittest.mock import MagicMock
+
+from extractors import (StreamingHTMLTextParser, TextExtractor, EXTRACTORS, get_extractor,
+                        compact_whitespace)
+import analysis
+
+
+def _mock_response(chunks, content_type="text/html; charset=utf-8", encoding="utf-8"):
+    response = MagicMock()
+    response.headers = {"Content-Type": content_type}
+    response.encoding = encoding
+    response.iter_content.return_value = chunks
+    return response
+
+
+class TestStreamingHTMLTextParser(unittest.TestCase):
+    def test_chunks_split_inside_tags(self):
+        parser = StreamingHTMLTextParser()
+        for chunk in ["<html><bo", "dy><p>Hallo ", "Welt</p><scr", "ipt>var x = 1;</script>",
+                      "<p>Ende &amp; aus</p></body></html>"]:
+            parser.feed(chunk)
+        text = parser.close()
+
+        self.assertIn("Hallo Welt", text)
+        self.assertIn("Ende & aus", text)
+        self.assertNotIn("var x", text)
+
+
+ARTICLE = "Dies ist der eigentliche Artikeltext. " * 10
+
+PAGE = f"""<html><head><title>Titel</title><style>body {{ color: red; }}</style></head>
+<body>
+<header><a href="/">Startseite</a></header>
+<nav><ul><li>Menüpunkt A</li><li>Menüpunkt B</li></ul></nav>
+<div id="cookie-banner">Wir verwenden Cookies</div>
+<main>
+  <article><header><h1>Überschrift</h1></header><p>{ARTICLE}</p></article>
+</main>
+<footer>Impressum</footer>
+<script>tracking();</script>
+</body></html>"""
+
+
+def _extract(backend, html, main_content, chunk_size=37):
+    extractor = get_extractor(backend, main_content)
+    for i in range(0, len(html), chunk_size):
+        extractor.feed(html[i:i + chunk_size])
+    return extractor.close()
+
+
+class TestExtractorBackends(unittest.TestCase):
+    def test_full_text_mode(self):
+        for backend in EXTRACTORS:
+            with self.subTest(backend=backend):
+                text = _extract(backend, PAGE, main_content=False)
+                self.assertIn("Menüpunkt A", text)
+                self.assertIn(ARTICLE.strip(), text)
+                self.assertNotIn("tracking", text)
+                self.assertNotIn("color: red", text)
+
+    def test_main_content_mode_drops_boilerplate(self):
+        for backend in EXTRACTORS:
+            with self.subTest(backend=backend):
+                text = _extract(backend, PAGE, main_content=True)
+                self.assertTrue(text.startswith("Überschrift"))
+                self.assertIn(ARTICLE.strip(), text)
+                for boilerplate in ("Menüpunkt", "Cookies", "Impressum", "Startseite"):
+                    self.assertNotIn(boilerplate, text)
+
+    def test_main_content_mode_falls_back_for_short_pages(self):
+        html = "<html><body><nav>Menü</nav><div class='sidebar'>Kurzer Text</div></body></html>"
+        for backend in EXTRACTORS:
+            with self.subTest(backend=backend):
+                text = _extract(backend, html, main_content=True)
+                self.assertEqual(text, "Menü\n\nKurzer Text")
+
+    def test_state_classes_on_page_root_are_ignored(self):
+        html = (f'<html class="menu-open"><body class="has-sidebar"><nav>Menü</nav>'
+                f'<article><p>{ARTICLE}</p></article><footer>Impressum</footer></body></html>')
+        for backend in EXTRACTORS:
+            with self.subTest(backend=backend):
+                text = _extract(backend, html, main_content=True)
+                self.assertEqual(text, ARTICLE.strip())
+
+    def test_incomplete_backend_cannot_be_created(self):
+        class FeedOnly(TextExtractor):
+            def feed(self, data):
+                pass
+
+        with self.assertRaises(TypeError):
+            FeedOnly()
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_extractor("unbekannt")
+
+    def test_compact_whitespace(self):
+        self.assertEqual(compact_whitespace("  a   b \n\n\n\n\t c  "), "a b\n\nc")
+
+
+class TestReadResponseText(unittest.TestCase):
+    def test_size_cap_truncates_download(self):
+        chunks = [b"<p>" + b"a" * 100 + b"</p>"] * 10
+        response = _mock_response(chunks)
+        text = analysis._read_response_text(response, max_bytes=150)
+
+        self.assertEqual(text.strip(), "a" * 100 + "\n\n" + "a" * 40)
+
+    def test_non_html_content_type_is_rejected(self):
+        response = _mock_response([b"%PDF-1.7"], content_type="application/pdf")
+        text = analysis._read_response_text(response)
+        self.assertEqual(text, "Error: Unsupported content type: application/pdf")
+
+    def test_multibyte_characters_across_chunks(self):
+        data = "<p>Größe</p>".encode("utf-8")
+        response = _mock_response([data[:5], data[5:]])
+        self.assertEqual(analysis._read_response_text(response).strip(), "Größe")
+
+    def test_plain_text(self):
+        response = _mock_response([b"<kein html>"], content_type="text/plain")
+        self.assertEqual(analysis._read_response_text(response), "<kein html>")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+
+from http_client import FetchClient, get_fetch_client
+from security import SecurityException
+
+
+class _EchoHostHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.headers.get("Host", "").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestFetchClient(unittest.TestCase):
+    def test_get_fetch_client_is_shared(self):
+        self.assertIs(get_fetch_client(), get_fetch_client())
+
+    def test_pool_limits_per_host(self):
+        client = FetchClient(max_connections_per_host=2)
+        adapter = client.session.get_adapter("https://example.com")
+        self.assertEqual(adapter._pool_maxsize, 2)
+        self.assertTrue(adapter._pool_block)
+        client.close()
+
+    def test_get_applies_timeouts_and_disables_redirects(self):
+        client = FetchClient(connect_timeout=3, read_timeout=7)
+        with patch.object(client.session, "get") as mock_get:
+            client.get("https://example.com")
+        _, kwargs = mock_get.call_args
+        self.assertEqual(kwargs["timeout"], (3, 7))
+        self.assertFalse(kwargs["allow_redirects"])
+        client.close()
+
+
+
+class TestPinnedIPAdapter(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), _EchoHostHandler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = FetchClient()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    @patch("http_client.resolve_and_validate_addresses")
+    def test_connects_to_validated_ip(self, mock_resolve):
+        # Der Hostname ist nicht auflösbar; verbunden wird nur über die gepinnte IP
+        mock_resolve.return_value = ["127.0.0.1"]
+        url = f"http://pinned.invalid:{self.port}/seite"
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, f"pinned.invalid:{self.port}")
+        mock_resolve.assert_called_with(url)
+
+    @patch("http_client.resolve_and_validate_addresses")
+    def test_next_validated_ip_is_tried_if_connection_fails(self, mock_resolve):
+        # Der Server lauscht nur auf 127.0.0.1; 127.0.0.2 lehnt die Verbindung ab
+        mock_resolve.return_value = ["127.0.0.2", "127.0.0.1"]
+
+        response = self.client.get(f"http://pinned.invalid:{self.port}/")
+
+        self.assertEqual(response.status_code, 200)
+
+    @patch("http_client.resolve_and_validate_addresses")
+    def test_environment_proxy_is_ignored(self, mock_resolve):
+        mock_resolve.return_value = ["127.0.0.1"]
+        with patch.dict(os.environ, {"HTTP_PROXY": "http://proxy.invalid:3128",
+                                     "NO_PROXY": ""}):
+            response = self.client.get(f"http://pinned.invalid:{self.port}/")
+
+        self.assertEqual(response.text, f"pinned.invalid:{self.port}")
+
+    @patch("http_client.resolve_and_validate_addresses")
+    def test_blocked_target_is_not_contacted(self, mock_resolve):
+        mock_resolve.side_effect = SecurityException("URL points to a restricted IP address: 127.0.0.1")
+        with self.assertRaises(SecurityException):
+            self.client.get(f"http://127.0.0.1:{self.port}/")
+
+
+if __name__ == '__main__':
+    unittest.main()
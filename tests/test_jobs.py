@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from errors import ErrorMessage
+from event_loop import BackgroundLoop
+from jobs import JobQueue, JOB_CANCELLED, JOB_DONE, JOB_FAILED
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("jobs.export_job_metrics")
+        self.export_metrics = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.background = BackgroundLoop()
+        self.addCleanup(self.background.stop)
+        self.finished = {}
+        self.all_finished = threading.Event()
+        self.expected = 0
+
+    def on_update(self, job):
+        if job.finished_state:
+            self.finished[job.id] = job
+            if len(self.finished) == self.expected:
+                self.all_finished.set()
+
+    def make_queue(self, max_concurrent):
+        return JobQueue(on_update=self.on_update, max_concurrent=max_concurrent,
+                        background_loop=self.background)
+
+    def test_runs_jobs_bounded_and_reports_results(self):
+        state = {"active": 0, "peak": 0}
+
+        async def fake_analyse(source, prompt_type, custom_prompt="", on_delta=None, details=None,
+                               use_cache=True, cancel_token=None):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            on_delta("Teil")
+            await asyncio.sleep(0.02)
+            state["active"] -= 1
+            if "fail" in source:
+                return ErrorMessage("Error: Failed to retrieve the webpage.")
+            return f"Ergebnis für {source}"
+
+        self.expected = 5
+        with patch("jobs.async_analyse_source", side_effect=fake_analyse):
+            queue = self.make_queue(max_concurrent=2)
+            jobs = [queue.submit(f"https://example.com/{name}", "Zusammenfassung")
+                    for name in ("a", "b", "fail", "c", "d")]
+            self.assertTrue(self.all_finished.wait(5))
+
+        self.assertEqual(state["peak"], 2)
+        self.assertEqual([job.state for job in jobs],
+                         [JOB_DONE, JOB_DONE, JOB_FAILED, JOB_DONE, JOB_DONE])
+        self.assertEqual(jobs[0].result, "Ergebnis für https://example.com/a")
+        self.assertEqual(jobs[0].partial_result, "Teil")
+        self.assertGreater(jobs[0].elapsed, 0)
+        self.assertEqual(sorted(call.args[2] for call in self.export_metrics.call_args_list),
+                         ["error", "ok", "ok", "ok", "ok"])
+
+    def test_cancel_queued_job_never_runs(self):
+        release = threading.Event()
+        started = []
+
+        async def fake_analyse(source, prompt_type, custom_prompt="", on_delta=None, details=None,
+                               use_cache=True, cancel_token=None):
+            started.append(source)
+            await asyncio.to_thread(release.wait, 5)
+            return "fertig"
+
+        self.expected = 2
+        with patch("jobs.async_analyse_source", side_effect=fake_analyse):
+            queue = self.make_queue(max_concurrent=1)
+            first = queue.submit("https://example.com/1", "Zusammenfassung")
+            second = queue.submit("https://example.com/2", "Zusammenfassung")
+            self.assertTrue(queue.cancel(second.id))
+            release.set()
+            self.assertTrue(self.all_finished.wait(5))
+
+        self.assertEqual(started, ["https://example.com/1"])
+        self.assertEqual(first.state, JOB_DONE)
+        self.assertEqual(second.state, JOB_CANCELLED)
+        self.assertFalse(queue.cancel(first.id))
+
+    def test_only_newest_finished_jobs_are_kept(self):
+        async def fake_analyse(source, prompt_type, custom_prompt="", on_delta=None, details=None,
+                               use_cache=True, cancel_token=None):
+            return "fertig"
+
+        self.expected = 4
+        with patch("jobs.async_analyse_source", side_effect=fake_analyse):
+            queue = JobQueue(on_update=self.on_update, max_concurrent=1,
+                             background_loop=self.background, max_finished=2)
+            jobs = [queue.submit(f"https://example.com/{i}", "Zusammenfassung") for i in range(4)]
+            self.assertTrue(self.all_finished.wait(5))
+
+        self.assertEqual(sorted(queue.jobs), [jobs[2].id, jobs[3].id])
+        self.assertIsNone(queue.get(jobs[0].id))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from markdown_ast import Block, Span, parse_inline, parse_lines, parse_markdown
+from pdf_export import note_paragraphs
+
+
+class TestParseInline(unittest.TestCase):
+    def test_all_inline_styles(self):
+        spans = parse_inline("a **fett** b *kursiv* c `x = 1` d ~~weg~~ e [Seite](https://example.com)")
+
+        styled = {span.text: (set(span.styles), span.href) for span in spans if span.styles}
+        self.assertEqual(styled, {
+            "fett": ({"bold"}, None),
+            "kursiv": ({"italic"}, None),
+            "x = 1": ({"code"}, None),
+            "weg": ({"strikethrough"}, None),
+            "Seite": ({"link"}, "https://example.com"),
+        })
+        self.assertEqual("".join(span.text for span in spans),
+                         "a fett b kursiv c x = 1 d weg e Seite")
+
+    def test_nested_and_unclosed_markup(self):
+        spans = parse_inline("**fett _und kursiv_** und **offen")
+
+        self.assertEqual(spans[1], Span("und kursiv", frozenset({"bold", "italic"})))
+        self.assertEqual(spans[-1], Span(" und **offen"))
+
+    def test_underscores_inside_words_stay_literal(self):
+        self.assertEqual(parse_inline("snake_case_name"), [Span("snake_case_name")])
+
+
+class TestParseBlocks(unittest.TestCase):
+    def test_block_kinds(self):
+        blocks = parse_markdown("## Titel\n- Punkt\n  2. Unterpunkt\n> Zitat\n```\n# kein Titel\n```\nText")
+
+        self.assertEqual([(block.kind, block.level, block.marker) for block in blocks], [
+            ("heading", 2, ""), ("list_item", 0, "•"), ("list_item", 1, "2."),
+            ("quote", 0, ""), ("code", 0, ""), ("paragraph", 0, "")])
+        self.assertEqual(blocks[4], Block("code", (Span("# kein Titel"),)))
+
+    def test_code_state_carries_over(self):
+        blocks, in_code = parse_lines(["Text", "```", "code"])
+        self.assertTrue(in_code)
+
+        blocks, in_code = parse_lines(["mehr code", "```"], in_code)
+
+        self.assertFalse(in_code)
+        self.assertEqual(blocks, [Block("code", (Span("mehr code"),))])
+
+    def test_ast_is_cached_by_content(self):
+        text = "# Gleicher Inhalt\nmit **Text**"
+        self.assertIs(parse_markdown(text), parse_markdown("".join(["# Gleicher Inhalt\n", "mit **Text**"])))
+
+
+class TestPdfExport(unittest.TestCase):
+    def test_note_paragraphs_use_ast(self):
+        paragraphs = note_paragraphs("# Titel\nEin **fetter** <Satz>\n- Punkt\n```\na < b\nc\n```")
+
+        self.assertEqual(paragraphs, [
+            ("Heading2", "Titel"),
+            ("Normal", "Ein <b>fetter</b> &lt;Satz&gt;"),
+            ("Bullet", "<bullet>•</bullet>Punkt"),
+            ("Code", "a < b\nc"),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
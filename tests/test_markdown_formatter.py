@@ -0,0 +1,138 @@
+import unittest
+
+from markdown_formatter import MarkdownRenderer, markdown_to_tkinter_text, render_markdown
+
+
+class _FakeText:
+    """Minimal stand-in for tk.Text: one flat string, indexes are "1.<offset>[+<n>c]"."""
+
+    def __init__(self):
+        self.content = ""
+        self.tags = {}
+        self.marks = {}
+        self.calls = []
+
+    def _offset(self, index):
+        index = str(index)
+        if index in ("end", "end-1c"):
+            return len(self.content)
+        if index in self.marks:
+            return self.marks[index]
+        base, _, extra = index.partition("+")
+        offset = int(base.split(".")[1])
+        return offset + int(extra[:-1]) if extra else offset
+
+    def index(self, index):
+        return f"1.{self._offset(index)}"
+
+    def insert(self, index, text, *tagged):
+        # Wie tk.Text.insert: weitere Argumente sind abwechselnd Tags und Text
+        self.calls.append("insert")
+        offset = self._offset(index)
+        chunks = [text, *tagged[1::2]]
+        chunk_tags = list(tagged[0::2]) + [()] * (len(chunks) - len(tagged[0::2]))
+        position = offset
+        for segment, segment_tags in zip(chunks, chunk_tags):
+            self.content = self.content[:position] + segment + self.content[position:]
+            for tag in segment_tags:
+                self.tags.setdefault(tag, set()).update(range(position, position + len(segment)))
+            position += len(segment)
+
+    def delete(self, start, end):
+        start = self._offset(start)
+        self.content = self.content[:start]
+        self.tags = {tag: {o for o in offsets if o < start} for tag, offsets in self.tags.items()}
+
+    def tag_add(self, tag, *indexes):
+        self.calls.append("tag_add")
+        offsets = [self._offset(index) for index in indexes]
+        for start, end in zip(offsets[::2], offsets[1::2]):
+            self.tags.setdefault(tag, set()).update(range(start, end))
+
+    def mark_set(self, name, index):
+        self.marks[name] = self._offset(index)
+
+    def mark_gravity(self, name, gravity):
+        pass
+
+    def state(self):
+        return self.content, {tag: offsets for tag, offsets in self.tags.items() if offsets}
+
+
+def _expected_state(markdown):
+    text, ranges = render_markdown(markdown)
+    tags = {tag: {o for start, end in spans for o in range(start, end)} for tag, spans in ranges.items()}
+    return text, tags
+
+
+SAMPLE = ("# Titel\nText mit **fett** und mehr\n```\ncode\n```\n"
+          "> Zitat\n## Ende\nLetzte Zeile **offen")
+
+
+class TestRenderMarkdown(unittest.TestCase):
+    def test_blocks_and_bold(self):
+        text, ranges = render_markdown("# Titel\nEin **fetter** Satz\n> Zitat")
+
+        self.assertEqual(text, "Titel\nEin fetter Satz\nZitat\n")
+        self.assertEqual(ranges["h1"], [(0, 6)])
+        self.assertEqual(text[slice(*ranges["bold"][0])], "fetter")
+        self.assertEqual(ranges["blockquote"], [(len(text) - 6, len(text))])
+
+    def test_lists_and_inline_tags(self):
+        text, ranges = render_markdown("- ein *kursiver* `code`\n  - ~~alt~~ [Link](https://example.com)")
+
+        self.assertEqual(text, "• ein kursiver code\n    • alt Link\n")
+        self.assertEqual(text[slice(*ranges["italic"][0])], "kursiver")
+        self.assertEqual(text[slice(*ranges["code"][0])], "code")
+        self.assertEqual(text[slice(*ranges["strikethrough"][0])], "alt")
+        self.assertEqual(text[slice(*ranges["link"][0])], "Link")
+        self.assertEqual(len(ranges["list_item"]), 2)
+
+    def test_code_block_and_unclosed_bold(self):
+        text, ranges = render_markdown("```\nx = 1\n**y**\n```\nnur **halb")
+
+        self.assertEqual(text, "x = 1\n**y**\nnur **halb\n")
+        self.assertEqual(ranges["code"], [(0, 6), (6, 12)])
+        self.assertNotIn("bold", ranges)
+
+
+class TestWidgetRendering(unittest.TestCase):
+    def test_large_text_uses_one_insert(self):
+        markdown = "\n".join(f"## Abschnitt {i}\nText mit **fett** Nr. {i}" for i in range(2500))
+        widget = _FakeText()
+
+        markdown_to_tkinter_text(markdown, widget)
+
+        self.assertEqual(widget.calls, ["insert"])
+        self.assertEqual(widget.state(), _expected_state(markdown))
+
+    def test_tags_do_not_depend_on_index_arithmetic(self):
+        # Tk 8.6 zählt "🚀" als zwei Zeichen; Tags werden deshalb mit dem Text eingefügt
+        widget = _FakeText()
+
+        markdown_to_tkinter_text("Start 🚀 mit **fett** und [Link](https://example.com)", widget)
+
+        content, tags = widget.state()
+        self.assertEqual("".join(content[o] for o in sorted(tags["bold"])), "fett")
+        self.assertEqual("".join(content[o] for o in sorted(tags["link"])), "Link")
+
+    def test_incremental_updates_match_full_render(self):
+        widget = _FakeText()
+        renderer = MarkdownRenderer(widget)
+
+        for end in range(1, len(SAMPLE) + 1):
+            renderer.update(SAMPLE[:end])
+            self.assertEqual(widget.state(), _expected_state(SAMPLE[:end]), SAMPLE[:end])
+
+    def test_unrelated_text_is_rendered_from_scratch(self):
+        widget = _FakeText()
+        renderer = MarkdownRenderer(widget)
+        renderer.update("Erste Antwort\nmit zwei Zeilen")
+
+        renderer.update("# Neu")
+
+        self.assertEqual(widget.state(), _expected_state("# Neu"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import analysis
+import metrics
+from cache import CompressedCache
+
+
+class _FakeResponse:
+    headers = {"Content-Type": "text/html; charset=utf-8"}
+    encoding = "utf-8"
+
+    def iter_content(self, chunk_size):
+        yield b"<html><body><p>Erster Absatz</p>"
+        yield b"<p>Zweiter Absatz</p></body></html>"
+
+
+def _stream_chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class TestJobMetrics(unittest.TestCase):
+    def test_recording_outside_a_job_is_a_no_op(self):
+        with metrics.timed("fetch"):
+            pass
+        metrics.add_value("prompt_chars", 10)
+
+    def test_worker_threads_share_the_job(self):
+        with metrics.track_metrics() as job:
+            workers = [threading.Thread(target=contextvars.copy_context().run,
+                                        args=(metrics.add_time, "llm", 0.5)) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            metrics.record_first("ttft_s", 0.2)
+            metrics.record_first("ttft_s", 0.9)
+
+        self.assertEqual(job.as_dict(), {"stages_s": {"llm": 2.0}, "ttft_s": 0.2})
+
+    def test_format_metrics(self):
+        text = metrics.format_metrics({"stages_s": {"fetch": 0.4, "llm": 3.2}, "ttft_s": 0.8})
+        self.assertEqual(text, "Abruf 0.40 s, KI 3.20 s (erstes Token 0.80 s)")
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        cache = CompressedCache(":memory:", default_ttl=60, max_entries=10, max_bytes=100000)
+        patcher = patch("analysis.get_llm_cache", return_value=cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reading_a_page_records_fetch_and_parse(self):
+        with metrics.track_metrics() as job:
+            text = analysis._read_response_text(_FakeResponse())
+
+        self.assertIn("Zweiter Absatz", text)
+        self.assertEqual(set(job.as_dict()["stages_s"]), {"fetch", "parse"})
+
+    @patch("analysis.get_openai_client")
+    def test_streamed_completion_records_latency_and_prompt(self, mock_get_client):
+        mock_get_client.return_value.chat.completions.create.return_value = iter(
+            [_stream_chunk("Hallo"), _stream_chunk(" Welt")])
+        messages = [{"role": "user", "content": "x" * 40}]
+
+        with metrics.track_metrics() as job:
+            analysis.real_ai_analyse_messages(messages, on_delta=lambda delta: None)
+            analysis.real_ai_analyse_messages(messages, on_delta=lambda delta: None)
+
+        recorded = job.as_dict()
+        self.assertEqual(recorded["llm_requests"], 1)
+        self.assertEqual(recorded["llm_cache_hits"], 1)
+        self.assertEqual(recorded["prompt_chars"], 40)
+        self.assertIn("ttft_s", recorded)
+        self.assertIn("llm", recorded["stages_s"])
+
+
+class TestMetricsExporter(unittest.TestCase):
+    def test_writes_jsonl_and_prometheus_totals(self):
+        with tempfile.TemporaryDirectory() as directory:
+            exporter = metrics.MetricsExporter(directory)
+            details = {"metrics": {"stages_s": {"fetch": 0.5, "llm": 2.0}, "prompt_chars": 100,
+                                   "ttft_s": 0.3},
+                       "usage": {"requests": 1, "prompt_tokens": 30, "completion_tokens": 5,
+                                 "cached_tokens": 10}}
+            with patch("metrics.get_metrics_exporter", return_value=exporter):
+                metrics.export_job_metrics("https://example.com", "Zusammenfassung", "ok", 2.6, details)
+                metrics.export_job_metrics("https://example.org", "Zusammenfassung", "error", 0.1,
+                                           {"metrics": {"stages_s": {"fetch": 0.1}}})
+
+            with open(os.path.join(directory, metrics.METRICS_LOG_FILE), encoding="utf-8") as log:
+                records = [json.loads(line) for line in log]
+            with open(os.path.join(directory, metrics.PROMETHEUS_FILE), encoding="utf-8") as prom:
+                exposition = prom.read()
+
+        self.assertEqual([record["status"] for record in records], ["ok", "error"])
+        self.assertEqual(records[0]["usage"]["cached_tokens"], 10)
+        self.assertIn('ki_analysis_jobs_total{status="error"} 1', exposition)
+        self.assertIn('ki_analysis_stage_seconds_sum{stage="fetch"} 0.600000', exposition)
+        self.assertIn('ki_analysis_stage_seconds_count{stage="fetch"} 2', exposition)
+        self.assertIn('ki_analysis_tokens_total{type="cached"} 10', exposition)
+        self.assertIn("ki_analysis_time_to_first_token_seconds_count 1", exposition)
+
+
+if __name__ == "__main__":
+    unittest.main()
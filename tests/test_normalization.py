@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import analysis
+from cache import content_cache_key
+import metrics
+
+
+class TestNormalizeText(unittest.TestCase):
+    def test_collapses_whitespace_and_blank_lines(self):
+        text = "Erste   Zeile\t mit Abstand \n\n\n\nZweite Zeile\n\n"
+        self.assertEqual(analysis.normalize_text(text), "Erste Zeile mit Abstand\n\nZweite Zeile")
+
+    def test_removes_consecutive_duplicates_and_repeated_boilerplate(self):
+        banner = "Wir verwenden Cookies, um Ihnen die bestmögliche Nutzung unserer Website zu ermöglichen."
+        text = f"{banner}\nArtikel\nArtikel\nText\n{banner}"
+        self.assertEqual(analysis.normalize_text(text), f"{banner}\nArtikel\nText")
+
+    def test_keeps_repeated_short_lines(self):
+        self.assertEqual(analysis.normalize_text("DE\n10\nAT\n10\nCH\n10"), "DE\n10\nAT\n10\nCH\n10")
+
+    def test_keeps_indentation(self):
+        code = "def f(x):\n    if x:\n        return 1\n    return 2"
+        self.assertEqual(analysis.normalize_text(code), code)
+
+    def test_strips_caption_artefacts_only_in_transcripts(self):
+        text = "[Musik] Willkommen zu\u200b diesem Video ♪♪ (Applaus) [MUSIC] final"
+        self.assertEqual(analysis.normalize_text(text, captions=True),
+                         "Willkommen zu diesem Video final")
+        self.assertEqual(analysis.normalize_text("Playlist (Musik) und Podcast [Music]"),
+                         "Playlist (Musik) und Podcast [Music]")
+
+    def test_keeps_other_brackets(self):
+        self.assertEqual(analysis.normalize_text("Siehe [1] und (Abbildung 2)", captions=True),
+                         "Siehe [1] und (Abbildung 2)")
+
+
+class TestNormalizeExtracted(unittest.TestCase):
+    def test_error_messages_are_unchanged(self):
+        error = "Error: Failed to retrieve content (Status code: 404)"
+        self.assertEqual(analysis.normalize_extracted(error), error)
+
+    def test_local_file_is_normalized_and_sizes_are_recorded(self):
+        raw = "Kopf\n\n\n\nText   mit   Lücken\nText   mit   Lücken\n"
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as file:
+            file.write(raw)
+        self.addCleanup(os.remove, file.name)
+
+        with metrics.track_metrics() as job:
+            text = analysis.text_extraction_youtube_website(file.name)
+
+        self.assertEqual(text, "Kopf\n\nText mit Lücken")
+        recorded = job.as_dict()
+        self.assertEqual(recorded["content_chars_raw"], len(raw))
+        self.assertEqual(recorded["content_chars"], len(text))
+        self.assertIn("normalize", recorded["stages_s"])
+
+    @patch("analysis.extract_transkript")
+    @patch("analysis.get_content_cache")
+    def test_extraction_result_is_cached_normalized(self, mock_get_cache, mock_extract):
+        mock_get_cache.return_value.get.return_value = None
+        mock_extract.return_value = "[Musik] Hallo   Welt "
+
+        result = analysis.text_extraction_youtube_website("https://youtu.be/abc")
+
+        self.assertEqual(result, "Hallo Welt")
+        mock_get_cache.return_value.set.assert_called_once_with(
+            content_cache_key("youtube", "abc"), "Hallo Welt", ttl=analysis.YOUTUBE_TTL)
+
+
+class TestFormatMetrics(unittest.TestCase):
+    def test_reports_content_size(self):
+        text = metrics.format_metrics({"stages_s": {"fetch": 0.5}, "content_chars_raw": 300,
+                                       "content_chars": 200})
+        self.assertEqual(text, "Abruf 0.50 s, Text 300 → 200 Zeichen")
+
+
+if __name__ == "__main__":
+    unittest.main()
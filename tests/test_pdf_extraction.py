@@ -0,0 +1,138 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from cache import PersistentCache
+from cancellation import AnalysisCancelled, CancellationToken
+from errors import is_error
+from pdf_extraction import extract_pdf_pages, extract_pdf_text, get_pdf_executor, looks_scanned
+from pdf_sessions import file_sha256
+import analysis
+
+
+def write_pdf(path, page_texts):
+    """Schreibt ein minimales PDF mit einer Textzeile pro Seite."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>"
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        data += f"{offset:010d} 00000 n \n".encode("latin-1")
+    data += (f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+             f"startxref\n{xref}\n%%EOF\n").encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+LINE = "Dies ist eine ausreichend lange Textzeile auf einer Seite des Berichts " * 2
+
+
+class TestLocalPDFExtraction(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.pdf_path = os.path.join(self.tmpdir.name, "bericht.pdf")
+
+    def test_pages_are_extracted_in_order_across_processes(self):
+        write_pdf(self.pdf_path, [f"Seite {i} {LINE}" for i in range(6)])
+        pages = extract_pdf_pages(self.pdf_path, max_workers=2, pages_per_task=2)
+
+        self.assertEqual(len(pages), 6)
+        for i, page in enumerate(pages):
+            self.assertTrue(page.startswith(f"Seite {i} "))
+
+    def test_process_pool_is_shared_and_does_not_fork(self):
+        executor = get_pdf_executor()
+
+        self.assertIs(get_pdf_executor(), executor)
+        self.assertNotEqual(executor._mp_context.get_start_method(), "fork")
+
+    def test_cancelled_token_stops_extraction(self):
+        write_pdf(self.pdf_path, [f"Seite {i} {LINE}" for i in range(6)])
+        token = CancellationToken()
+        token.cancel()
+
+        for max_workers in (1, 2):
+            with self.assertRaises(AnalysisCancelled):
+                extract_pdf_pages(self.pdf_path, max_workers=max_workers, pages_per_task=2,
+                                  cancel_token=token)
+        self.assertIsNone(extract_pdf_text(self.pdf_path, cancel_token=token))
+
+    def test_text_pdf(self):
+        write_pdf(self.pdf_path, [LINE, LINE])
+        text = extract_pdf_text(self.pdf_path, max_workers=1)
+        self.assertIn("ausreichend lange Textzeile", text)
+
+    def test_pdf_without_text_layer_is_treated_as_scanned(self):
+        write_pdf(self.pdf_path, ["", ""])
+        self.assertIsNone(extract_pdf_text(self.pdf_path, max_workers=1))
+        self.assertTrue(looks_scanned(["", "  "]))
+
+    def test_invalid_pdf(self):
+        with open(self.pdf_path, "wb") as f:
+            f.write(b"kein pdf")
+        self.assertIsNone(extract_pdf_text(self.pdf_path))
+
+
+class TestAnalysePDF(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.pdf_path = os.path.join(self.tmpdir.name, "bericht.pdf")
+        cache = PersistentCache(":memory:", default_ttl=60, max_entries=10, max_bytes=100000)
+        patcher = patch("analysis.get_content_cache", return_value=cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("analysis.real_ai_analyse_forpdf")
+    @patch("analysis.real_ai_analyse_chunked", return_value="Zusammenfassung")
+    def test_text_pdf_uses_local_pipeline(self, mock_chunked, mock_upload):
+        write_pdf(self.pdf_path, [LINE])
+        result = analysis.analyse_pdf(self.pdf_path, "Fasse den Text zusammen:")
+
+        self.assertEqual(result, "Zusammenfassung")
+        self.assertIn("ausreichend lange Textzeile", mock_chunked.call_args.args[1])
+        mock_upload.assert_not_called()
+
+    @patch("analysis.real_ai_analyse_forpdf", return_value="Antwort")
+    @patch("analysis.real_ai_analyse_chunked")
+    def test_scanned_pdf_falls_back_to_upload(self, mock_chunked, mock_upload):
+        write_pdf(self.pdf_path, [""])
+        result = analysis.analyse_pdf(self.pdf_path, "Fasse den Text zusammen:")
+
+        self.assertEqual(result, "Antwort")
+        mock_upload.assert_called_once_with(self.pdf_path, "Fasse den Text zusammen:",
+                                            cancel_token=None, sha256=file_sha256(self.pdf_path))
+        mock_chunked.assert_not_called()
+
+    @patch("analysis.real_ai_analyse_forpdf")
+    def test_cancelled_extraction_is_not_uploaded(self, mock_upload):
+        write_pdf(self.pdf_path, [LINE])
+        token = CancellationToken()
+        token.cancel()
+
+        result = analysis.analyse_pdf(self.pdf_path, "Fasse den Text zusammen:", cancel_token=token)
+
+        self.assertTrue(is_error(result))
+        mock_upload.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from pdf_sessions import PDFSessionStore, file_sha256
+
+
+class NotFound(Exception):
+    status_code = 404
+
+
+def _vector_store(id, in_progress=0, failed=0, status="completed"):
+    return SimpleNamespace(id=id, status=status,
+                           file_counts=SimpleNamespace(in_progress=in_progress, failed=failed))
+
+
+class TestPDFSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.pdf_path = os.path.join(self.tmpdir.name, "bericht.pdf")
+        with open(self.pdf_path, "wb") as f:
+            f.write(b"%PDF-1.7 Inhalt")
+
+        self.store = PDFSessionStore(":memory:")
+        self.client = MagicMock()
+        self.client.files.create.return_value = SimpleNamespace(id="file-1")
+        self.client.vector_stores.create.return_value = _vector_store("vs-1")
+        self.client.vector_stores.retrieve.return_value = _vector_store("vs-1")
+        self.client.beta.assistants.create.return_value = SimpleNamespace(id="asst-1")
+
+    def test_same_pdf_is_uploaded_once(self):
+        first = self.store.get_vector_store(self.client, self.pdf_path)
+        second = self.store.get_vector_store(self.client, self.pdf_path)
+
+        self.assertEqual(first, "vs-1")
+        self.assertEqual(second, "vs-1")
+        self.client.files.create.assert_called_once()
+        self.client.vector_stores.create.assert_called_once()
+
+    @patch("pdf_sessions.file_sha256")
+    def test_supplied_digest_is_not_recomputed(self, mock_sha256):
+        digest = file_sha256(self.pdf_path)
+        self.assertEqual(self.store.get_vector_store(self.client, self.pdf_path, sha256=digest), "vs-1")
+        self.assertEqual(self.store.get_vector_store(self.client, self.pdf_path, sha256=digest), "vs-1")
+
+        mock_sha256.assert_not_called()
+        self.client.files.create.assert_called_once()
+
+    def test_missing_remote_vector_store_is_recreated(self):
+        self.store.get_vector_store(self.client, self.pdf_path)
+        self.client.vector_stores.retrieve.side_effect = NotFound()
+        self.client.vector_stores.create.return_value = _vector_store("vs-2")
+
+        self.assertEqual(self.store.get_vector_store(self.client, self.pdf_path), "vs-2")
+        self.assertEqual(self.client.files.create.call_count, 2)
+        self.client.files.delete.assert_called_once_with("file-1")
+
+    @patch("polling.time.sleep")
+    def test_waits_until_indexed(self, mock_sleep):
+        self.client.vector_stores.create.return_value = _vector_store("vs-1", in_progress=1)
+        self.client.vector_stores.retrieve.side_effect = [
+            _vector_store("vs-1", in_progress=1), _vector_store("vs-1")]
+
+        self.store.get_vector_store(self.client, self.pdf_path)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch("pdf_sessions.VECTOR_STORE_TIMEOUT", 0)
+    def test_indexing_timeout_deletes_remote_objects(self):
+        self.client.vector_stores.create.return_value = _vector_store("vs-1", in_progress=1)
+
+        with self.assertRaises(TimeoutError):
+            self.store.get_vector_store(self.client, self.pdf_path)
+
+        self.client.vector_stores.delete.assert_called_once_with("vs-1")
+        self.client.files.delete.assert_called_once_with("file-1")
+        self.assertEqual(self.store.collect_garbage(self.client, max_age=-1, force=True), 0)
+
+    @patch("pdf_sessions.VECTOR_STORE_TIMEOUT", 0)
+    def test_failed_cleanup_is_left_to_garbage_collection(self):
+        self.client.vector_stores.create.return_value = _vector_store("vs-1", in_progress=1)
+        self.client.vector_stores.delete.side_effect = ConnectionError()
+
+        with self.assertRaises(TimeoutError):
+            self.store.get_vector_store(self.client, self.pdf_path)
+
+        self.assertEqual(self.store.collect_garbage(self.client, max_age=-1, force=True), 1)
+        self.client.vector_stores.delete.assert_called_with("vs-1")
+
+    def test_assistant_is_reused_per_model_and_instructions(self):
+        first = self.store.get_assistant(self.client, "gpt-4o", "Analysiere")
+        second = self.store.get_assistant(self.client, "gpt-4o", "Analysiere")
+        self.client.beta.assistants.create.return_value = SimpleNamespace(id="asst-2")
+        other = self.store.get_assistant(self.client, "gpt-4o", "Andere Anweisung")
+
+        self.assertEqual(first, second)
+        self.assertEqual(other, "asst-2")
+        self.assertEqual(self.client.beta.assistants.create.call_count, 2)
+
+    def test_garbage_collection_removes_stale_objects(self):
+        self.store.get_vector_store(self.client, self.pdf_path)
+        self.store.get_assistant(self.client, "gpt-4o", "Analysiere")
+
+        removed = self.store.collect_garbage(self.client, max_age=-1, force=True)
+
+        self.assertEqual(removed, 2)
+        self.client.vector_stores.delete.assert_called_once_with("vs-1")
+        self.client.files.delete.assert_called_once_with("file-1")
+        self.client.beta.assistants.delete.assert_called_once_with("asst-1")
+        # Danach wird erneut hochgeladen
+        self.store.get_vector_store(self.client, self.pdf_path)
+        self.assertEqual(self.client.files.create.call_count, 2)
+
+    def test_garbage_collection_is_rate_limited(self):
+        self.store.collect_garbage(self.client)
+        self.store.get_assistant(self.client, "gpt-4o", "Analysiere")
+        self.assertEqual(self.store.collect_garbage(self.client, max_age=-1), 0)
+
+    def test_file_sha256(self):
+        self.assertEqual(len(file_sha256(self.pdf_path)), 64)
+
+
+if __name__ == '__main__':
+    unittest.main()
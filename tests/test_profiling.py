@@ -0,0 +1,100 @@
+import os
+import pstats
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import profiling
+
+
+def _busy_worker_function(seconds=0.2):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(200))
+
+
+class TestProfileMode(unittest.TestCase):
+    def test_mode_from_arguments_and_environment(self):
+        with patch.dict(os.environ, {"KI_PROFILE": ""}):
+            self.assertIsNone(profiling.get_profile_mode([]))
+            self.assertEqual(profiling.get_profile_mode(["--profile"]), "all")
+            self.assertEqual(profiling.get_profile_mode(["--profile=sampling"]), "sampling")
+        with patch.dict(os.environ, {"KI_PROFILE": "1"}):
+            self.assertEqual(profiling.get_profile_mode(), "all")
+        with patch.dict(os.environ, {"KI_PROFILE": "perf"}):
+            self.assertRaises(ValueError, profiling.get_profile_mode)
+
+
+class TestProfilingSession(unittest.TestCase):
+    def test_profiles_worker_threads_into_pstats_and_collapsed_stacks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            session = profiling.ProfilingSession("all", directory, interval=0.002)
+            session.start()
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="worker") as executor:
+                list(executor.map(_busy_worker_function, [0.2, 0.2]))
+            paths = session.stop()
+
+            self.assertEqual(sorted(os.path.splitext(path)[1] for path in paths),
+                             [".collapsed", ".pstats", ".txt"])
+            stats = pstats.Stats(next(path for path in paths if path.endswith(".pstats")))
+            profiled_functions = {function for _, _, function in stats.stats}
+            with open(next(path for path in paths if path.endswith(".collapsed")),
+                      encoding="utf-8") as collapsed:
+                lines = collapsed.read().splitlines()
+
+        self.assertIn("_busy_worker_function", profiled_functions)
+        worker_stacks = [line for line in lines if "_busy_worker_function" in line]
+        self.assertTrue(worker_stacks)
+        stack, count = worker_stacks[0].rsplit(" ", 1)
+        self.assertTrue(stack.startswith("worker"))
+        self.assertGreater(int(count), 0)
+
+    def test_thread_still_running_at_stop_is_included(self):
+        release = threading.Event()
+        worker = threading.Thread(target=lambda: (_busy_worker_function(0.05), release.wait(5)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            session = profiling.ProfilingSession("cprofile", directory)
+            session.start()
+            worker.start()
+            time.sleep(0.1)
+            paths = session.stop()
+            release.set()
+            worker.join()
+
+            stats = pstats.Stats(next(path for path in paths if path.endswith(".pstats")))
+
+        self.assertIn("_busy_worker_function", {function for _, _, function in stats.stats})
+        self.assertIsNone(threading.getprofile())
+
+    def test_process_wide_profiler_installs_no_thread_hook(self):
+        # Ab Python 3.12 darf nur ein Profiler aktiv sein; neue Threads müssen normal starten
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.object(profiling.ThreadProfiler, "PROCESS_WIDE", True):
+            session = profiling.ProfilingSession("cprofile", directory)
+            session.start()
+            self.assertIsNone(threading.getprofile())
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                self.assertEqual(list(executor.map(_busy_worker_function, [0.01, 0.01])),
+                                 [None, None])
+            paths = session.stop()
+
+        self.assertEqual(len(paths), 2)
+
+    def test_sampling_mode_writes_only_collapsed_stacks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            session = profiling.ProfilingSession("sampling", directory, interval=0.002)
+            session.start()
+            worker = threading.Thread(target=_busy_worker_function, args=(0.05,))
+            worker.start()
+            worker.join()
+            paths = session.stop()
+
+        self.assertEqual([os.path.splitext(path)[1] for path in paths], [".collapsed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,16 @@
 
 import unittest
 from unittest.mock import patch, MagicMock
-from security import validate_url, SecurityException
+from security import (validate_url, resolve_and_validate_url, resolve_and_validate_addresses,
+                      clear_dns_cache, SecurityException)
 import analysis
 import socket
 import analysis
 
 class TestSecurity(unittest.TestCase):
+    def setUp(self):
+        clear_dns_cache()
+
     @patch('socket.getaddrinfo')
     def test_valid_url(self, mock_getaddrinfo):
         # Mock a public IP for google.com
@@ -67,15 +71,59 @@ class TestSecurity(unittest.TestCase):
             validate_url("https://")
         self.assertIn("No hostname found", str(cm.exception))
 
+    @patch('socket.getaddrinfo')
+    def test_resolution_is_cached(self, mock_getaddrinfo):
+        mock_getaddrinfo.return_value = [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('93.184.216.34', 443))
+        ]
+        self.assertEqual(resolve_and_validate_url("https://example.com/a"), '93.184.216.34')
+        self.assertEqual(resolve_and_validate_url("https://example.com/b"), '93.184.216.34')
+        mock_getaddrinfo.assert_called_once()
+
+    @patch('socket.getaddrinfo')
+    def test_all_validated_addresses_are_returned_in_order(self, mock_getaddrinfo):
+        mock_getaddrinfo.return_value = [
+            (socket.AF_INET6, socket.SOCK_STREAM, 6, '', ('2606:2800:220:1::248', 443, 0, 0)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('93.184.216.34', 443)),
+            (socket.AF_INET, socket.SOCK_DGRAM, 17, '', ('93.184.216.34', 443)),
+        ]
+        self.assertEqual(resolve_and_validate_addresses("https://example.com"),
+                         ['2606:2800:220:1::248', '93.184.216.34'])
+        self.assertEqual(resolve_and_validate_url("https://example.com"), '2606:2800:220:1::248')
+
+    @patch('socket.getaddrinfo')
+    def test_blocked_resolution_is_not_cached(self, mock_getaddrinfo):
+        mock_getaddrinfo.return_value = [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', 80))
+        ]
+        for _ in range(2):
+            with self.assertRaises(SecurityException):
+                validate_url("http://intern.example")
+        self.assertEqual(mock_getaddrinfo.call_count, 2)
+
+    @patch('security.time.monotonic')
+    @patch('socket.getaddrinfo')
+    def test_cached_resolution_expires(self, mock_getaddrinfo, mock_monotonic):
+        mock_getaddrinfo.return_value = [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('93.184.216.34', 443))
+        ]
+        mock_monotonic.return_value = 1000.0
+        validate_url("https://example.com")
+        mock_monotonic.return_value = 1000.0 + 10_000
+        validate_url("https://example.com")
+        self.assertEqual(mock_getaddrinfo.call_count, 2)
+
 
 class TestAnalysisSecurity(unittest.TestCase):
+    def setUp(self):
+        clear_dns_cache()
 
-    @patch('analysis.requests.Session')
+    @patch('analysis.get_fetch_client')
     @patch('socket.getaddrinfo')
-    def test_extract_text_blocks_unsafe(self, mock_getaddrinfo, mock_session_cls):
+    def test_extract_text_blocks_unsafe(self, mock_getaddrinfo, mock_get_client):
         # Ensure extract_text_from_website now calls validate_url
         # which raises SecurityException for unsafe URLs
-        mock_session = mock_session_cls.return_value
+        mock_session = mock_get_client.return_value
         url = "http://localhost:8080/sensitive"
 
         mock_getaddrinfo.return_value = [
@@ -89,15 +137,17 @@ class TestAnalysisSecurity(unittest.TestCase):
         # requests.get should NOT have been called
         mock_session.get.assert_not_called()
 
-    @patch('analysis.requests.Session')
+    @patch('analysis.get_fetch_client')
     @patch('socket.getaddrinfo')
-    def test_extract_text_allows_safe(self, mock_getaddrinfo, mock_session_cls):
+    def test_extract_text_allows_safe(self, mock_getaddrinfo, mock_get_client):
         url = "https://example.com"
-        mock_session = mock_session_cls.return_value
+        mock_session = mock_get_client.return_value
 
-        mock_session = mock_session_cls.return_value
+        mock_session = mock_get_client.return_value
         mock_response = MagicMock()
-        mock_response.text = "<html><body>Safe content</body></html>"
+        mock_response.headers = {"Content-Type": "text/html; charset=utf-8"}
+        mock_response.encoding = "utf-8"
+        mock_response.iter_content.return_value = [b"<html><body>Safe content</body></html>"]
         mock_response.status_code = 200
         mock_response.is_redirect = False
         mock_session.get.return_value = mock_response
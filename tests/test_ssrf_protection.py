@@ -1,10 +1,12 @@
 
 import unittest
 from unittest.mock import patch, MagicMock
-from security import validate_url, SecurityException
+from security import validate_url, clear_dns_cache, SecurityException
 import analysis
 
 class TestSSRFProtection(unittest.TestCase):
+    def setUp(self):
+        clear_dns_cache()
 
     def test_validate_url_allow_valid(self):
         """Test that valid public URLs are allowed."""
@@ -47,11 +49,11 @@ class TestSSRFProtection(unittest.TestCase):
             with self.assertRaises(SecurityException):
                 validate_url("http://[::1]")
 
-    @patch('analysis.requests.Session')
+    @patch('analysis.get_fetch_client')
     @patch('analysis.validate_url')
-    def test_extract_text_from_website_redirect_loop(self, mock_validate_url, mock_session_cls):
+    def test_extract_text_from_website_redirect_loop(self, mock_validate_url, mock_get_client):
         """Test that redirect loops are handled."""
-        mock_session = mock_session_cls.return_value
+        mock_session = mock_get_client.return_value
 
         # Setup a redirect loop
         response1 = MagicMock()
@@ -70,11 +72,11 @@ class TestSSRFProtection(unittest.TestCase):
         result = analysis.extract_text_from_website("http://example.com/1")
         self.assertEqual(result, "Error: Too many redirects")
 
-    @patch('analysis.requests.Session')
+    @patch('analysis.get_fetch_client')
     @patch('analysis.validate_url')
-    def test_extract_text_from_website_ssrf_on_redirect(self, mock_validate_url, mock_session_cls):
+    def test_extract_text_from_website_ssrf_on_redirect(self, mock_validate_url, mock_get_client):
         """Test that SSRF checks are applied on redirects."""
-        mock_session = mock_session_cls.return_value
+        mock_session = mock_get_client.return_value
 
         # Initial request redirects to internal IP
         response1 = MagicMock()